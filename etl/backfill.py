@@ -0,0 +1,226 @@
+"""
+Backfill historique : snapshots de plusieurs saisons en une seule récupération
+
+L'historique complet de chaque indicateur World Bank est téléchargé une seule
+fois (requête groupée, world_bank.YearlyValues), classé pour toutes les
+années en une passe (ranking.RankCube), puis chaque saison prend les rangs de
+la dernière année déjà publiée à sa date : les valeurs annuelles de l'année N
+ne paraissent que PUBLICATION_LAG_MONTHS mois après la fin de N, une saison
+ne voit donc jamais une année publiée après elle (pas d'anticipation). Les
+indicateurs à année fixe (ex: military, 2020) prennent cette année si elle
+était déjà publiée, sinon la dernière année publiée. Les révisions
+ultérieures d'une année déjà publiée ne sont pas connues (l'API ne fournit
+que la dernière version) : elles sont reprises telles quelles. Les sources sans
+historique (Wikidata, fichiers locaux) sont chargées une fois et reprises
+telles quelles pour toutes les saisons.
+
+Les snapshots (JSON + .geosnap) et les deltas entre saisons consécutives sont
+écrits en parallèle sur un pool de processus, dans snapshot/history/ par
+défaut : les snapshots du build (snapshot/) et son manifeste ne sont pas
+touchés. Une saison déjà présente dans le dossier de sortie n'est réécrite
+qu'avec --force.
+
+Usage :
+    python backfill.py 2024-01 2025-12
+    python backfill.py 2024-01 2025-12 --workers 4 --output /tmp/history --no-deltas --force
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import etl
+from ranking import RankCube
+from snapshot_delta import write_delta
+from world_bank import YearlyValues, bulk_latest_values
+
+# Délai de publication des valeurs annuelles World Bank après la fin de l'année
+PUBLICATION_LAG_MONTHS = int(os.getenv('ETL_BACKFILL_PUBLICATION_LAG_MONTHS', '6'))
+# Dossier de sortie par défaut (séparé des snapshots du build et de leur manifeste)
+HISTORY_DIR = etl.SNAPSHOT_DIR / "history"
+
+
+def season_range(start, end):
+    """Saisons mensuelles YYYY-MM de start à end inclus"""
+    year, month = (int(part) for part in start.split("-"))
+    end_year, end_month = (int(part) for part in end.split("-"))
+    if (year, month) > (end_year, end_month):
+        raise ValueError(f"Intervalle de saisons vide: {start} > {end}")
+    seasons = []
+    while (year, month) <= (end_year, end_month):
+        seasons.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return seasons
+
+
+def published_year(season, lag_months=None):
+    """Dernière année dont les valeurs annuelles étaient publiées au début de la saison
+
+    Les valeurs de l'année N sont publiées lag_months mois après la fin de N
+    (défaut PUBLICATION_LAG_MONTHS) : 2025-11 voit 2024, 2025-03 voit 2023.
+    """
+    lag_months = PUBLICATION_LAG_MONTHS if lag_months is None else lag_months
+    year, month = (int(part) for part in season.split("-"))
+    return (year * 12 + month - 1 - lag_months) // 12 - 1
+
+
+def _cube_year(cube, year):
+    """Dernière année du cube antérieure ou égale à `year` (None si aucune)"""
+    candidates = [cube_year for cube_year in cube.years if cube_year <= year]
+    return candidates[-1] if candidates else None
+
+
+def _with_fallback(category, ranks, fallback_file, fallback_cache):
+    """Applique la règle du build : moins de 10 pays -> fichier de secours"""
+    if len(ranks) >= 10 or not fallback_file:
+        return ranks
+    if fallback_file not in fallback_cache:
+        fallback_cache[fallback_file] = etl.load_fallback_ranks(fallback_file)
+    return fallback_cache[fallback_file] or ranks
+
+
+def season_ranks(seasons, sources=None):
+    """Calcule les rangs de chaque saison à partir d'une seule récupération
+
+    Args:
+        seasons: Saisons YYYY-MM
+        sources: Sources au format SNAPSHOT_SOURCES (défaut : toutes)
+
+    Returns:
+        dict: Saison -> catégorie -> ISO3 -> rang
+    """
+    sources = etl.SNAPSHOT_SOURCES if sources is None else sources
+    world_bank_sources = [source for source in sources if source[2] is etl.get_world_bank_data]
+    static_sources = [source for source in sources if source[2] is not etl.get_world_bank_data]
+
+    # Sources sans historique : une seule lecture pour toutes les saisons
+    static_ranks = etl.fetch_all_ranks(static_sources) if static_sources else {}
+
+    per_season = {season: dict(static_ranks) for season in seasons}
+    if not world_bank_sources:
+        return per_season
+
+    fallback_cache = {}
+    series = None
+    if not etl.USE_LOCAL_ONLY:
+        print(f"Historique World Bank ({len(world_bank_sources)} indicateurs, une requete groupee)...")
+        try:
+            series = bulk_latest_values(etl.WORLD_BANK_API_URL,
+                                        {kwargs["indicator"]: None for _, _, _, kwargs, _ in world_bank_sources},
+                                        reducer=YearlyValues)
+        except Exception as e:
+            print(f"Erreur World Bank (historique): {e}")
+    if series is None:
+        # Pas d'historique disponible : toutes les saisons reprennent les fichiers de secours
+        print("  [FALLBACK] Historique indisponible, fichiers de secours pour toutes les saisons")
+        for category, _, _, _, fallback_file in world_bank_sources:
+            ranks = _with_fallback(category, {}, fallback_file, fallback_cache)
+            for season in seasons:
+                per_season[season][category] = ranks
+        return per_season
+
+    by_category = {category: series[kwargs["indicator"]].values
+                   for category, _, _, kwargs, _ in world_bank_sources}
+    descending = {category: kwargs.get("reverse", False)
+                  for category, _, _, kwargs, _ in world_bank_sources}
+    # Dernière valeur connue à chaque date, et valeurs brutes pour les indicateurs à année fixe
+    latest_cube = RankCube.from_series(by_category, descending, ties=etl.TIE_POLICY, fill=True)
+    exact_cube = RankCube.from_series(by_category, descending, ties=etl.TIE_POLICY, fill=False)
+    print(f"  [OK] Cube de rangs {latest_cube.ranks.shape} (annees x pays x categories)")
+
+    tables = {}
+    for season in seasons:
+        # Années publiées après le début de la saison : inconnues à cette date
+        known_year = published_year(season)
+        for category, _, _, kwargs, fallback_file in world_bank_sources:
+            pinned = kwargs.get("year")
+            if pinned and int(pinned) <= known_year:
+                cube, year = exact_cube, int(pinned)
+                year = year if year in cube.years else None
+            else:
+                cube, year = latest_cube, _cube_year(latest_cube, known_year)
+            key = (category, bool(pinned), year)
+            if key not in tables:
+                ranks = cube.season_ranks(year)[category] if year is not None else {}
+                tables[key] = _with_fallback(category, ranks, fallback_file, fallback_cache)
+            per_season[season][category] = tables[key]
+    return per_season
+
+
+def _write_season(task):
+    """Normalise et écrit le snapshot d'une saison (exécuté dans un processus du pool)
+
+    La section "indexes" suit l'option SNAPSHOT_INDEXES du processus principal,
+    comme dans generate_snapshot : les saisons ont la forme des builds normaux.
+    """
+    season, all_ranks, output_dir, with_indexes = task
+    countries = etl.normalize_countries(all_ranks)
+    indexes = etl.snapshot_indexes(countries, all_ranks, enabled=with_indexes)
+    _, snapshot_file, _, binary_size = etl.write_snapshot_files(countries, season, output_dir, indexes)
+    return season, str(snapshot_file), len(countries), binary_size
+
+
+def _write_delta(task):
+    previous_file, current_file = task
+    delta_file, delta_size, _ = write_delta(Path(previous_file), Path(current_file))
+    return str(delta_file), delta_size
+
+
+def backfill(start, end, output_dir=None, workers=None, deltas=True, force=False):
+    """Génère les snapshots de toutes les saisons de start à end
+
+    Args:
+        start: Première saison YYYY-MM
+        end: Dernière saison YYYY-MM (incluse)
+        output_dir: Dossier de sortie (défaut HISTORY_DIR)
+        workers: Nombre de processus (défaut : nombre de CPU)
+        deltas: Écrire aussi les deltas entre saisons consécutives
+        force: Réécrire les saisons déjà présentes dans output_dir
+
+    Returns:
+        list: Fichiers de snapshot écrits
+    """
+    seasons = season_range(start, end)
+    output_dir = Path(output_dir or HISTORY_DIR)
+    existing = [season for season in seasons if (output_dir / f"snapshot-{season}.json").exists()]
+    if existing and not force:
+        raise FileExistsError(f"Saisons deja presentes dans {output_dir}: {', '.join(existing)} "
+                              f"(--force pour les reecrire)")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    print(f"Backfill de {len(seasons)} saisons ({seasons[0]} -> {seasons[-1]})...")
+    print("=" * 60)
+    begin = time.perf_counter()
+
+    ranks = season_ranks(seasons)
+    print(f"\n[OK] Rangs de toutes les saisons calcules en {time.perf_counter() - begin:.1f}s")
+
+    tasks = [(season, ranks[season], str(output_dir), etl.SNAPSHOT_INDEXES) for season in seasons]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        written = list(executor.map(_write_season, tasks))
+        for season, snapshot_file, n_countries, _ in written:
+            print(f"  [OK] {season}: {Path(snapshot_file).name} ({n_countries} pays)")
+        if deltas and len(written) > 1:
+            pairs = [(written[index - 1][1], written[index][1]) for index in range(1, len(written))]
+            delta_sizes = [size for _, size in executor.map(_write_delta, pairs)]
+            print(f"  [OK] {len(pairs)} deltas ecrits ({sum(delta_sizes)} octets)")
+
+    print(f"\n[OK] Backfill termine en {time.perf_counter() - begin:.1f}s: {output_dir}")
+    print("=" * 60)
+    return [Path(snapshot_file) for _, snapshot_file, _, _ in written]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génère les snapshots d'un intervalle de saisons")
+    parser.add_argument("start", help="Première saison YYYY-MM")
+    parser.add_argument("end", help="Dernière saison YYYY-MM (incluse)")
+    parser.add_argument("--output", help="Dossier de sortie (défaut : snapshot/history/)")
+    parser.add_argument("--workers", type=int, help="Nombre de processus")
+    parser.add_argument("--no-deltas", action="store_true", help="Ne pas écrire les deltas entre saisons")
+    parser.add_argument("--force", action="store_true", help="Réécrire les saisons déjà présentes")
+    args = parser.parse_args()
+    try:
+        backfill(args.start, args.end, args.output, args.workers, deltas=not args.no_deltas, force=args.force)
+    except (FileExistsError, ValueError) as e:
+        raise SystemExit(f"[ERREUR] {e}")
@@ -0,0 +1,141 @@
+"""
+Banc d'essai du service de consultation des snapshots (snapshot_server.py)
+
+Lance le service sur un port libre et le soumet à un mélange de requêtes
+(fiches pays, tranches de classement, tirages avec graine, scores, requêtes
+conditionnelles avec ETag) depuis plusieurs clients keep-alive en parallèle.
+Mesure le débit, les latences (p50, p99) et les octets transférés, et les
+compare au coût de référence d'un client qui télécharge et parse le snapshot
+entier pour chaque consultation.
+
+Usage :
+    python bench_server.py                                 # snapshot/ entier
+    python bench_server.py ../../snapshot/snapshot-2025-11.json --requests 20000 --clients 16
+"""
+
+import argparse
+import http.client
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from puzzles import GAME_MODES  # noqa: E402
+from snapshot_server import SnapshotServer, SnapshotStore  # noqa: E402
+
+# Part de chaque type de requête dans le mélange
+REQUEST_MIX = {"country": 0.45, "category": 0.2, "draw": 0.15, "score": 0.1, "revalidate": 0.1}
+
+
+def build_requests(store, count, seed=0):
+    """Liste reproductible de requêtes (méthode, chemin, corps, type)"""
+    rng = random.Random(seed)
+    season = store.get()
+    codes = sorted(season.countries)
+    kinds = rng.choices(list(REQUEST_MIX), weights=list(REQUEST_MIX.values()), k=count)
+    requests = []
+    for kind in kinds:
+        if kind in ("country", "revalidate"):
+            requests.append(("GET", f"/countries/{rng.choice(codes)}", None, kind))
+        elif kind == "category":
+            category = rng.choice(season.categories)
+            requests.append(("GET", f"/categories/{category}?offset={rng.randrange(0, 150, 50)}", None, kind))
+        elif kind == "draw":
+            requests.append(("GET", f"/draw?mode={rng.choice(list(GAME_MODES))}&seed={rng.randrange(1000)}",
+                             None, kind))
+        else:
+            mode = rng.choice(list(GAME_MODES))
+            settings = GAME_MODES[mode]
+            countries = rng.sample(codes, settings["countries"])
+            assignments = dict(zip(settings["categories"], countries))
+            body = json.dumps({"mode": mode, "countries": countries, "assignments": assignments})
+            requests.append(("POST", "/score", body, kind))
+    return requests
+
+
+def _client(url_host, url_port, requests, results, etags):
+    connection = http.client.HTTPConnection(url_host, url_port)
+    for method, path, body, kind in requests:
+        headers = {"Accept-Encoding": "gzip"}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        if kind == "revalidate" and path in etags:
+            headers["If-None-Match"] = etags[path]
+        start = time.perf_counter()
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        payload = response.read()
+        elapsed = time.perf_counter() - start
+        if response.getheader("ETag"):
+            etags[path] = response.getheader("ETag")
+        results.append((kind, response.status, elapsed, len(payload)))
+    connection.close()
+
+
+def baseline(snapshot_file, repeat=20):
+    """Coût d'une consultation sans service : lire et parser le snapshot entier"""
+    data = Path(snapshot_file).read_bytes()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        json.loads(data)
+    return (time.perf_counter() - start) / repeat, len(data)
+
+
+def run(paths=None, count=10000, clients=8, seed=0):
+    store = SnapshotStore.load(paths)
+    server = SnapshotServer(store, "127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+
+    requests = build_requests(store, count, seed)
+    # Chaque client rejoue sa part ; une première passe remplit les ETag des requêtes conditionnelles
+    shares = [requests[index::clients] for index in range(clients)]
+    results = []
+    etags = {}
+    _client(host, port, requests[:min(200, count)], [], etags)
+
+    threads = [threading.Thread(target=_client, args=(host, port, share, results, etags)) for share in shares]
+    start = time.perf_counter()
+    for client in threads:
+        client.start()
+    for client in threads:
+        client.join()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    server.server_close()
+
+    print(f"Service de snapshots : {count} requetes, {clients} clients, saison {store.latest}")
+    print(f"  [OK] {count / elapsed:,.0f} requetes/s ({elapsed:.2f}s)")
+    for kind in REQUEST_MIX:
+        latencies = sorted(latency for result_kind, _, latency, _ in results if result_kind == kind)
+        if not latencies:
+            continue
+        statuses = sorted({status for result_kind, status, _, _ in results if result_kind == kind})
+        sizes = [size for result_kind, _, _, size in results if result_kind == kind]
+        print(f"  {kind:<11} n={len(latencies):<6} p50 {1000 * statistics.median(latencies):6.2f} ms   "
+              f"p99 {1000 * latencies[int(0.99 * (len(latencies) - 1))]:6.2f} ms   "
+              f"{statistics.mean(sizes):7.0f} octets   statuts {statuses}")
+    errors = [result for result in results if result[1] >= 400]
+    if errors:
+        print(f"  [ATTENTION] {len(errors)} reponses en erreur")
+
+    parse_time, snapshot_size = baseline(store.get().source)
+    print(f"  Reference (snapshot entier par consultation) : {1000 * parse_time:.2f} ms de parsing "
+          f"et {snapshot_size} octets par requete, soit {1 / parse_time:,.0f} consultations/s au mieux")
+    return count / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banc d'essai du service de snapshots")
+    parser.add_argument("snapshots", nargs="*", help="Snapshots JSON ou dossiers (défaut : snapshot/)")
+    parser.add_argument("--requests", type=int, default=10000, help="Nombre de requêtes")
+    parser.add_argument("--clients", type=int, default=8, help="Clients en parallèle")
+    parser.add_argument("--seed", type=int, default=0, help="Graine du mélange de requêtes")
+    args = parser.parse_args()
+    run(args.snapshots, args.requests, args.clients, args.seed)
@@ -0,0 +1,116 @@
+"""
+Temps de démarrage des sous-commandes légères de cli.py
+
+Lance chaque commande dans un nouveau processus Python (comme un appel en
+ligne de commande) et vérifie qu'aucun module lourd n'est importé
+(-X importtime). Sert de garde-fou aux imports différés de l'ETL.
+
+La durée médiane est comparée à celle d'un interpréteur nu (python -c pass)
+mesurée sur la même machine : seul le surcoût de la commande est comparé à
+la cible, le démarrage de l'interpréteur dépend de la machine.
+
+Usage :
+    python bench_startup.py [--repeat 10] [--target-ms 50]
+
+Code de sortie 1 si une commande charge un module lourd ; un surcoût
+au-dessus de la cible est signalé [LENT] sans faire échouer le banc
+(--strict pour le rendre bloquant).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ETL_DIR = Path(__file__).resolve().parent.parent
+CLI = ETL_DIR / "cli.py"
+SNAPSHOT_DIR = ETL_DIR.parent / "snapshot"
+# Surcoût médian maximal d'une commande légère par rapport à l'interpréteur nu
+STARTUP_TARGET_MS = float(os.getenv('ETL_STARTUP_TARGET_MS', '50'))
+HEAVY_MODULES = ("numpy", "requests", "urllib3", "SPARQLWrapper", "pycountry", "etl")
+
+
+def _imported_modules(command):
+    result = subprocess.run([sys.executable, "-X", "importtime", str(CLI), *command],
+                            capture_output=True, text=True, cwd=ETL_DIR)
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            modules.add(line.rsplit("|", 1)[1].strip())
+    return modules
+
+
+def measure(command, repeat):
+    """Durée médiane d'une commande et son surcoût médian sur l'interpréteur nu (ms)
+
+    Chaque exécution est précédée d'un interpréteur nu : les deux mesures
+    subissent la même charge de la machine.
+    """
+    durations = []
+    overheads = []
+    for _ in range(repeat):
+        bare = _timed([sys.executable, "-c", "pass"])
+        duration = _timed([sys.executable, str(CLI), *command], cwd=ETL_DIR)
+        durations.append(duration)
+        overheads.append(duration - bare)
+    return 1000 * statistics.median(durations), 1000 * statistics.median(overheads)
+
+
+def run(repeat=10, target_ms=STARTUP_TARGET_MS, strict=False):
+    snapshots = sorted(SNAPSHOT_DIR.glob("snapshot-????-??.json"))
+    if not snapshots:
+        raise SystemExit(f"Aucun snapshot dans {SNAPSHOT_DIR}")
+    snapshot = snapshots[-1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Saison suivante fictive : quelques rangs modifiés pour que diff ait du travail
+        document = json.loads(snapshot.read_text(encoding='utf-8'))
+        for entry in list(document["countries"].values())[:20]:
+            for category in entry["ranks"]:
+                entry["ranks"][category] += 1
+        changed = Path(tmp) / "snapshot-next.json"
+        changed.write_text(json.dumps(document, ensure_ascii=False, indent=2), encoding='utf-8')
+
+        commands = {
+            "--help": ["--help"],
+            "validate": ["validate", str(snapshot)],
+            "diff": ["diff", str(snapshot), str(changed)],
+        }
+        baseline = 1000 * statistics.median(
+            [_timed([sys.executable, "-c", "pass"]) for _ in range(repeat)])
+        print(f"Demarrage des commandes legeres ({repeat} repetitions, "
+              f"cible +{target_ms:.0f} ms sur l'interpreteur seul)")
+        print(f"  {'':<9}{'interpreteur seul':<20} {baseline:7.1f} ms")
+        failed = False
+        for name, command in commands.items():
+            duration, overhead = measure(command, repeat)
+            heavy = sorted(module for module in _imported_modules(command)
+                           if module.split(".")[0] in HEAVY_MODULES)
+            slow = overhead > target_ms
+            status = "ERREUR" if heavy else "LENT" if slow else "OK"
+            failed |= bool(heavy) or (strict and slow)
+            print(f"  {'[' + status + ']':<9}{name:<20} {duration:7.1f} ms (+{overhead:.1f} ms)"
+                  + (f"   modules lourds: {', '.join(heavy)}" if heavy else ""))
+    return 1 if failed else 0
+
+
+def _timed(command, cwd=None):
+    start = time.perf_counter()
+    subprocess.run(command, capture_output=True, cwd=cwd, check=True)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Temps de démarrage des commandes légères de cli.py")
+    parser.add_argument("--repeat", type=int, default=10, help="Répétitions par commande")
+    parser.add_argument("--target-ms", type=float, default=STARTUP_TARGET_MS,
+                        help=f"Surcoût maximal par commande en ms, interpréteur nu déduit "
+                             f"(défaut {STARTUP_TARGET_MS:.0f})")
+    parser.add_argument("--strict", action="store_true", help="Échouer aussi si une commande dépasse la cible")
+    args = parser.parse_args()
+    sys.exit(run(args.repeat, args.target_ms, args.strict))
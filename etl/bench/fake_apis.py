@@ -0,0 +1,274 @@
+"""
+Serveur HTTP local qui imite les APIs World Bank v2 et Wikidata SPARQL
+
+Utilisé par le banc d'essai (run_bench.py) pour mesurer l'ETL sans dépendre
+des APIs publiques. Les données sont synthétiques mais déterministes, et le
+comportement est configurable : latence, taille des réponses (nombre
+d'années d'historique, lignes dupliquées) et taux d'échec.
+
+Endpoints :
+    GET /v2/country/all/indicator/<code>[;<code>...]?format=json&per_page=&page=&date=&mrv=&source=
+        Réponse paginée [métadonnées, items] au format World Bank v2
+        (plusieurs indicateurs : items regroupés par indicateur)
+    GET|POST /sparql?query=...
+        Résultat SPARQL JSON (population des capitales), LIMIT / OFFSET respectés ;
+        une requête avec GROUP BY reçoit une ligne par pays (MAX de la population)
+
+Usage autonome :
+    python fake_apis.py --port 8765 --latency-ms 50 --failure-rate 0.1
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pycountry
+
+# Agrégats régionaux renvoyés par la vraie API (filtrés par l'ETL)
+REGION_AGGREGATES = [("WLD", "1W", "World"), ("EUU", "EU", "European Union"),
+                     ("SSF", "ZG", "Sub-Saharan Africa"), ("HIC", "XD", "High income")]
+LAST_YEAR = 2024
+
+
+class FakeApiConfig:
+    """Paramètres du serveur (modifiables entre deux scénarios)"""
+
+    def __init__(self, latency_ms=0, years=30, failure_rate=0.0, null_rate=0.1,
+                 capital_duplicates=2, seed=0):
+        self.latency_ms = latency_ms
+        self.years = years
+        self.failure_rate = failure_rate
+        self.null_rate = null_rate
+        self.capital_duplicates = capital_duplicates
+        self.seed = seed
+
+
+def _rng(*parts):
+    digest = hashlib.sha256("/".join(str(part) for part in parts).encode('utf-8')).digest()
+    return random.Random(int.from_bytes(digest[:8], "little"))
+
+
+def _countries():
+    countries = [(country.alpha_3, country.alpha_2, country.name) for country in pycountry.countries]
+    return sorted(countries) + REGION_AGGREGATES
+
+
+def world_bank_items(config, indicator, date=None, mrv=None):
+    """Items synthétiques d'un indicateur (ordre de la vraie API : pays puis année décroissante)"""
+    return _world_bank_items(config.seed, config.years, config.null_rate, indicator, date, mrv)
+
+
+@lru_cache(maxsize=64)
+def _world_bank_items(seed, history_years, null_rate, indicator, date, mrv):
+    if date:
+        years = [int(date)]
+    else:
+        years = list(range(LAST_YEAR, LAST_YEAR - history_years, -1))
+        if mrv:
+            years = years[:int(mrv)]
+    items = []
+    for iso3, iso2, name in _countries():
+        rng = _rng(seed, indicator, iso3)
+        base = rng.lognormvariate(10, 3)
+        for year in years:
+            # Valeur nulle tirée par (pays, année) : identique quelle que soit la fenêtre demandée
+            missing = _rng(seed, indicator, iso3, year).random() < null_rate
+            value = None if missing else round(base * (1 + 0.02 * (year - 2000)), 2)
+            items.append({
+                "indicator": {"id": indicator, "value": indicator},
+                "country": {"id": iso2, "value": name},
+                "countryiso3code": iso3,
+                "date": str(year),
+                "value": value,
+                "unit": "",
+                "obs_status": "",
+                "decimal": 0,
+            })
+    return items
+
+
+def sparql_bindings(config):
+    """Lignes synthétiques (pays, capitale, population), avec doublons comme sur Wikidata"""
+    return _sparql_bindings(config.seed, config.capital_duplicates)
+
+
+@lru_cache(maxsize=16)
+def _sparql_bindings(seed, capital_duplicates):
+    rows = []
+    for iso3, _, name in _countries()[:-len(REGION_AGGREGATES)]:
+        rng = _rng(seed, "capital", iso3)
+        population = int(rng.lognormvariate(13, 1.2))
+        for duplicate in range(1 + rng.randrange(capital_duplicates + 1)):
+            rows.append({
+                "country": {"type": "uri", "value": f"http://www.wikidata.org/entity/Q{iso3}"},
+                "countryLabel": {"xml:lang": "en", "type": "literal", "value": name},
+                "capital": {"type": "uri", "value": f"http://www.wikidata.org/entity/C{iso3}"},
+                "capitalLabel": {"xml:lang": "en", "type": "literal", "value": f"{name} City"},
+                "population": {"datatype": "http://www.w3.org/2001/XMLSchema#decimal",
+                               "type": "literal", "value": str(population - 1000 * duplicate)},
+                "iso3": {"type": "literal", "value": iso3},
+            })
+    rows.sort(key=lambda row: -int(row["population"]["value"]))
+    return rows
+
+
+def aggregated_bindings(config):
+    """Lignes agrégées par pays (MAX de la population), triées par entité pays"""
+    return _aggregated_bindings(config.seed, config.capital_duplicates)
+
+
+@lru_cache(maxsize=16)
+def _aggregated_bindings(seed, capital_duplicates):
+    by_country = {}
+    for row in _sparql_bindings(seed, capital_duplicates):
+        country = row["country"]["value"]
+        best = by_country.get(country)
+        if best is None or int(row["population"]["value"]) > int(best["population"]["value"]):
+            by_country[country] = {key: row[key] for key in ("country", "countryLabel", "iso3", "population")}
+    return [by_country[country] for country in sorted(by_country)]
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, payload, content_type="application/json"):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.lock:
+            self.server.stats["bytes"] += len(body)
+
+    def _fail(self):
+        body = b'{"error": "simulated failure"}'
+        self.send_response(503)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _prepare(self):
+        config = self.server.config
+        with self.server.lock:
+            self.server.stats["requests"] += 1
+            failed = self.server.rng.random() < config.failure_rate
+            if failed:
+                self.server.stats["failures"] += 1
+        if config.latency_ms:
+            time.sleep(config.latency_ms / 1000)
+        return not failed
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if not self._prepare():
+            return self._fail()
+        match = re.fullmatch(r"/v2/country/all/indicator/([^/]+)", url.path)
+        if match:
+            return self._world_bank(match.group(1), params)
+        if url.path == "/sparql":
+            return self._sparql(params.get("query", ""))
+        self.send_error(404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        params = {key: values[-1] for key, values in parse_qs(self.rfile.read(length).decode('utf-8')).items()}
+        if not self._prepare():
+            return self._fail()
+        if urlsplit(self.path).path == "/sparql":
+            return self._sparql(params.get("query", ""))
+        self.send_error(404)
+
+    def _world_bank(self, indicator, params):
+        items = []
+        for code in indicator.split(";"):
+            items += world_bank_items(self.server.config, code, params.get("date"), params.get("mrv"))
+        per_page = int(params.get("per_page", 50))
+        page = int(params.get("page", 1))
+        pages = max(1, -(-len(items) // per_page))
+        meta = {"page": page, "pages": pages, "per_page": per_page, "total": len(items),
+                "sourceid": "2", "lastupdated": f"{LAST_YEAR + 1}-01-01"}
+        self._send_json([meta, items[(page - 1) * per_page:page * per_page]])
+
+    def _sparql(self, query):
+        if re.search(r"GROUP\s+BY", query, re.IGNORECASE):
+            rows = aggregated_bindings(self.server.config)
+            head = {"vars": ["country", "countryLabel", "iso3", "population"]}
+        else:
+            rows = sparql_bindings(self.server.config)
+            head = {"vars": ["country", "countryLabel", "capital", "capitalLabel", "population", "iso3"]}
+        offset = re.search(r"OFFSET\s+(\d+)", query, re.IGNORECASE)
+        limit = re.search(r"LIMIT\s+(\d+)", query, re.IGNORECASE)
+        start = int(offset.group(1)) if offset else 0
+        rows = rows[start:start + int(limit.group(1))] if limit else rows[start:]
+        self._send_json({"head": head, "results": {"bindings": rows}}, "application/sparql-results+json")
+
+
+class FakeApiServer:
+    """Serveur local démarré dans un thread (utilisable avec with)"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.httpd = ThreadingHTTPServer((host, port), FakeApiHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.config = config or FakeApiConfig()
+        self.httpd.lock = threading.Lock()
+        self.httpd.rng = random.Random(self.httpd.config.seed)
+        self.httpd.stats = {"requests": 0, "failures": 0, "bytes": 0}
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def config(self):
+        return self.httpd.config
+
+    @config.setter
+    def config(self, config):
+        self.httpd.config = config
+        self.httpd.rng = random.Random(config.seed)
+
+    @property
+    def stats(self):
+        return self.httpd.stats
+
+    def reset_stats(self):
+        self.httpd.stats = {"requests": 0, "failures": 0, "bytes": 0}
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Imitation locale des APIs World Bank et Wikidata")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--years", type=int, default=30)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    config = FakeApiConfig(latency_ms=args.latency_ms, years=args.years, failure_rate=args.failure_rate)
+    with FakeApiServer(config, port=args.port) as server:
+        print(f"World Bank : {server.url}/v2   Wikidata : {server.url}/sparql")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
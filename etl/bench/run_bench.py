@@ -0,0 +1,223 @@
+"""
+Banc d'essai de l'ETL contre un serveur local (fake_apis.py)
+
+Lance generate_snapshot et chaque chargeur réseau contre l'imitation locale
+des APIs World Bank et Wikidata, pour plusieurs scénarios (latence, taille
+des réponses, taux d'échec). Mesure la durée de bout en bout, le débit (lignes
+lues par seconde, octets servis) et le pic mémoire (tracemalloc), puis
+compare à la référence enregistrée dans baseline.json.
+
+Les durées absolues dépendent de la machine et de sa charge : chaque
+exécution mesure aussi une boucle CPU fixe (calibrate) dans le même
+processus, et les durées de référence sont mises à l'échelle du rapport
+entre cette calibration et celle enregistrée avec la référence.
+
+Usage :
+    python run_bench.py                      # compare à baseline.json
+    python run_bench.py --save-baseline      # enregistre une nouvelle référence
+    python run_bench.py --scenarios nominal flaky --repeat 5
+
+Code de sortie 1 si une mesure régresse au-delà de la tolérance.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Le cache HTTP fausserait les mesures : il est désactivé avant d'importer l'ETL
+os.environ["ETL_CACHE_MODE"] = "off"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import etl  # noqa: E402
+from metrics import METRICS  # noqa: E402
+from fake_apis import FakeApiConfig, FakeApiServer  # noqa: E402
+
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+
+SCENARIOS = {
+    "nominal": FakeApiConfig(latency_ms=20, years=30),
+    "slow": FakeApiConfig(latency_ms=400, years=30),
+    "large": FakeApiConfig(latency_ms=20, years=64, capital_duplicates=4),
+    "flaky": FakeApiConfig(latency_ms=20, years=30, failure_rate=0.3),
+}
+
+# Boucle de calibration (répétitions, médiane) : travail Python pur proche de l'ETL
+CALIBRATION_REPEAT = 7
+
+# Cibles mesurées : chargeurs individuels puis le build complet
+TARGETS = {
+    "world_bank_small_area": lambda: etl.get_world_bank_data(
+        "AG.LND.TOTL.K2", reverse=False, fallback_file="small_area_fallback.json"),
+    "world_bank_gdp": lambda: etl.get_world_bank_data(
+        "NY.GDP.MKTP.CD", reverse=True, fallback_file="gdp_fallback.json"),
+    "world_bank_military": lambda: etl.get_world_bank_data(
+        "MS.MIL.TOTL.P1", reverse=True, year=2020, fallback_file="military_fallback.json"),
+    "world_bank_bulk": lambda: etl.get_world_bank_bulk(
+        [(category, dict(kwargs, fallback_file=fallback_file))
+         for category, _, loader, kwargs, fallback_file in etl.SNAPSHOT_SOURCES
+         if loader is etl.get_world_bank_data]),
+    "wikidata_capital_pop": lambda: etl.get_wikidata_capital_population(
+        fallback_file="capital_pop_fallback.json"),
+    "generate_snapshot": lambda: etl.generate_snapshot(full_rebuild=True),
+}
+
+
+def _rows_parsed():
+    counters = METRICS.summary()["counters"]
+    return sum(values.get("rows_parsed", 0) for values in counters.values())
+
+
+def calibrate(repeat=CALIBRATION_REPEAT):
+    """Durée médiane (s) d'une boucle CPU fixe : JSON, tri et dicts, sans réseau"""
+    rows = [{"country": f"C{index:04d}", "year": 1960 + index % 64, "value": (index * 7919) % 100003 / 7.0}
+            for index in range(10000)]
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parsed = json.loads(json.dumps(rows))
+        latest = {}
+        for row in parsed:
+            if row["year"] >= latest.get(row["country"], (0, 0))[0]:
+                latest[row["country"]] = (row["year"], row["value"])
+        sorted(latest.items(), key=lambda item: item[1][1])
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def measure(server, target, repeat):
+    """Mesure une cible `repeat` fois ; retourne les médianes et le pic mémoire"""
+    # Tour à blanc : le serveur génère et met en cache ses réponses (hors mesure)
+    with contextlib.redirect_stdout(io.StringIO()):
+        TARGETS[target]()
+    durations, peaks, rows, served = [], [], [], []
+    for _ in range(repeat):
+        server.reset_stats()
+        METRICS.reset()
+        tracemalloc.start()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            TARGETS[target]()
+        durations.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        rows.append(_rows_parsed())
+        served.append(server.stats["bytes"])
+    seconds = statistics.median(durations)
+    return {
+        "seconds": round(seconds, 4),
+        "peak_kb": round(max(peaks) / 1024, 1),
+        "rows_parsed": int(statistics.median(rows)),
+        "rows_per_second": round(statistics.median(rows) / seconds, 1) if seconds else None,
+        "bytes_served": int(statistics.median(served)),
+        "requests": server.stats["requests"],
+        "failures": server.stats["failures"],
+    }
+
+
+def run(scenarios, repeat):
+    """Exécute les scénarios demandés
+
+    Returns:
+        tuple: ({scénario: {cible: mesures}}, durée de calibration en s)
+    """
+    results = {}
+    # Calibration avant et après les mesures : la charge de la machine peut varier entre les deux
+    calibrations = [calibrate()]
+    with tempfile.TemporaryDirectory() as snapshot_dir, FakeApiServer() as server:
+        # Rediriger l'ETL vers le serveur local et un dossier de sortie temporaire
+        etl.WORLD_BANK_API_URL = f"{server.url}/v2"
+        etl.WIKIDATA_SPARQL_URL = f"{server.url}/sparql"
+        etl.USE_LOCAL_ONLY = False
+        etl.SNAPSHOT_DIR = Path(snapshot_dir)
+        etl.BUILD_MANIFEST_FILE = Path(snapshot_dir) / "build-manifest.json"
+        etl.PUBLISH_DIR = Path(snapshot_dir) / "publish"
+        # Les puzzles (simulations Monte Carlo) ne font pas partie de la mesure de l'ETL
+        etl.PUZZLES = False
+        for name in scenarios:
+            server.config = SCENARIOS[name]
+            results[name] = {}
+            for target in TARGETS:
+                results[name][target] = measure(server, target, repeat)
+                result = results[name][target]
+                print(f"  {name:8} {target:24} {result['seconds']:8.3f}s  "
+                      f"{result['peak_kb']:9.1f} Ko  {result['rows_per_second'] or 0:12.1f} lignes/s")
+    calibrations.append(calibrate())
+    return results, statistics.mean(calibrations)
+
+
+def compare(results, baseline, tolerance, min_seconds=0.05, calibration=None):
+    """Liste les régressions de durée et de pic mémoire par rapport à la référence
+
+    Les durées de référence sont multipliées par calibration / calibration de
+    la référence (machine plus lente ou plus chargée : références plus longues).
+    Sans calibration d'un côté ou de l'autre, elles sont comparées telles quelles.
+    """
+    regressions = []
+    reference_calibration = baseline.get("calibration_seconds")
+    scale = calibration / reference_calibration if calibration and reference_calibration else 1.0
+    for scenario, targets in results.items():
+        for target, result in targets.items():
+            reference = baseline.get("results", {}).get(scenario, {}).get(target)
+            if not reference:
+                continue
+            expected = reference["seconds"] * scale
+            if (result["seconds"] > expected * (1 + tolerance)
+                    and result["seconds"] - expected > min_seconds):
+                regressions.append(f"{scenario}/{target}: {reference['seconds']}s "
+                                   f"(x{scale:.2f} = {expected:.3f}s) -> {result['seconds']}s")
+            if result["peak_kb"] > reference["peak_kb"] * (1 + tolerance):
+                regressions.append(f"{scenario}/{target}: {reference['peak_kb']} Ko -> {result['peak_kb']} Ko")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai de l'ETL contre des APIs locales")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=3, help="Répétitions par mesure (médiane)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="Enregistrer les résultats comme référence")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Régression tolérée (0.25 = +25%%)")
+    args = parser.parse_args()
+
+    print(f"Banc d'essai ETL ({', '.join(args.scenarios)}, {args.repeat} repetitions)...")
+    results, calibration = run(args.scenarios, args.repeat)
+    print(f"  calibration {1000 * calibration:.1f} ms")
+
+    if args.save_baseline:
+        document = {
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+            "calibration_seconds": round(calibration, 5),
+            "results": results,
+        }
+        args.baseline.write_text(json.dumps(document, indent=2) + "\n", encoding='utf-8')
+        print(f"[OK] Reference enregistree: {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"[ATTENTION] Pas de reference ({args.baseline}), lancez --save-baseline")
+        return 0
+    baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+    if "calibration_seconds" not in baseline:
+        print("[ATTENTION] Reference sans calibration : durees comparees telles quelles (--save-baseline)")
+    regressions = compare(results, baseline, args.tolerance, calibration=calibration)
+    for regression in regressions:
+        print(f"[REGRESSION] {regression}")
+    if not regressions:
+        print("[OK] Aucune regression par rapport a la reference")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Manifeste de build pour les snapshots incrémentaux
+
+Le manifeste (snapshot/build-manifest.json) enregistre, pour chaque
+catégorie, l'empreinte de ses entrées (paramètres de la source + contenu des
+fichiers data/ utilisés) et la table de rangs calculée. Au build suivant,
+une catégorie dont l'empreinte n'a pas changé est reprise telle quelle :
+seules les catégories modifiées sont récupérées et reclassées.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+
+
+def file_digest(path):
+    """Empreinte SHA-256 du contenu d'un fichier (None s'il n'existe pas)"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def code_digest(paths):
+    """Empreinte du code qui calcule les rangs : s'il change, tout est reconstruit"""
+    digest = hashlib.sha256()
+    for path in sorted(str(p) for p in paths):
+        digest.update(Path(path).name.encode('utf-8'))
+        digest.update((file_digest(path) or "").encode('utf-8'))
+    return digest.hexdigest()
+
+
+def source_digest(category, loader_name, kwargs, fallback_file, data_dir, extra=None):
+    """Empreinte des entrées d'une source du snapshot
+
+    Args:
+        category: Nom de la catégorie
+        loader_name: Nom de la fonction de chargement
+        kwargs: Arguments de la fonction de chargement
+        fallback_file: Fichier de secours dans data/ (ou None)
+        data_dir: Dossier data/
+        extra: Paramètres supplémentaires qui influencent le résultat
+    """
+    description = {
+        "category": category,
+        "loader": loader_name,
+        "kwargs": kwargs,
+        "fallback_file": fallback_file,
+        "extra": extra or {},
+    }
+    digest = hashlib.sha256(json.dumps(description, sort_keys=True).encode('utf-8'))
+    for filename in (kwargs.get("filename"), fallback_file):
+        if filename:
+            digest.update((file_digest(Path(data_dir) / filename) or "").encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    """Charge le manifeste de build, ou un manifeste vide s'il est absent ou incompatible"""
+    path = Path(path)
+    empty = {"version": MANIFEST_VERSION, "code": None, "snapshot": None, "categories": {}}
+    if not path.exists():
+        return empty
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"  [ATTENTION] Manifeste de build illisible ({e}), reconstruction complete")
+        return empty
+    if manifest.get("version") != MANIFEST_VERSION:
+        return empty
+    return manifest
+
+
+def save_manifest(path, manifest):
+    """Écrit le manifeste de build (écriture atomique)"""
+    path = Path(path)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def reusable_ranks(manifest, category, input_hash, code_hash, max_age=None):
+    """Retourne la table de rangs réutilisable d'une catégorie, ou None
+
+    Args:
+        manifest: Manifeste chargé par load_manifest
+        category: Nom de la catégorie
+        input_hash: Empreinte actuelle des entrées de la catégorie
+        code_hash: Empreinte actuelle du code de calcul
+        max_age: Âge maximum en secondes (sources réseau), None = illimité
+    """
+    if manifest.get("code") != code_hash:
+        return None
+    entry = manifest.get("categories", {}).get(category)
+    if not entry or entry.get("input_hash") != input_hash:
+        return None
+    if max_age is not None and time.time() - entry.get("built_at", 0) > max_age:
+        return None
+    return entry.get("ranks")
+
+
+def recorded_ranks(manifest, snapshot_name):
+    """Tables de rangs brutes du snapshot enregistré dans le manifeste, ou None
+
+    Le manifeste décrit le dernier snapshot écrit par le build : ses tables
+    (catégorie -> ISO3 -> rang) ne valent que pour ce fichier.
+    """
+    if not snapshot_name or manifest.get("snapshot") != snapshot_name:
+        return None
+    return {category: entry.get("ranks", {}) for category, entry in manifest.get("categories", {}).items()}
+
+
+def record_category(manifest, category, input_hash, ranks):
+    """Enregistre la table de rangs calculée d'une catégorie dans le manifeste"""
+    manifest.setdefault("categories", {})[category] = {
+        "input_hash": input_hash,
+        "built_at": time.time(),
+        "ranks": ranks,
+    }
@@ -0,0 +1,175 @@
+"""
+Point d'entrée en ligne de commande de l'ETL
+
+Sous-commandes :
+    build      génère le snapshot (toutes les catégories modifiées, ou --category)
+    validate   vérifie la structure d'un snapshot (--quality : et ses données)
+    diff       compare deux snapshots (pays ajoutés / retirés, rangs modifiés)
+
+Les modules lourds (requests, SPARQLWrapper, pycountry, NumPy, etl) ne sont
+importés que par les sous-commandes qui en ont besoin : validate et diff ne
+chargent que la bibliothèque standard (cible de démarrage mesurée par
+bench/bench_startup.py).
+
+Usage :
+    python cli.py build [--category gdp --category rice] [--full] [--local-only]
+    python cli.py validate ../snapshot/snapshot-2025-11.json [--quality]
+    python cli.py diff ../snapshot/snapshot-2025-10.json ../snapshot/snapshot-2025-11.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+SNAPSHOT_DIR = Path(__file__).parent.parent / "snapshot"
+# Nombre de plus fortes variations de rang affichées par diff
+TOP_CHANGES = 10
+
+
+def _latest_snapshot():
+    snapshots = sorted(SNAPSHOT_DIR.glob("snapshot-????-??.json"))
+    if not snapshots:
+        raise SystemExit(f"Aucun snapshot dans {SNAPSHOT_DIR}")
+    return snapshots[-1]
+
+
+def _load(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"[ERREUR] Impossible de lire {path}: {e}")
+
+
+def _codes(codes, limit=TOP_CHANGES * 2):
+    codes = list(codes)
+    return " ".join(codes[:limit]) + (f" ... (+{len(codes) - limit})" if len(codes) > limit else "")
+
+
+def cmd_build(args):
+    # La configuration de l'ETL est lue à l'import : les options passent par l'environnement
+    if args.local_only:
+        os.environ["USE_LOCAL_ONLY"] = "true"
+    if args.no_publish:
+        os.environ["ETL_PUBLISH"] = "false"
+    if args.no_puzzles:
+        os.environ["ETL_PUZZLES"] = "false"
+    if args.indexes:
+        os.environ["ETL_SNAPSHOT_INDEXES"] = "true"
+    import etl
+
+    try:
+        etl.generate_snapshot(full_rebuild=args.full or None, season=args.season, categories=args.category)
+    except ValueError as e:
+        raise SystemExit(f"[ERREUR] {e}")
+    return 0
+
+
+def cmd_validate(args):
+    from validation import validate_snapshot
+
+    path = Path(args.snapshot) if args.snapshot else _latest_snapshot()
+    snapshot = _load(path)
+    problems = validate_snapshot(snapshot)
+    if problems:
+        print(f"[ERREUR] {path.name}: {len(problems)} probleme(s)")
+        for problem in problems:
+            print(f"  - {problem}")
+        return 1
+    sections = "avec index" if "indexes" in snapshot else "sans index"
+    print(f"[OK] {path.name}: {len(snapshot['countries'])} pays, {sections}")
+    if args.quality:
+        # Contrôle des données (NumPy) : seulement sur demande
+        from build_manifest import load_manifest, recorded_ranks
+        from quality import check_model, format_report, load_model, season_model
+
+        # Rangs absents connus par le manifeste de build s'il décrit ces fichiers
+        manifest = load_manifest(path.parent / "build-manifest.json")
+        previous = None
+        if args.previous:
+            previous = load_model(args.previous, recorded_ranks(manifest, Path(args.previous).name))
+        report = check_model(season_model(snapshot, recorded_ranks(manifest, path.name)), previous,
+                             snapshot["countries"])
+        print("\n".join(format_report(report)))
+        return 0 if report["ok"] else 1
+    return 0
+
+
+def cmd_diff(args):
+    from snapshot_delta import diff_snapshots
+
+    try:
+        previous_data = Path(args.previous).read_bytes()
+        current_data = Path(args.current).read_bytes()
+    except OSError as e:
+        raise SystemExit(f"[ERREUR] Impossible de lire {e.filename}: {e.strerror}")
+    delta = diff_snapshots(previous_data, current_data)
+    if args.json:
+        print(json.dumps(delta, ensure_ascii=False, indent=2))
+        return 0
+
+    previous = json.loads(previous_data)["countries"]
+    current = json.loads(current_data)["countries"]
+    print(f"{delta['from']['season']} -> {delta['to']['season']}")
+    print(f"  Pays ajoutes: {len(delta['added'])} {_codes(delta['added'])}".rstrip())
+    print(f"  Pays retires: {len(delta['removed'])} {_codes(delta['removed'])}".rstrip())
+    print(f"  Pays remplaces (nom, drapeau ou categories): {len(delta['replaced'])}")
+    print(f"  Pays dont un rang change: {len(delta['changed'])}")
+
+    moves = []
+    per_category = {}
+    for iso3, ranks in delta["changed"].items():
+        for category, rank in ranks.items():
+            per_category[category] = per_category.get(category, 0) + 1
+            moves.append((previous[iso3]["ranks"][category] - rank, iso3, category, rank))
+    for category, count in per_category.items():
+        print(f"    {category:<14} {count} rang(s) modifie(s)")
+    if moves:
+        print("  Plus fortes variations (positif = meilleur classement) :")
+        for change, iso3, category, rank in sorted(moves, key=lambda move: (-abs(move[0]), move[1]))[:args.top]:
+            print(f"    {iso3} {current[iso3]['name']:<28} {category:<14} {rank + change:>4} -> {rank:<4} ({change:+d})")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="ETL du snapshot Géo Challenge")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Génère le snapshot de la saison")
+    build.add_argument("--category", action="append",
+                       help="Catégorie à recalculer (répétable) ; les autres sont reprises du manifeste")
+    build.add_argument("--full", action="store_true", help="Reconstruire toutes les catégories")
+    build.add_argument("--season", help="Saison YYYY-MM, en cours ou future "
+                                        "(défaut : mois en cours ; saisons passées : backfill.py)")
+    build.add_argument("--local-only", action="store_true", help="Fichiers de data/ uniquement (USE_LOCAL_ONLY)")
+    build.add_argument("--no-publish", action="store_true", help="Ne pas publier pour le frontend")
+    build.add_argument("--no-puzzles", action="store_true", help="Ne pas générer les puzzles quotidiens")
+    build.add_argument("--indexes", action="store_true",
+                       help="Ajouter la section indexes au snapshot (ETL_SNAPSHOT_INDEXES)")
+    build.set_defaults(handler=cmd_build)
+
+    validate = commands.add_parser("validate", help="Vérifie la structure d'un snapshot")
+    validate.add_argument("snapshot", nargs="?", help="Snapshot JSON (défaut : le plus récent de snapshot/)")
+    validate.add_argument("--quality", action="store_true",
+                          help="Contrôle qualité des données (codes, rangs, couverture)")
+    validate.add_argument("--previous", help="Saison précédente pour --quality (sauts de rang)")
+    validate.set_defaults(handler=cmd_validate)
+
+    diff = commands.add_parser("diff", help="Compare deux snapshots")
+    diff.add_argument("previous", help="Snapshot de référence")
+    diff.add_argument("current", help="Snapshot comparé")
+    diff.add_argument("--top", type=int, default=TOP_CHANGES, help=f"Variations affichées (défaut {TOP_CHANGES})")
+    diff.add_argument("--json", action="store_true", help="Afficher le delta brut (format snapshot_delta)")
+    diff.set_defaults(handler=cmd_diff)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
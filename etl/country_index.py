@@ -0,0 +1,263 @@
+"""
+Résolution des noms et codes de pays vers ISO3
+
+L'index est construit une seule fois (noms officiels, courants et alternatifs
+de pycountry, COUNTRY_NAME_MAPPING, orthographes World Bank, codes FIFA) :
+chaque recherche est ensuite une lecture de dictionnaire. La recherche floue
+de pycountry n'est utilisée que pour les vrais manques, et son résultat est
+mémorisé. Les noms non résolus sont comptés pour le rapport de fin d'ETL.
+pycountry (et sa base de pays) n'est chargé qu'à la première recherche.
+"""
+
+import re
+import threading
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+
+# Mapping de noms de pays vers ISO3 (pour les cas spéciaux)
+COUNTRY_NAME_MAPPING = {
+    # Variations communes
+    "United States": "USA",
+    "United States of America": "USA",
+    "USA": "USA",
+    "US": "USA",
+    "United Kingdom": "GBR",
+    "UK": "GBR",
+    "Russia": "RUS",
+    "Russian Federation": "RUS",
+    "South Korea": "KOR",
+    "Korea, Rep.": "KOR",
+    "Korea, South": "KOR",
+    "North Korea": "PRK",
+    "Korea, Dem. People's Rep.": "PRK",
+    "Korea, North": "PRK",
+    "Iran": "IRN",
+    "Iran, Islamic Rep.": "IRN",
+    "Venezuela": "VEN",
+    "Venezuela, RB": "VEN",
+    "Syria": "SYR",
+    "Syrian Arab Republic": "SYR",
+    "Egypt": "EGY",
+    "Egypt, Arab Rep.": "EGY",
+    "Laos": "LAO",
+    "Lao PDR": "LAO",
+    "Myanmar": "MMR",
+    "Burma": "MMR",
+    "Czech Republic": "CZE",
+    "Czechia": "CZE",
+    "Macedonia": "MKD",
+    "North Macedonia": "MKD",
+    "Moldova": "MDA",
+    "Moldova, Republic of": "MDA",
+    "Palestine": "PSE",
+    "West Bank and Gaza": "PSE",
+    "Yemen": "YEM",
+    "Yemen, Rep.": "YEM",
+    "Congo": "COG",
+    "Congo, Rep.": "COG",
+    "Congo, Dem. Rep.": "COD",
+    "DR Congo": "COD",
+    "Democratic Republic of the Congo": "COD",
+    "Tanzania": "TZA",
+    "Tanzania, United Rep. of": "TZA",
+    "Gambia": "GMB",
+    "Gambia, The": "GMB",
+    "Bahamas": "BHS",
+    "Bahamas, The": "BHS",
+    "Kyrgyzstan": "KGZ",
+    "Kyrgyz Republic": "KGZ",
+    # Noms usuels absents de pycountry
+    "Turkey": "TUR",
+    "Ivory Coast": "CIV",
+    "Cape Verde": "CPV",
+    "East Timor": "TLS",
+    "Swaziland": "SWZ",
+    "Micronesia": "FSM",
+    "Vatican City": "VAT",
+    "Kosovo": "XKX",
+}
+
+# Orthographes propres à la World Bank (champ country.value de l'API v2)
+WORLD_BANK_NAME_MAPPING = {
+    "Cote d'Ivoire": "CIV",
+    "Curacao": "CUW",
+    "Hong Kong SAR, China": "HKG",
+    "Macao SAR, China": "MAC",
+    "Micronesia, Fed. Sts.": "FSM",
+    "St. Kitts and Nevis": "KNA",
+    "St. Lucia": "LCA",
+    "St. Martin (French part)": "MAF",
+    "St. Vincent and the Grenadines": "VCT",
+    "Turkiye": "TUR",
+    "Virgin Islands (U.S.)": "VIR",
+    "Slovak Republic": "SVK",
+    "Somalia, Fed. Rep.": "SOM",
+}
+
+# Codes FIFA qui diffèrent de l'ISO3 (les nations britanniques sont regroupées sous GBR)
+FIFA_CODE_MAPPING = {
+    "ENG": "GBR", "SCO": "GBR", "WAL": "GBR", "NIR": "GBR",
+    "POR": "PRT", "NED": "NLD", "GER": "DEU", "CRO": "HRV", "URU": "URY",
+    "SUI": "CHE", "DEN": "DNK", "ALG": "DZA", "PAR": "PRY", "GRE": "GRC",
+    "CRC": "CRI", "CHI": "CHL", "KSA": "SAU", "RSA": "ZAF", "UAE": "ARE",
+    "HON": "HND", "OMA": "OMN", "KOS": "XKX", "GUI": "GIN", "HAI": "HTI",
+    "BUL": "BGR", "ANG": "AGO", "ZAM": "ZMB", "GUA": "GTM", "TRI": "TTO",
+    "PLE": "PSE", "EQG": "GNQ", "MAD": "MDG", "NIG": "NER", "VIE": "VNM",
+    "TAN": "TZA", "MTN": "MRT", "MAS": "MYS", "GAM": "GMB", "TOG": "TGO",
+    "ZIM": "ZWE", "NCA": "NIC", "CGO": "COG", "KUW": "KWT", "PHI": "PHL",
+    "BOT": "BWA", "CTA": "CAF", "LES": "LSO", "SKN": "KNA", "SOL": "SLB",
+    "FIJ": "FJI", "PUR": "PRI", "TAH": "PYF", "VAN": "VUT", "MYA": "MMR",
+    "GRN": "GRD", "BER": "BMU", "VIN": "VCT", "TPE": "TWN", "MRI": "MUS",
+    "CHA": "TCD", "CAM": "KHM", "BAN": "BGD", "NEP": "NPL", "ASA": "ASM",
+    "SAM": "WSM", "BRU": "BRN", "BHU": "BTN", "ARU": "ABW", "SRI": "LKA",
+    "CAY": "CYM", "TGA": "TON", "BAH": "BHS", "SEY": "SYC", "ESW": "SWZ",
+}
+
+# Codes ISO3 attribués par usage (absents de pycountry)
+EXTRA_ISO3 = {"XKX"}
+
+_unresolved = Counter()
+_unresolved_lock = threading.Lock()
+
+
+def _normalize_key(name):
+    """Clé de recherche : sans accents, minuscules, ponctuation réduite à des espaces"""
+    name = unicodedata.normalize('NFKD', name)
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    name = name.casefold().replace("&", " and ")
+    name = re.sub(r"[^a-z0-9]+", " ", name).strip()
+    if name.startswith("the "):
+        name = name[4:]
+    return name
+
+
+@lru_cache(maxsize=None)
+def _iso3_codes():
+    import pycountry
+    return frozenset(country.alpha_3 for country in pycountry.countries) | EXTRA_ISO3
+
+
+@lru_cache(maxsize=None)
+def _name_index():
+    """Construit (une seule fois) l'index nom normalisé -> ISO3"""
+    import pycountry
+    index = {}
+    for country in pycountry.countries:
+        for attribute in ("alpha_3", "alpha_2", "name", "official_name", "common_name"):
+            value = getattr(country, attribute, None)
+            if value:
+                index.setdefault(_normalize_key(value), country.alpha_3)
+    # Les mappings manuels sont prioritaires sur pycountry
+    for mapping in (WORLD_BANK_NAME_MAPPING, COUNTRY_NAME_MAPPING):
+        for name, iso3 in mapping.items():
+            index[_normalize_key(name)] = iso3
+    return index
+
+
+@lru_cache(maxsize=4096)
+def _fuzzy_lookup(name):
+    """Recherche floue pycountry, mémorisée (uniquement pour les vrais manques)"""
+    import pycountry
+    try:
+        matches = pycountry.countries.search_fuzzy(name)
+    except (LookupError, AttributeError):
+        return None
+    return matches[0].alpha_3 if matches else None
+
+
+def is_iso3(code):
+    """True si code est un ISO3 de pays connu"""
+    return code in _iso3_codes()
+
+
+def resolve_iso3(name, fuzzy=True):
+    """Résout un nom de pays (ou un code) en ISO3
+
+    Args:
+        name: Nom du pays, dans n'importe quelle orthographe connue
+        fuzzy: Autoriser la recherche floue pycountry en dernier recours
+
+    Returns:
+        str: Code ISO3, ou None si le nom n'est pas reconnu
+    """
+    if not name:
+        return None
+    name = name.strip()
+    index = _name_index()
+
+    # Le nom complet puis des variations (sans virgules, avant la virgule, avant la parenthèse)
+    variations = (
+        name,
+        name.replace(",", ""),
+        name.split(",")[0],
+        name.split("(")[0],
+    )
+    for variation in variations:
+        iso3 = index.get(_normalize_key(variation))
+        if iso3:
+            return iso3
+
+    iso3 = _fuzzy_lookup(name) if fuzzy else None
+    if iso3 is None:
+        with _unresolved_lock:
+            _unresolved[name] += 1
+    return iso3
+
+
+def resolve_iso3_bulk(names, fuzzy=True):
+    """Résout une série de noms en une passe (chaque nom distinct n'est cherché qu'une fois)
+
+    Returns:
+        dict: Nom -> ISO3 (None si le nom n'est pas reconnu)
+    """
+    return {name: resolve_iso3(name, fuzzy) for name in dict.fromkeys(names)}
+
+
+def resolve_code(code):
+    """Convertit un code pays des fichiers data/ (ISO3 ou FIFA) en ISO3
+
+    Returns:
+        str: Code ISO3, ou None si le code n'est pas reconnu
+    """
+    if not code:
+        return None
+    code = code.strip().upper()
+    if is_iso3(code):
+        return code
+    if code in FIFA_CODE_MAPPING:
+        return FIFA_CODE_MAPPING[code]
+    return resolve_iso3(code, fuzzy=False)
+
+
+def normalize_rank_codes(ranks):
+    """Convertit les clés d'une table de rangs en ISO3
+
+    Les codes non reconnus sont conservés tels quels (et signalés dans le
+    rapport). Si deux codes désignent le même pays (ex: ENG et SCO), le
+    meilleur rang est conservé.
+    """
+    normalized = {}
+    for code, rank in ranks.items():
+        iso3 = resolve_code(code) or code
+        if iso3 not in normalized or rank < normalized[iso3]:
+            normalized[iso3] = rank
+    return normalized
+
+
+def unresolved_names():
+    """Retourne les noms non résolus avec leur nombre d'occurrences"""
+    with _unresolved_lock:
+        return dict(_unresolved)
+
+
+def unresolved_report():
+    """Affiche le rapport des noms et codes non résolus"""
+    unresolved = unresolved_names()
+    if not unresolved:
+        print("[OK] Tous les noms de pays ont ete resolus en ISO3")
+        return unresolved
+    print(f"[ATTENTION] {len(unresolved)} nom(s) de pays non resolu(s) :")
+    for name, count in sorted(unresolved.items(), key=lambda item: (-item[1], item[0])):
+        print(f"  - {name} ({count}x)")
+    return unresolved
@@ -5,176 +5,85 @@ Version améliorée avec mapping ISO3 robuste
 """
 
 import json
-import requests
 from pathlib import Path
 from datetime import datetime
-from SPARQLWrapper import SPARQLWrapper, JSON
 import os
-import pycountry
-import unicodedata
+import time
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from http_cache import CACHE_TTL
+from country_index import normalize_rank_codes, resolve_iso3, unresolved_report
+from metrics import METRICS
+from ranking import TIE_POLICY, rank_dict
+from snapshot_binary import write_binary_snapshot
+from snapshot_delta import previous_snapshot_file, serialize_snapshot, write_delta
+from snapshot_index import build_indexes, valid_masks
+from publish import PUBLISH_DIR, publish_snapshot
+from puzzles import generate_puzzles
+from quality import QUALITY_CHECKS, DataQualityError, check_countries, format_report, load_model
+from wikidata import capital_populations
+from world_bank import MRV as WORLD_BANK_MRV, bulk_latest_values
+from build_manifest import (
+    code_digest, load_manifest, record_category, recorded_ranks, reusable_ranks, save_manifest, source_digest,
+)
 
 # Configuration
 BASE_DIR = Path(__file__).parent.parent
 DATA_DIR = BASE_DIR / "data"
 SNAPSHOT_DIR = BASE_DIR / "snapshot"
-SNAPSHOT_DIR.mkdir(exist_ok=True)
-DATA_DIR.mkdir(exist_ok=True)
 
 # Option pour forcer l'utilisation des fichiers locaux (ignorer les APIs)
 # Mettez USE_LOCAL_ONLY = True pour toujours utiliser les fichiers JSON dans data/
 USE_LOCAL_ONLY = os.getenv('USE_LOCAL_ONLY', 'false').lower() == 'true'
 
-# Mapping de noms de pays vers ISO3 (pour les cas spéciaux)
-COUNTRY_NAME_MAPPING = {
-    # Variations communes
-    "United States": "USA",
-    "United States of America": "USA",
-    "USA": "USA",
-    "US": "USA",
-    "United Kingdom": "GBR",
-    "UK": "GBR",
-    "Russia": "RUS",
-    "Russian Federation": "RUS",
-    "South Korea": "KOR",
-    "Korea, Rep.": "KOR",
-    "Korea, South": "KOR",
-    "North Korea": "PRK",
-    "Korea, Dem. People's Rep.": "PRK",
-    "Korea, North": "PRK",
-    "Iran": "IRN",
-    "Iran, Islamic Rep.": "IRN",
-    "Venezuela": "VEN",
-    "Venezuela, RB": "VEN",
-    "Syria": "SYR",
-    "Syrian Arab Republic": "SYR",
-    "Egypt": "EGY",
-    "Egypt, Arab Rep.": "EGY",
-    "Laos": "LAO",
-    "Lao PDR": "LAO",
-    "Myanmar": "MMR",
-    "Burma": "MMR",
-    "Czech Republic": "CZE",
-    "Czechia": "CZE",
-    "Macedonia": "MKD",
-    "North Macedonia": "MKD",
-    "Moldova": "MDA",
-    "Moldova, Republic of": "MDA",
-    "Palestine": "PSE",
-    "West Bank and Gaza": "PSE",
-    "Yemen": "YEM",
-    "Yemen, Rep.": "YEM",
-    "Congo": "COG",
-    "Congo, Rep.": "COG",
-    "Congo, Dem. Rep.": "COD",
-    "DR Congo": "COD",
-    "Democratic Republic of the Congo": "COD",
-    "Tanzania": "TZA",
-    "Tanzania, United Rep. of": "TZA",
-    "Gambia": "GMB",
-    "Gambia, The": "GMB",
-    "Bahamas": "BHS",
-    "Bahamas, The": "BHS",
-    "Kyrgyzstan": "KGZ",
-    "Kyrgyz Republic": "KGZ",
-}
-
-# Mapping ISO3 vers drapeaux emoji (pour les pays principaux)
-# Note: Pour une solution complète, utiliser une bibliothèque comme countryflags
-FLAG_EMOJI_MAPPING = {
-    "FRA": "🇫🇷", "USA": "🇺🇸", "GBR": "🇬🇧", "DEU": "🇩🇪", "ITA": "🇮🇹",
-    "ESP": "🇪🇸", "RUS": "🇷🇺", "CHN": "🇨🇳", "JPN": "🇯🇵", "IND": "🇮🇳",
-    "BRA": "🇧🇷", "CAN": "🇨🇦", "AUS": "🇦🇺", "KOR": "🇰🇷", "MEX": "🇲🇽",
-    "IDN": "🇮🇩", "NLD": "🇳🇱", "BEL": "🇧🇪", "CHE": "🇨🇭", "SWE": "🇸🇪",
-    "POL": "🇵🇱", "ARG": "🇦🇷", "SAU": "🇸🇦", "TUR": "🇹🇷", "ZAF": "🇿🇦",
-    "EGY": "🇪🇬", "THA": "🇹🇭", "VNM": "🇻🇳", "PHL": "🇵🇭", "BGD": "🇧🇩",
-    "PAK": "🇵🇰", "IRN": "🇮🇷", "IRQ": "🇮🇶", "AFG": "🇦🇫", "NGA": "🇳🇬",
-    "ETH": "🇪🇹", "KEN": "🇰🇪", "UGA": "🇺🇬", "TZA": "🇹🇿", "GHA": "🇬🇭",
-    "MAR": "🇲🇦", "DZA": "🇩🇿", "TUN": "🇹🇳", "LBY": "🇱🇾", "SDN": "🇸🇩",
-    "COD": "🇨🇩", "CMR": "🇨🇲", "CIV": "🇨🇮", "SEN": "🇸🇳", "MLI": "🇲🇱",
-    "BFA": "🇧🇫", "NER": "🇳🇪", "TCD": "🇹🇩", "GIN": "🇬🇳", "GAB": "🇬🇦",
-    "COG": "🇨🇬", "CAF": "🇨🇫", "GNQ": "🇬🇶", "BEN": "🇧🇯", "TGO": "🇹🇬",
-    "MRT": "🇲🇷", "GMB": "🇬🇲", "GNB": "🇬🇼", "STP": "🇸🇹", "DJI": "🇩🇯",
-    "COM": "🇰🇲", "MUS": "🇲🇺", "SYC": "🇸🇨", "MDG": "🇲🇬", "RWA": "🇷🇼",
-    "BDI": "🇧🇮", "UGA": "🇺🇬", "KEN": "🇰🇪", "TZA": "🇹🇿", "MWI": "🇲🇼",
-    "ZMB": "🇿🇲", "ZWE": "🇿🇼", "BWA": "🇧🇼", "NAM": "🇳🇦", "LSO": "🇱🇸",
-    "SWZ": "🇸🇿", "MOZ": "🇲🇿", "AGO": "🇦🇴", "ZAF": "🇿🇦", "LBR": "🇱🇷",
-    "SLE": "🇸🇱", "GHA": "🇬🇭", "TGO": "🇹🇬", "BEN": "🇧🇯", "NGA": "🇳🇬",
-    "NLD": "🇳🇱", "BEL": "🇧🇪", "LUX": "🇱🇺", "CHE": "🇨🇭", "AUT": "🇦🇹",
-    "DEU": "🇩🇪", "POL": "🇵🇱", "CZE": "🇨🇿", "SVK": "🇸🇰", "HUN": "🇭🇺",
-    "ROU": "🇷🇴", "BGR": "🇧🇬", "GRC": "🇬🇷", "ALB": "🇦🇱", "MKD": "🇲🇰",
-    "SRB": "🇷🇸", "BIH": "🇧🇦", "HRV": "🇭🇷", "SVN": "🇸🇮", "ITA": "🇮🇹",
-    "FRA": "🇫🇷", "ESP": "🇪🇸", "PRT": "🇵🇹", "GBR": "🇬🇧", "IRL": "🇮🇪",
-    "ISL": "🇮🇸", "NOR": "🇳🇴", "SWE": "🇸🇪", "FIN": "🇫🇮", "DNK": "🇩🇰",
-    "EST": "🇪🇪", "LVA": "🇱🇻", "LTU": "🇱🇹", "BLR": "🇧🇾", "UKR": "🇺🇦",
-    "MDA": "🇲🇩", "RUS": "🇷🇺", "GEO": "🇬🇪", "ARM": "🇦🇲", "AZE": "🇦🇿",
-    "KAZ": "🇰🇿", "UZB": "🇺🇿", "TKM": "🇹🇲", "TJK": "🇹🇯", "KGZ": "🇰🇬",
-    "MNG": "🇲🇳", "CHN": "🇨🇳", "PRK": "🇰🇵", "KOR": "🇰🇷", "JPN": "🇯🇵",
-    "TWN": "🇹🇼", "HKG": "🇭🇰", "MAC": "🇲🇴", "MYS": "🇲🇾", "SGP": "🇸🇬",
-    "IDN": "🇮🇩", "BRN": "🇧🇳", "PHL": "🇵🇭", "VNM": "🇻🇳", "LAO": "🇱🇦",
-    "KHM": "🇰🇭", "THA": "🇹🇭", "MMR": "🇲🇲", "BGD": "🇧🇩", "BTN": "🇧🇹",
-    "NPL": "🇳🇵", "IND": "🇮🇳", "PAK": "🇵🇰", "AFG": "🇦🇫", "IRN": "🇮🇷",
-    "IRQ": "🇮🇶", "KWT": "🇰🇼", "BHR": "🇧🇭", "QAT": "🇶🇦", "ARE": "🇦🇪",
-    "OMN": "🇴🇲", "YEM": "🇾🇪", "SAU": "🇸🇦", "JOR": "🇯🇴", "LBN": "🇱🇧",
-    "SYR": "🇸🇾", "ISR": "🇮🇱", "PSE": "🇵🇸", "CYP": "🇨🇾", "TUR": "🇹🇷",
-    "EGY": "🇪🇬", "LBY": "🇱🇾", "TUN": "🇹🇳", "DZA": "🇩🇿", "MAR": "🇲🇦",
-    "MRT": "🇲🇷", "MLI": "🇲🇱", "NER": "🇳🇪", "TCD": "🇹🇩", "SDN": "🇸🇩",
-    "ERI": "🇪🇷", "ETH": "🇪🇹", "DJI": "🇩🇯", "SOM": "🇸🇴", "KEN": "🇰🇪",
-    "UGA": "🇺🇬", "RWA": "🇷🇼", "BDI": "🇧🇮", "TZA": "🇹🇿", "MWI": "🇲🇼",
-    "ZMB": "🇿🇲", "ZWE": "🇿🇼", "BWA": "🇧🇼", "NAM": "🇳🇦", "ZAF": "🇿🇦",
-    "LSO": "🇱🇸", "SWZ": "🇸🇿", "MOZ": "🇲🇿", "MDG": "🇲🇬", "MUS": "🇲🇺",
-    "SYC": "🇸🇨", "COM": "🇰🇲", "AGO": "🇦🇴", "COD": "🇨🇩", "CAF": "🇨🇫",
-    "TCD": "🇹🇩", "CMR": "🇨🇲", "GNQ": "🇬🇶", "GAB": "🇬🇦", "COG": "🇨🇬",
-    "GIN": "🇬🇳", "GNB": "🇬🇼", "SLE": "🇸🇱", "LBR": "🇱🇷", "CIV": "🇨🇮",
-    "GHA": "🇬🇭", "TGO": "🇹🇬", "BEN": "🇧🇯", "BFA": "🇧🇫", "MLI": "🇲🇱",
-    "SEN": "🇸🇳", "GMB": "🇬🇲", "MRT": "🇲🇷", "NGA": "🇳🇬", "NER": "🇳🇪",
-    "BRA": "🇧🇷", "ARG": "🇦🇷", "CHL": "🇨🇱", "PER": "🇵🇪", "BOL": "🇧🇴",
-    "PRY": "🇵🇾", "URY": "🇺🇾", "COL": "🇨🇴", "VEN": "🇻🇪", "GUY": "🇬🇾",
-    "SUR": "🇸🇷", "ECU": "🇪🇨", "PAN": "🇵🇦", "CRI": "🇨🇷", "NIC": "🇳🇮",
-    "HND": "🇭🇳", "SLV": "🇸🇻", "GTM": "🇬🇹", "BLZ": "🇧🇿", "MEX": "🇲🇽",
-    "CUB": "🇨🇺", "JAM": "🇯🇲", "HTI": "🇭🇹", "DOM": "🇩🇴", "PRI": "🇵🇷",
-    "CAN": "🇨🇦", "USA": "🇺🇸", "GRL": "🇬🇱", "NZL": "🇳🇿", "AUS": "🇦🇺",
-    "PNG": "🇵🇬", "FJI": "🇫🇯", "VUT": "🇻🇺", "NCL": "🇳🇨", "PYF": "🇵🇫",
-}
+# Points d'accès des APIs (surchargeables, ex: serveur local du banc d'essai etl/bench/)
+WORLD_BANK_API_URL = os.getenv('ETL_WORLD_BANK_API_URL', 'https://api.worldbank.org/v2')
+WIKIDATA_SPARQL_URL = os.getenv('ETL_WIKIDATA_SPARQL_URL', 'https://query.wikidata.org/sparql')
+
+# Délais (en secondes) de la récupération concurrente des sources
+# SOURCE_TIMEOUT : délai maximum par source avant de basculer sur son fallback
+# WORLD_BANK_TIMEOUT : délai d'une requête groupée World Bank. Les indicateurs de
+#   même année (small_area et gdp, historique complet, paginé, avec retries)
+#   partagent une tâche et donc ce délai ; military (2020) a sa propre tâche. Une
+#   tâche en retard ne fait basculer que ses propres catégories sur leur fallback
+# GLOBAL_TIMEOUT : délai maximum pour l'ensemble de l'étape de récupération
+SOURCE_TIMEOUT = float(os.getenv('ETL_SOURCE_TIMEOUT', '75'))
+WORLD_BANK_TIMEOUT = float(os.getenv('ETL_WORLD_BANK_TIMEOUT', '180'))
+GLOBAL_TIMEOUT = float(os.getenv('ETL_GLOBAL_TIMEOUT', '240'))
+
+# Build incrémental : les catégories dont les entrées n'ont pas changé sont reprises
+# du manifeste de build. Les sources réseau sont reprises tant qu'elles ont moins de
+# ETL_INCREMENTAL_TTL secondes. ETL_FULL_REBUILD=true force une reconstruction complète.
+BUILD_MANIFEST_FILE = SNAPSHOT_DIR / "build-manifest.json"
+INCREMENTAL_TTL = float(os.getenv('ETL_INCREMENTAL_TTL', str(CACHE_TTL)))
+FULL_REBUILD = os.getenv('ETL_FULL_REBUILD', 'false').lower() == 'true'
+# Fichiers dont dépend le calcul des rangs : toute modification invalide le manifeste
+BUILD_CODE_FILES = [Path(__file__), Path(__file__).parent / "country_index.py",
+                    Path(__file__).parent / "world_bank.py", Path(__file__).parent / "ranking.py",
+                    Path(__file__).parent / "wikidata.py"]
+
+# Index précalculés (section "indexes" du snapshot, voir snapshot_index) : désactivés
+# par défaut, ils font plus que doubler le snapshot publié (70 Ko -> 150 Ko)
+SNAPSHOT_INDEXES = os.getenv('ETL_SNAPSHOT_INDEXES', 'false').lower() == 'true'
+
+# Publication pour le frontend (fichier à empreinte, .gz/.br et latest.json, voir publish.py)
+PUBLISH = os.getenv('ETL_PUBLISH', 'true').lower() == 'true'
+
+# Puzzles quotidiens de la saison (snapshot/puzzles-YYYY-MM.json, voir puzzles.py) :
+# repris sans simulation si les rangs, la saison et les paramètres n'ont pas changé
+PUZZLES = os.getenv('ETL_PUZZLES', 'true').lower() == 'true'
+
+# Catégories du jeu, dans l'ordre du snapshot
+CATEGORIES = ["small_area", "gdp", "capital_pop", "military",
+              "football", "eez", "rice", "francophones"]
 
 def normalize_country_name(name):
-    """Normalise un nom de pays et retourne l'ISO3"""
-    if not name:
-        return None
-    
-    # Nettoyer le nom
-    name = name.strip()
-    name = unicodedata.normalize('NFKD', name)
-    
-    # Vérifier d'abord le mapping manuel
-    if name in COUNTRY_NAME_MAPPING:
-        return COUNTRY_NAME_MAPPING[name]
-    
-    # Essayer avec pycountry
-    try:
-        # Chercher par nom officiel
-        country = pycountry.countries.search_fuzzy(name)
-        if country:
-            return country[0].alpha_3
-    except (LookupError, AttributeError):
-        pass
-    
-    # Essayer avec des variations du nom
-    variations = [
-        name,
-        name.replace(",", ""),
-        name.split(",")[0].strip(),
-        name.split("(")[0].strip(),
-    ]
-    
-    for variation in variations:
-        try:
-            country = pycountry.countries.search_fuzzy(variation)
-            if country:
-                return country[0].alpha_3
-        except (LookupError, AttributeError):
-            continue
-    
-    return None
+    """Normalise un nom de pays et retourne l'ISO3
+
+    Lecture O(1) dans l'index de country_index (pycountry, mappings manuels,
+    orthographes World Bank) ; recherche floue mémorisée en dernier recours.
+    """
+    return resolve_iso3(name)
 
 def get_country_info(iso3):
     """Récupère les informations d'un pays (nom, drapeau) à partir de son ISO3
@@ -185,6 +94,7 @@ def get_country_info(iso3):
     if not iso3:
         return {"name": "Unknown", "flag": "https://flagcdn.com/w40/xx.png"}
     
+    import pycountry
     try:
         country = pycountry.countries.get(alpha_3=iso3)
         if country:
@@ -199,188 +109,127 @@ def get_country_info(iso3):
     
     # Fallback : essayer de trouver l'ISO2 manuellement pour quelques cas spéciaux
     iso3_to_iso2_fallback = {
-        "ENG": "gb",  # Angleterre (pas un pays ISO, mais utilisé dans FIFA)
+        "ENG": ("gb", "ENG"),  # Angleterre (pas un pays ISO, mais utilisé dans FIFA)
+        "XKX": ("xk", "Kosovo"),  # Code World Bank, absent de pycountry
     }
     
     if iso3 in iso3_to_iso2_fallback:
-        iso2 = iso3_to_iso2_fallback[iso3]
+        iso2, name = iso3_to_iso2_fallback[iso3]
         flag_url = f"https://flagcdn.com/w80/{iso2}.png"
-        return {"name": iso3, "flag": flag_url}
+        return {"name": name, "flag": flag_url}
     
     # Dernier recours
     return {"name": iso3, "flag": "https://flagcdn.com/w80/xx.png"}
 
-def get_world_bank_data(indicator, reverse=False, year=None, fallback_file=None):
+def get_world_bank_data(indicator, reverse=False, year=None, fallback_file=None, category=None):
     """Récupère les données de la World Bank API avec fallback
     
     Args:
         indicator: Code de l'indicateur World Bank
         reverse: True pour tri décroissant (plus grand = meilleur), False pour croissant
-        year: Année spécifique (None pour toutes les années, prend la dernière disponible)
+        year: Année spécifique (None pour toutes les années, ou les ETL_WORLD_BANK_MRV
+              dernières, en prenant la dernière disponible)
         fallback_file: Nom du fichier de secours dans data/ si l'API échoue
+        category: Catégorie du snapshot (clé des fallbacks dans les métriques,
+            défaut : l'indicateur)
     """
-    # Si USE_LOCAL_ONLY est activé, utiliser directement le fichier local
-    if USE_LOCAL_ONLY and fallback_file:
-        print(f"  [LOCAL] Utilisation forcee du fichier local: {fallback_file}")
-        fallback_data = load_local_dataset(fallback_file)
-        fallback_ranks = fallback_data.get("ranks", {})
-        if fallback_ranks:
-            print(f"  [OK] {len(fallback_ranks)} pays charges depuis le fichier local")
-            return fallback_ranks
-        return {}
-    # Codes de régions World Bank à exclure (pas des pays ISO3)
-    REGION_CODES = {
-        'AFE', 'AFW', 'ARB', 'CEB', 'CSS', 'EAP', 'EAS', 'ECA', 'ECS', 'EMU',
-        'EUU', 'FCS', 'HIC', 'HPC', 'IBD', 'IBT', 'IDB', 'IDX', 'LAC', 'LCN',
-        'LDC', 'LIC', 'LMC', 'LMY', 'MEA', 'MIC', 'MNA', 'NAC', 'OED', 'OSS',
-        'PRE', 'PSS', 'PST', 'SAS', 'SSA', 'SSF', 'SST', 'TEA', 'TEC', 'TLA',
-        'TMN', 'TSA', 'TSS', 'UMC', 'WLD', 'EAR'
-    }
+    category = category or indicator
+    specs = [(category, {"indicator": indicator, "reverse": reverse, "year": year,
+                          "fallback_file": fallback_file})]
+    return get_world_bank_bulk(specs)[category]
+
+def get_world_bank_bulk(specs):
+    """Récupère plusieurs indicateurs World Bank en un minimum de requêtes
+    
+    Les indicateurs sont groupés dans les mêmes requêtes (voir
+    world_bank.bulk_latest_values) puis classés séparément ; chaque
+    catégorie garde son propre fallback.
+    
+    Args:
+        specs: Liste de (catégorie, arguments de get_world_bank_data)
+    
+    Returns:
+        dict: Catégorie -> dict ISO3 -> rang
+    """
+    results = {}
+    remote = []
+    for category, kwargs in specs:
+        # Si USE_LOCAL_ONLY est activé, utiliser directement le fichier local
+        if USE_LOCAL_ONLY and kwargs.get("fallback_file"):
+            print(f"  [LOCAL] Utilisation forcee du fichier local: {kwargs['fallback_file']}")
+            METRICS.fallback(category, "local_only", kwargs["fallback_file"])
+            results[category] = load_fallback_ranks(kwargs["fallback_file"], origin="local")
+        else:
+            remote.append((category, kwargs))
+    if not remote:
+        return results
     
-    # Pour certains indicateurs, utiliser une année spécifique ou toutes les années
-    if year:
-        url = f"https://api.worldbank.org/v2/country/all/indicator/{indicator}?format=json&per_page=500&date={year}"
-    else:
-        # Récupérer toutes les années et prendre la dernière disponible
-        url = f"https://api.worldbank.org/v2/country/all/indicator/{indicator}?format=json&per_page=500"
     try:
-        response = requests.get(url, timeout=60)
-        data = response.json()
-        if len(data) < 2:
-            return {}
-        
-        countries = {}
-        for item in data[1]:
-            if item.get('value') is not None:
-                iso3 = item.get('countryiso3code', '').strip().upper()
-                # Filtrer : seulement codes ISO3 valides de 3 lettres, exclure les régions
-                if iso3 and len(iso3) == 3 and iso3.isalpha() and iso3 not in REGION_CODES:
-                    # Vérifier que c'est un vrai code ISO3 avec pycountry (optionnel mais recommandé)
-                    is_valid_country = False
-                    try:
-                        country = pycountry.countries.get(alpha_3=iso3)
-                        is_valid_country = country is not None
-                    except (LookupError, AttributeError):
-                        # Si pycountry ne trouve pas, on accepte quand même (certains codes peuvent être valides mais absents de pycountry)
-                        is_valid_country = True
-                    
-                    if is_valid_country:
-                        year_data = item.get('date', '')
-                        value = float(item['value'])
-                        
-                        # Si on a plusieurs années, prendre la dernière disponible
-                        if iso3 not in countries or year_data > countries[iso3].get('year', ''):
-                            countries[iso3] = {
-                                'name': item.get('country', {}).get('value', ''),
-                                'value': value,
-                                'year': year_data
-                            }
+        # Toutes les pages sont lues (en parallèle), chaque pays réduit à sa dernière valeur
+        latest = bulk_latest_values(WORLD_BANK_API_URL,
+                                    {kwargs["indicator"]: kwargs.get("year") for _, kwargs in remote},
+                                    mrv=WORLD_BANK_MRV or None)
+        error = None
+    except Exception as e:
+        latest, error = {}, e
+    
+    for category, kwargs in remote:
+        indicator = kwargs["indicator"]
+        fallback_file = kwargs.get("fallback_file")
+        if indicator not in latest:
+            print(f"Erreur World Bank {indicator}: {error or 'indicateur absent de la reponse'}")
+            if fallback_file:
+                print(f"  [FALLBACK] Utilisation des donnees de secours: {fallback_file}")
+                METRICS.fallback(category, "error", fallback_file)
+                results[category] = load_fallback_ranks(fallback_file)
+            else:
+                results[category] = {}
+            continue
         
         # Calculer les rangs
-        sorted_countries = sorted(
-            countries.items(),
-            key=lambda x: x[1]['value'],
-            reverse=reverse
-        )
-        
-        ranks = {}
-        for rank, (iso3, data) in enumerate(sorted_countries, 1):
-            ranks[iso3] = rank
+        with METRICS.stage("rank", category):
+            ranks = latest[indicator].ranks(reverse=kwargs.get("reverse", False), ties=TIE_POLICY)
+        METRICS.incr(category, "countries_ranked", len(ranks))
         
         # Si aucun résultat ou très peu, utiliser le fallback
         if len(ranks) < 10 and fallback_file:
             print(f"  [FALLBACK] Seulement {len(ranks)} pays recuperes, utilisation du fichier de secours: {fallback_file}")
-            fallback_data = load_local_dataset(fallback_file)
-            fallback_ranks = fallback_data.get("ranks", {})
+            METRICS.fallback(category, "few_rows", fallback_file)
+            fallback_ranks = load_fallback_ranks(fallback_file)
             if fallback_ranks:
-                print(f"  [OK] {len(fallback_ranks)} pays charges depuis le fichier de secours")
-                return fallback_ranks
-        
-        return ranks
-    except Exception as e:
-        print(f"Erreur World Bank {indicator}: {e}")
-        if fallback_file:
-            print(f"  [FALLBACK] Utilisation des donnees de secours: {fallback_file}")
-            fallback_data = load_local_dataset(fallback_file)
-            fallback_ranks = fallback_data.get("ranks", {})
-            if fallback_ranks:
-                print(f"  [OK] {len(fallback_ranks)} pays charges depuis le fichier de secours")
-                return fallback_ranks
-        return {}
+                ranks = fallback_ranks
+        results[category] = ranks
+    return results
 
-def get_wikidata_capital_population(fallback_file=None):
+def get_wikidata_capital_population(fallback_file=None, category="capital_pop"):
     """Récupère la population des capitales via Wikidata SPARQL avec extraction ISO3
     
+    Une valeur par pays, agrégée par le serveur (voir wikidata.capital_populations).
+    
     Args:
         fallback_file: Nom du fichier de secours dans data/ si l'API échoue
+        category: Catégorie du snapshot (clé des fallbacks dans les métriques)
     """
     # Si USE_LOCAL_ONLY est activé, utiliser directement le fichier local
     if USE_LOCAL_ONLY and fallback_file:
         print(f"  [LOCAL] Utilisation forcee du fichier local: {fallback_file}")
-        fallback_data = load_local_dataset(fallback_file)
-        fallback_ranks = fallback_data.get("ranks", {})
-        if fallback_ranks:
-            print(f"  [OK] {len(fallback_ranks)} pays charges depuis le fichier local")
-            return fallback_ranks
-        return {}
-    sparql = SPARQLWrapper("https://query.wikidata.org/sparql")
-    query = """
-    SELECT ?country ?countryLabel ?capital ?capitalLabel ?population ?iso3 WHERE {
-      ?country wdt:P31 wd:Q6256 .
-      ?country wdt:P36 ?capital .
-      ?capital wdt:P1082 ?population .
-      OPTIONAL { ?country wdt:P298 ?iso3 . }
-      SERVICE wikibase:label { bd:serviceParam wikibase:language "en" }
-    }
-    ORDER BY DESC(?population)
-    LIMIT 200
-    """
-    
+        METRICS.fallback(category, "local_only", fallback_file)
+        return load_fallback_ranks(fallback_file, origin="local")
     try:
-        sparql.setQuery(query)
-        sparql.setReturnFormat(JSON)
-        results = sparql.query().convert()
-        
-        countries = {}
-        for result in results["results"]["bindings"]:
-            country_label = result.get("countryLabel", {}).get("value", "")
-            population = float(result.get("population", {}).get("value", 0))
-            
-            # Essayer d'abord d'extraire l'ISO3 depuis Wikidata
-            iso3 = None
-            if "iso3" in result:
-                iso3_raw = result.get("iso3", {}).get("value", "")
-                if iso3_raw:
-                    iso3 = iso3_raw.strip().upper()
-            
-            # Si pas d'ISO3 dans Wikidata, utiliser le nom du pays
-            if not iso3 or len(iso3) != 3:
-                iso3 = normalize_country_name(country_label)
-            
-            if iso3 and len(iso3) == 3 and population > 0:
-                countries[iso3] = {
-                    'name': country_label,
-                    'value': population
-                }
+        # Une ligne par pays (population maximale de ses capitales), lue par pages
+        populations = capital_populations(WIKIDATA_SPARQL_URL, timeout=60)
         
         # Calculer les rangs
-        sorted_countries = sorted(
-            countries.items(),
-            key=lambda x: x[1]['value'],
-            reverse=True
-        )
-        
-        ranks = {}
-        for rank, (iso3, data) in enumerate(sorted_countries, 1):
-            ranks[iso3] = rank
+        with METRICS.stage("rank", category):
+            ranks = rank_dict(populations, descending=True, ties=TIE_POLICY)
+        METRICS.incr(category, "countries_ranked", len(ranks))
         
         # Si aucun résultat ou très peu, utiliser le fallback
         if len(ranks) < 10 and fallback_file:
             print(f"  [FALLBACK] Seulement {len(ranks)} pays recuperes, utilisation du fichier de secours: {fallback_file}")
-            fallback_data = load_local_dataset(fallback_file)
-            fallback_ranks = fallback_data.get("ranks", {})
+            METRICS.fallback(category, "few_rows", fallback_file)
+            fallback_ranks = load_fallback_ranks(fallback_file)
             if fallback_ranks:
-                print(f"  [OK] {len(fallback_ranks)} pays charges depuis le fichier de secours")
                 return fallback_ranks
         
         return ranks
@@ -388,11 +237,8 @@ def get_wikidata_capital_population(fallback_file=None):
         print(f"Erreur Wikidata: {e}")
         if fallback_file:
             print(f"  [FALLBACK] Utilisation des donnees de secours: {fallback_file}")
-            fallback_data = load_local_dataset(fallback_file)
-            fallback_ranks = fallback_data.get("ranks", {})
-            if fallback_ranks:
-                print(f"  [OK] {len(fallback_ranks)} pays charges depuis le fichier de secours")
-                return fallback_ranks
+            METRICS.fallback(category, "error", fallback_file)
+            return load_fallback_ranks(fallback_file)
         return {}
 
 def load_local_dataset(filename):
@@ -410,102 +256,292 @@ def load_local_dataset(filename):
         return {}
     
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            print(f"  [OK] Fichier {filename} charge")
-            return data
+        with METRICS.stage("load", filename):
+            raw = filepath.read_bytes()
+            data = json.loads(raw)
+        METRICS.incr(filename, "bytes_read", len(raw))
+        print(f"  [OK] Fichier {filename} charge")
+        return data
     except Exception as e:
         print(f"  [ERREUR] Impossible de charger {filename}: {e}")
         return {}
 
-def normalize_countries(all_ranks):
-    """Normalise tous les pays et crée la structure finale avec noms et drapeaux"""
+def load_fallback_ranks(fallback_file, origin="de secours"):
+    """Charge les rangs d'un fichier de secours (ou local) dans data/
+
+    Args:
+        fallback_file: Nom du fichier dans le dossier data/
+        origin: Libellé affiché dans les logs ("de secours" ou "local")
+
+    Returns:
+        dict: Rangs ISO3 -> rang, ou {} si le fichier est absent ou vide
+    """
+    fallback_ranks = normalize_rank_codes(load_local_dataset(fallback_file).get("ranks", {}))
+    if fallback_ranks:
+        print(f"  [OK] {len(fallback_ranks)} pays charges depuis le fichier {origin}")
+    return fallback_ranks
+
+def load_local_ranks(filename):
+    """Charge les rangs d'un dataset local (FIFA, ZEE, riz, francophones)
+
+    Les codes FIFA (GER, NED, SUI...) sont convertis en ISO3.
+    """
+    return normalize_rank_codes(load_local_dataset(filename).get("ranks", {}))
+
+def build_country_ranks(all_ranks, iso3, categories=None):
+    """Construit le dict des rangs d'un pays (196 = dernier par défaut)"""
+    ranks = {}
+    for category in categories or CATEGORIES:
+        rank = all_ranks.get(category, {}).get(iso3)
+        ranks[category] = rank if rank else 196  # Par défaut dernier
+    return ranks
+
+def normalize_countries(all_ranks, previous_countries=None, changed_categories=None):
+    """Normalise tous les pays et crée la structure finale avec noms et drapeaux
+
+    Args:
+        all_ranks: Catégorie -> dict ISO3 -> rang
+        previous_countries: Pays du snapshot précédent (build incrémental)
+        changed_categories: Catégories recalculées depuis previous_countries ;
+            seules ces colonnes de rangs sont mises à jour pour les pays existants
+    """
     # Récupérer tous les ISO3 uniques
     all_iso3 = set()
     for category_ranks in all_ranks.values():
         all_iso3.update(category_ranks.keys())
     
+    incremental = previous_countries is not None and changed_categories is not None
+    
     # Créer la structure finale avec les vraies informations
+    # (ordre ISO3 stable pour des snapshots reproductibles et des deltas minimaux)
     countries = {}
-    for iso3 in all_iso3:
+    for iso3 in sorted(all_iso3):
         if not iso3 or len(iso3) != 3:
             continue
         
+        previous = previous_countries.get(iso3) if incremental else None
+        if previous is not None:
+            # Pays déjà connu : ne patcher que les colonnes modifiées
+            ranks = dict(previous["ranks"])
+            ranks.update(build_country_ranks(all_ranks, iso3, changed_categories))
+            countries[iso3] = {"name": previous["name"], "flag": previous["flag"], "ranks": ranks}
+            continue
+        
         # Récupérer les informations du pays
         country_info = get_country_info(iso3)
         
         countries[iso3] = {
             "name": country_info["name"],
             "flag": country_info["flag"],
-            "ranks": {}
+            "ranks": build_country_ranks(all_ranks, iso3)
         }
-        
-        # Remplir les rangs pour chaque catégorie
-        for category in ["small_area", "gdp", "capital_pop", "military", 
-                        "football", "eez", "rice", "francophones"]:
-            rank = all_ranks.get(category, {}).get(iso3)
-            countries[iso3]["ranks"][category] = rank if rank else 196  # Par défaut dernier
     
     return countries
 
-def generate_snapshot():
-    """Génère le snapshot complet"""
-    print("Génération du snapshot Géo Challenge...")
-    print("=" * 60)
-    
+# Sources du snapshot : (catégorie, libellé, fonction, arguments, fichier de secours)
+# Les sources réseau sont lancées en parallèle des lectures locales par fetch_all_ranks
+SNAPSHOT_SOURCES = [
+    ("small_area", "Petite superficie (World Bank)", get_world_bank_data,
+     {"indicator": "AG.LND.TOTL.K2", "reverse": False}, "small_area_fallback.json"),
+    ("gdp", "PIB global (World Bank)", get_world_bank_data,
+     {"indicator": "NY.GDP.MKTP.CD", "reverse": True}, "gdp_fallback.json"),
+    ("capital_pop", "Grande capitale (Wikidata)", get_wikidata_capital_population,
+     {}, "capital_pop_fallback.json"),
+    ("military", "Taille de l'armée (World Bank)", get_world_bank_data,
+     {"indicator": "MS.MIL.TOTL.P1", "reverse": True, "year": 2020}, "military_fallback.json"),
+    ("football", "Classement FIFA (local)", load_local_ranks,
+     {"filename": "fifa_ranking.json"}, None),
+    ("eez", "Taille ZEE (local)", load_local_ranks,
+     {"filename": "eez_data.json"}, None),
+    ("rice", "Production de riz (local)", load_local_ranks,
+     {"filename": "rice_production.json"}, None),
+    ("francophones", "Francophones (local)", load_local_ranks,
+     {"filename": "francophones.json"}, None),
+]
+
+def _timed_source(category, loader, kwargs):
+    """Exécute une source en mesurant sa durée totale (fallback compris)"""
+    with METRICS.stage("source", category):
+        return loader(**kwargs)
+
+def _start_source(name, loader, kwargs):
+    """Lance une source dans un thread démon et renvoie son Future
+
+    Une requête bloquée ne peut pas être interrompue : le thread démon
+    abandonné après un délai n'empêche pas l'interpréteur de se terminer
+    (contrairement aux threads d'un ThreadPoolExecutor).
+    """
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(_timed_source(name, loader, kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=f"etl-source-{name}", daemon=True).start()
+    return future
+
+def fetch_all_ranks(sources=None, source_timeout=None, global_timeout=None, world_bank_timeout=None):
+    """Récupère les rangs de toutes les sources en parallèle
+
+    Chaque source tourne dans son propre thread ; les indicateurs World Bank
+    de même année partagent une tâche (une requête multi-indicateurs, comme
+    dans world_bank.bulk_latest_values) avec le délai WORLD_BANK_TIMEOUT. Une
+    catégorie absente de la réponse d'une tâche bascule seule sur son
+    fichier de secours (voir get_world_bank_bulk). Une source qui
+    dépasse son délai (ou le délai global) bascule sur son fichier de secours,
+    exactement comme si l'API avait échoué. Le temps total est donc proche de celui de la
+    source la plus lente, et non plus de la somme de toutes les sources.
+
+    Args:
+        sources: Liste de sources au format SNAPSHOT_SOURCES (par défaut toutes)
+        source_timeout: Délai maximum par source en secondes (défaut SOURCE_TIMEOUT)
+        global_timeout: Délai maximum pour l'ensemble en secondes (défaut GLOBAL_TIMEOUT)
+        world_bank_timeout: Délai maximum par tâche World Bank en secondes
+            (défaut WORLD_BANK_TIMEOUT)
+
+    Returns:
+        dict: Catégorie -> dict ISO3 -> rang
+    """
+    sources = SNAPSHOT_SOURCES if sources is None else sources
+    source_timeout = SOURCE_TIMEOUT if source_timeout is None else source_timeout
+    global_timeout = GLOBAL_TIMEOUT if global_timeout is None else global_timeout
+    world_bank_timeout = WORLD_BANK_TIMEOUT if world_bank_timeout is None else world_bank_timeout
+
+    start = time.monotonic()
+    # Le délai global borne l'ensemble ; le délai par source court depuis le lancement de chaque source
+    global_deadline = start + global_timeout
+    # Les indicateurs World Bank de même année partagent une tâche (requête groupée)
+    groups = {}
+    for source in sources:
+        if source[2] is get_world_bank_data:
+            groups.setdefault(source[3].get("year"), []).append(source)
+    tasks = []
+    for year, group in groups.items():
+        specs = [(category, dict(kwargs, fallback_file=fallback_file))
+                 for category, _, _, kwargs, fallback_file in group]
+        tasks.append(([(category, label, fallback_file) for category, label, _, _, fallback_file in group],
+                      f"world_bank_{year or 'latest'}", get_world_bank_bulk, {"specs": specs}))
+    for category, label, loader, kwargs, fallback_file in sources:
+        if loader is get_world_bank_data:
+            continue
+        if fallback_file:
+            kwargs = dict(kwargs, fallback_file=fallback_file)
+        if loader is get_wikidata_capital_population:
+            # Fallbacks enregistrés sous la catégorie, comme ceux de fetch_all_ranks
+            kwargs = dict(kwargs, category=category)
+        tasks.append(([(category, label, fallback_file)], category, loader, kwargs))
+
+    pending = {}
+    for members, name, loader, kwargs in tasks:
+        future = _start_source(name, loader, kwargs)
+        timeout = world_bank_timeout if loader is get_world_bank_bulk else source_timeout
+        pending[future] = (members, loader is get_world_bank_bulk, time.monotonic() + timeout)
+
     all_ranks = {}
+    while pending:
+        next_deadline = min(global_deadline, min(deadline for _, _, deadline in pending.values()))
+        done, _ = wait(pending, timeout=max(0.0, next_deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        now = time.monotonic()
+        for future in list(pending):
+            members, grouped, deadline = pending[future]
+            if future in done:
+                del pending[future]
+                try:
+                    result = future.result()
+                    all_ranks.update(result if grouped else {members[0][0]: result})
+                except Exception as e:
+                    for category, label, fallback_file in members:
+                        print(f"\n  [ERREUR] {label} : {e}")
+                        METRICS.fallback(category, "error", fallback_file)
+                        all_ranks[category] = load_fallback_ranks(fallback_file) if fallback_file else {}
+            elif now >= deadline or now >= global_deadline:
+                # Le thread (démon) est abandonné : son résultat est remplacé par le fallback
+                del pending[future]
+                scope = "de la source" if now >= deadline else "global"
+                for category, label, fallback_file in members:
+                    print(f"\n  [TIMEOUT] {label} : delai {scope} depasse apres {now - start:.1f}s")
+                    METRICS.fallback(category, "timeout", fallback_file)
+                    all_ranks[category] = load_fallback_ranks(fallback_file) if fallback_file else {}
+
+    # Conserver l'ordre des sources
+    all_ranks = {source[0]: all_ranks.get(source[0], {}) for source in sources}
+    print(f"\n[OK] Sources recuperees en {time.monotonic() - start:.1f}s")
+    return all_ranks
+
+def load_previous_countries(manifest):
+    """Charge les pays du dernier snapshot enregistré dans le manifeste, ou None"""
+    snapshot_name = manifest.get("snapshot")
+    if not snapshot_name or not (SNAPSHOT_DIR / snapshot_name).exists():
+        return None
+    try:
+        with open(SNAPSHOT_DIR / snapshot_name, 'r', encoding='utf-8') as f:
+            return json.load(f).get("countries")
+    except (OSError, ValueError):
+        return None
+
+def current_season():
+    """Saison en cours (YYYY-MM)"""
+    return datetime.now().strftime("%Y-%m")
+
+def snapshot_indexes(countries, all_ranks, enabled=None):
+    """Section "indexes" du snapshot (None sans ETL_SNAPSHOT_INDEXES=true)
+
+    Args:
+        enabled: Forcer l'option (défaut SNAPSHOT_INDEXES ; backfill.py transmet
+            celle du processus principal à ses processus de travail)
+    """
+    if not (SNAPSHOT_INDEXES if enabled is None else enabled):
+        return None
+    with METRICS.stage("index"):
+        return build_indexes(countries, CATEGORIES, valid_masks(countries, all_ranks, CATEGORIES))
+
+def check_quality(countries, all_ranks, season, previous_file=None, previous_ranks=None):
+    """Contrôle qualité des pays normalisés (voir quality.py)
+
+    Écrit le rapport dans snapshot/quality-YYYY-MM.json et lève
+    DataQualityError s'il contient des erreurs. Les rangs absents viennent
+    des tables brutes (all_ranks, et previous_ranks pour la saison
+    précédente si le manifeste la décrit), jamais du rang par défaut.
+
+    Returns:
+        dict: Rapport du contrôle
+    """
+    print("\nControle qualite des donnees...")
+    with METRICS.stage("validate"):
+        previous = None
+        if previous_file:
+            try:
+                previous = load_model(previous_file, previous_ranks)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"  [ATTENTION] Saison precedente illisible ({previous_file.name}): {e}")
+        report = check_countries(countries, CATEGORIES, valid_masks(countries, all_ranks, CATEGORIES),
+                                 season, previous)
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    (SNAPSHOT_DIR / f"quality-{season}.json").write_text(
+        json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print("\n".join(format_report(report)))
+    METRICS.incr("quality", "errors", len(report["errors"]))
+    METRICS.incr("quality", "warnings", len(report["warnings"]))
+    if not report["ok"]:
+        raise DataQualityError(report)
+    return report
+
+def write_snapshot_files(countries, season, snapshot_dir=None, indexes=None):
+    """Écrit le snapshot JSON d'une saison et sa version binaire
     
-    # 1. Petite superficie (World Bank)
-    print("\n1. Récupération des données de superficie...")
-    all_ranks["small_area"] = get_world_bank_data("AG.LND.TOTL.K2", reverse=False, fallback_file="small_area_fallback.json")
-    print(f"   [OK] {len(all_ranks['small_area'])} pays trouves")
-    
-    # 2. PIB global (World Bank) avec fallback
-    print("\n2. Récupération des données de PIB...")
-    all_ranks["gdp"] = get_world_bank_data("NY.GDP.MKTP.CD", reverse=True, fallback_file="gdp_fallback.json")
-    print(f"   [OK] {len(all_ranks['gdp'])} pays trouves")
-    
-    # 3. Grande capitale (Wikidata) avec fallback
-    print("\n3. Récupération des données de capitales...")
-    all_ranks["capital_pop"] = get_wikidata_capital_population(fallback_file="capital_pop_fallback.json")
-    print(f"   [OK] {len(all_ranks['capital_pop'])} pays trouves")
-    
-    # 4. Taille de l'armée (World Bank) avec fallback
-    print("\n4. Récupération des données militaires...")
-    all_ranks["military"] = get_world_bank_data("MS.MIL.TOTL.P1", reverse=True, year=2020, fallback_file="military_fallback.json")
-    print(f"   [OK] {len(all_ranks['military'])} pays trouves")
-    
-    # 5. Football (local)
-    print("\n5. Chargement du classement FIFA...")
-    fifa_data = load_local_dataset("fifa_ranking.json")
-    all_ranks["football"] = fifa_data.get("ranks", {})
-    print(f"   [OK] {len(all_ranks['football'])} pays trouves")
-    
-    # 6. Taille ZEE (local)
-    print("\n6. Chargement des données ZEE...")
-    eez_data = load_local_dataset("eez_data.json")
-    all_ranks["eez"] = eez_data.get("ranks", {})
-    print(f"   [OK] {len(all_ranks['eez'])} pays trouves")
-    
-    # 7. Production de riz (FAOSTAT - pour MVP, données locales)
-    print("\n7. Chargement de la production de riz...")
-    rice_data = load_local_dataset("rice_production.json")
-    all_ranks["rice"] = rice_data.get("ranks", {})
-    print(f"   [OK] {len(all_ranks['rice'])} pays trouves")
-    
-    # 8. Francophones (local)
-    print("\n8. Chargement des données francophones...")
-    francophones_data = load_local_dataset("francophones.json")
-    all_ranks["francophones"] = francophones_data.get("ranks", {})
-    print(f"   [OK] {len(all_ranks['francophones'])} pays trouves")
-    
-    # Normaliser et créer la structure finale
-    print("\n" + "=" * 60)
-    print("Normalisation des pays...")
-    countries = normalize_countries(all_ranks)
+    Args:
+        countries: Pays normalisés (voir normalize_countries)
+        season: Saison YYYY-MM
+        snapshot_dir: Dossier de sortie (défaut SNAPSHOT_DIR)
+        indexes: Section "indexes" optionnelle (voir snapshot_indexes)
     
-    # Générer le snapshot
-    season = datetime.now().strftime("%Y-%m")
+    Returns:
+        tuple: (snapshot, fichier JSON, fichier binaire, taille du binaire)
+    """
     snapshot = {
         "meta": {
             "season": season,
@@ -513,17 +549,154 @@ def generate_snapshot():
         },
         "countries": countries
     }
+    if indexes:
+        snapshot["indexes"] = indexes
+    
+    snapshot_dir = Path(snapshot_dir or SNAPSHOT_DIR)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    snapshot_file = snapshot_dir / f"snapshot-{season}.json"
+    with METRICS.stage("write", snapshot_file.name):
+        snapshot_file.write_bytes(serialize_snapshot(snapshot))
+    
+    # Version binaire compacte (table des pays + matrice de rangs uint16)
+    binary_file = snapshot_file.with_suffix(".geosnap")
+    with METRICS.stage("write", binary_file.name):
+        binary_size = write_binary_snapshot(snapshot, binary_file, CATEGORIES)
+    return snapshot, snapshot_file, binary_file, binary_size
+
+def generate_snapshot(full_rebuild=None, season=None, categories=None):
+    """Génère le snapshot complet
+
+    Le build est incrémental : les catégories dont les entrées n'ont pas
+    changé depuis le dernier build (voir build_manifest) sont reprises, et
+    seules les catégories modifiées sont récupérées, reclassées et patchées.
+
+    Args:
+        full_rebuild: Forcer la reconstruction de toutes les catégories
+            (défaut : variable ETL_FULL_REBUILD)
+        season: Saison YYYY-MM du snapshot (défaut : mois en cours). Une
+            saison passée est refusée : le build lit les valeurs actuelles et
+            les publierait comme latest.json (voir backfill.py)
+        categories: Catégories à recalculer ; les autres sont reprises du
+            manifeste quel que soit leur âge (défaut : build incrémental normal)
+    """
+    full_rebuild = FULL_REBUILD if full_rebuild is None else full_rebuild
+    if season:
+        try:
+            valid = len(season) == 7 and datetime.strptime(season, "%Y-%m")
+        except ValueError:
+            valid = False
+        if not valid:
+            raise ValueError(f"Saison invalide: {season} (attendu YYYY-MM)")
+    if season and season < current_season():
+        raise ValueError(f"Saison passee {season}: le build n'utilise que les valeurs actuelles, "
+                         f"utiliser backfill.py {season} {season}")
+    unknown = sorted(set(categories or []) - set(CATEGORIES))
+    if unknown:
+        raise ValueError(f"Categories inconnues: {', '.join(unknown)} (attendu: {', '.join(CATEGORIES)})")
+    METRICS.reset()
+    print("Génération du snapshot Géo Challenge...")
+    print("=" * 60)
+    
+    # Déterminer les catégories à recalculer
+    manifest = load_manifest(BUILD_MANIFEST_FILE)
+    code_hash = code_digest(BUILD_CODE_FILES)
+    all_ranks = {}
+    input_hashes = {}
+    stale_sources = []
+    for source in SNAPSHOT_SOURCES:
+        category, label, loader, kwargs, fallback_file = source
+        input_hashes[category] = source_digest(category, loader.__name__, kwargs, fallback_file,
+                                               DATA_DIR, extra={"use_local_only": USE_LOCAL_ONLY,
+                                                                "world_bank_mrv": WORLD_BANK_MRV,
+                                                                "tie_policy": TIE_POLICY})
+        remote = loader is not load_local_ranks and not USE_LOCAL_ONLY and categories is None
+        forced = full_rebuild or (categories is not None and category in categories)
+        ranks = None if forced else reusable_ranks(
+            manifest, category, input_hashes[category], code_hash,
+            max_age=INCREMENTAL_TTL if remote else None)
+        if ranks is None:
+            stale_sources.append(source)
+        else:
+            all_ranks[category] = ranks
+    
+    changed_categories = [source[0] for source in stale_sources]
+    if all_ranks:
+        print(f"\n[OK] Categories inchangees reprises du manifeste: {', '.join(all_ranks)}")
+    
+    # Récupération concurrente des catégories modifiées (APIs + fichiers locaux)
+    if stale_sources:
+        print("\nRécupération des données (sources en parallèle)...")
+        all_ranks.update(fetch_all_ranks(stale_sources))
+    for index, (category, label, _, _, _) in enumerate(SNAPSHOT_SOURCES, 1):
+        status = "recalcule" if category in changed_categories else "inchange"
+        print(f"   {index}. {label} : [OK] {len(all_ranks.get(category, {}))} pays trouves ({status})")
     
-    # Sauvegarder
-    snapshot_file = SNAPSHOT_DIR / f"snapshot-{season}.json"
-    with open(snapshot_file, 'w', encoding='utf-8') as f:
-        json.dump(snapshot, f, indent=2, ensure_ascii=False)
+    # Normaliser et créer la structure finale
+    print("\n" + "=" * 60)
+    print("Normalisation des pays...")
+    previous_countries = None if full_rebuild or manifest.get("code") != code_hash else load_previous_countries(manifest)
+    with METRICS.stage("normalize"):
+        if previous_countries is None:
+            countries = normalize_countries(all_ranks)
+        else:
+            countries = normalize_countries(all_ranks, previous_countries, changed_categories)
+    
+    # Contrôle qualité avant toute écriture (arrêt du build si erreur)
+    season = season or current_season()
+    previous_file = previous_snapshot_file(SNAPSHOT_DIR, season)
+    if QUALITY_CHECKS:
+        check_quality(countries, all_ranks, season, previous_file,
+                      recorded_ranks(manifest, previous_file.name) if previous_file else None)
+    
+    # Générer et sauvegarder le snapshot (JSON + binaire)
+    indexes = snapshot_indexes(countries, all_ranks)
+    snapshot, snapshot_file, binary_file, binary_size = write_snapshot_files(countries, season, indexes=indexes)
+    
+    # Delta depuis la saison précédente (publication légère des mises à jour)
+    with METRICS.stage("delta"):
+        delta_info = write_delta(previous_file, snapshot_file) if previous_file else None
+    
+    # Puzzles quotidiens tirés du snapshot écrit (publiés avec lui)
+    puzzles = None
+    if PUZZLES:
+        print("\n" + "=" * 60)
+        with METRICS.stage("puzzles"):
+            puzzles = generate_puzzles(snapshot_file, season)
+    
+    # Publication (snapshot minifié à empreinte, puzzles + latest.json)
+    if PUBLISH:
+        with METRICS.stage("publish"):
+            publish_snapshot(snapshot, PUBLISH_DIR, puzzles=puzzles)
+    
+    # Mettre à jour le manifeste de build
+    for category in changed_categories:
+        record_category(manifest, category, input_hashes[category], all_ranks.get(category, {}))
+    manifest["code"] = code_hash
+    manifest["snapshot"] = snapshot_file.name
+    save_manifest(BUILD_MANIFEST_FILE, manifest)
     
     print(f"\n[OK] Snapshot genere: {snapshot_file}")
+    print(f"[OK] Snapshot binaire: {binary_file} ({binary_size} octets)")
+    if delta_info:
+        delta_file, delta_size, snapshot_size = delta_info
+        print(f"[OK] Delta depuis {previous_file.name}: {delta_file} ({delta_size} / {snapshot_size} octets)")
     print(f"[OK] Nombre de pays: {len(countries)}")
+    print(f"[OK] Categories recalculees: {len(changed_categories)}/{len(SNAPSHOT_SOURCES)}")
+    unresolved_report()
+    
+    # Métriques d'exécution (et profil cProfile si ETL_PROFILE=true)
+    metrics_file = SNAPSHOT_DIR / f"metrics-{season}.json"
+    METRICS.incr("snapshot", "countries", len(countries))
+    METRICS.incr("snapshot", "categories_rebuilt", len(changed_categories))
+    METRICS.write(metrics_file, profile_path=SNAPSHOT_DIR / f"profile-{season}.prof")
+    print(f"[OK] Metriques: {metrics_file}")
     print("=" * 60)
     
     return snapshot
 
 if __name__ == "__main__":
-    generate_snapshot()
+    try:
+        generate_snapshot()
+    except DataQualityError as e:
+        raise SystemExit(f"[ERREUR] {e}")
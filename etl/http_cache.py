@@ -0,0 +1,264 @@
+"""
+Cache HTTP persistant pour les sources de l'ETL (World Bank, Wikidata)
+
+Chaque réponse est stockée sur disque, indexée par l'URL (ou le texte de la
+requête SPARQL), avec son ETag / Last-Modified. Une entrée plus récente que
+le TTL est rejouée sans appel réseau ; une entrée périmée est revalidée avec
+une requête conditionnelle (304 = on garde le contenu en cache).
+
+Modes (variable ETL_CACHE_MODE, surchargeable par source avec
+ETL_CACHE_MODE_<SOURCE>, ex: ETL_CACHE_MODE_WIKIDATA=offline) :
+    default  - rejoue les entrées fraîches, revalide les entrées périmées
+    refresh  - revalide systématiquement, même les entrées fraîches
+    offline  - rejoue uniquement le cache, aucune requête réseau
+               (une entrée absente déclenche le fallback de la source)
+    off      - désactive le cache
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.error
+from pathlib import Path
+
+from metrics import METRICS
+
+BASE_DIR = Path(__file__).parent.parent
+CACHE_DIR = Path(os.getenv('ETL_CACHE_DIR', BASE_DIR / "cache" / "http"))
+CACHE_TTL = float(os.getenv('ETL_CACHE_TTL', str(24 * 3600)))
+CACHE_MAX_BYTES = int(float(os.getenv('ETL_CACHE_MAX_MB', '200')) * 1024 * 1024)
+CACHE_MODE = os.getenv('ETL_CACHE_MODE', 'default').lower()
+CACHE_MODES = ("default", "refresh", "offline", "off")
+
+# Session HTTP partagée : connexions keep-alive réutilisées entre requêtes et
+# nouvelles tentatives (backoff exponentiel) sur les erreurs transitoires
+HTTP_RETRIES = int(os.getenv('ETL_HTTP_RETRIES', '3'))
+HTTP_BACKOFF = float(os.getenv('ETL_HTTP_BACKOFF', '0.5'))
+HTTP_POOL_SIZE = int(os.getenv('ETL_HTTP_POOL_SIZE', '16'))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Les sources sont récupérées en parallèle : on sérialise l'éviction
+_eviction_lock = threading.Lock()
+_session = None
+_session_lock = threading.Lock()
+
+
+class CacheMiss(Exception):
+    """Entrée absente du cache en mode offline"""
+
+
+def http_session():
+    """Session requests partagée par les threads (pool keep-alive, retry avec backoff)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            # Import différé : les commandes qui ne touchent pas au réseau ne chargent pas requests
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            retry = Retry(
+                total=HTTP_RETRIES,
+                backoff_factor=HTTP_BACKOFF,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset({"GET"}),
+                respect_retry_after_header=True,
+                # Après la dernière tentative, renvoyer la réponse (raise_for_status décide)
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE,
+                                  max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def cache_mode(namespace):
+    """Retourne le mode de cache effectif pour une source (worldbank, wikidata...)"""
+    mode = os.getenv(f'ETL_CACHE_MODE_{namespace.upper()}', CACHE_MODE).lower()
+    if mode not in CACHE_MODES:
+        print(f"  [ATTENTION] Mode de cache inconnu '{mode}', utilisation de 'default'")
+        return "default"
+    return mode
+
+
+def _entry_path(namespace, key):
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    return CACHE_DIR / namespace / f"{digest}.json"
+
+
+def load_entry(namespace, key):
+    """Charge une entrée du cache, ou None si absente ou illisible"""
+    path = _entry_path(namespace, key)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if entry.get("key") != key:
+        return None
+    # Marquer l'entrée comme récemment utilisée (éviction LRU sur le mtime)
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return entry
+
+
+def store_entry(namespace, key, body, etag=None, last_modified=None):
+    """Écrit une entrée dans le cache (écriture atomique) puis applique la limite de taille"""
+    path = _entry_path(namespace, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    entry = {
+        "key": key,
+        "fetched_at": time.time(),
+        "etag": etag,
+        "last_modified": last_modified,
+        "body": body,
+    }
+    tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(entry, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+    evict_cache()
+    return entry
+
+
+def touch_entry(namespace, entry):
+    """Renouvelle la date de récupération d'une entrée revalidée (réponse 304)"""
+    return store_entry(namespace, entry["key"], entry["body"], entry.get("etag"), entry.get("last_modified"))
+
+
+def evict_cache(max_bytes=None):
+    """Supprime les entrées les moins récemment utilisées au-delà de max_bytes"""
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    with _eviction_lock:
+        entries = []
+        total = 0
+        for path in CACHE_DIR.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= max_bytes:
+            return 0
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+
+def _is_fresh(entry, mode):
+    return mode != "refresh" and time.time() - entry.get("fetched_at", 0) < CACHE_TTL
+
+
+def _conditional_headers(entry):
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def fetch_json(url, namespace="worldbank", timeout=60):
+    """GET JSON avec cache disque, TTL et revalidation ETag / Last-Modified
+
+    Args:
+        url: URL complète (clé du cache)
+        namespace: Sous-dossier du cache et nom de la source pour le mode
+        timeout: Timeout réseau en secondes
+
+    Returns:
+        Le JSON décodé de la réponse (ou rejoué depuis le cache)
+    """
+    mode = cache_mode(namespace)
+    if mode == "off":
+        response = http_session().get(url, timeout=timeout)
+        METRICS.incr(namespace, "requests")
+        METRICS.incr(namespace, "bytes_downloaded", len(response.content))
+        response.raise_for_status()
+        return response.json()
+
+    entry = load_entry(namespace, url)
+    if entry is not None and (mode == "offline" or _is_fresh(entry, mode)):
+        print(f"  [CACHE] {namespace}: reponse rejouee depuis le cache")
+        METRICS.incr(namespace, "cache_hits")
+        return entry["body"]
+    if mode == "offline":
+        METRICS.incr(namespace, "cache_misses")
+        raise CacheMiss(f"{namespace}: aucune entree en cache pour {url}")
+
+    response = http_session().get(url, headers=_conditional_headers(entry), timeout=timeout)
+    METRICS.incr(namespace, "requests")
+    METRICS.incr(namespace, "bytes_downloaded", len(response.content))
+    if response.status_code == 304 and entry is not None:
+        print(f"  [CACHE] {namespace}: contenu inchange (304), cache revalide")
+        METRICS.incr(namespace, "cache_revalidated")
+        return touch_entry(namespace, entry)["body"]
+    METRICS.incr(namespace, "cache_misses")
+    response.raise_for_status()
+    body = response.json()
+    store_entry(namespace, url, body,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"))
+    return body
+
+
+def fetch_sparql(endpoint, query, namespace="wikidata", timeout=60):
+    """Exécute une requête SPARQL (résultat JSON) avec le même cache que fetch_json
+
+    La clé du cache est le texte de la requête (préfixé par l'endpoint).
+    """
+    mode = cache_mode(namespace)
+    key = f"{endpoint}\n{query}"
+    entry = None if mode == "off" else load_entry(namespace, key)
+    if entry is not None and (mode == "offline" or _is_fresh(entry, mode)):
+        print(f"  [CACHE] {namespace}: reponse rejouee depuis le cache")
+        METRICS.incr(namespace, "cache_hits")
+        return entry["body"]
+    if mode == "offline":
+        METRICS.incr(namespace, "cache_misses")
+        raise CacheMiss(f"{namespace}: aucune entree en cache pour cette requete")
+
+    from SPARQLWrapper import JSON, SPARQLWrapper
+
+    sparql = SPARQLWrapper(endpoint)
+    sparql.setQuery(query)
+    sparql.setReturnFormat(JSON)
+    sparql.setTimeout(int(timeout))
+    for header, value in _conditional_headers(entry).items():
+        sparql.addCustomHttpHeader(header, value)
+    METRICS.incr(namespace, "requests")
+    try:
+        result = sparql.query()
+    except urllib.error.HTTPError as e:
+        if e.code == 304 and entry is not None:
+            print(f"  [CACHE] {namespace}: contenu inchange (304), cache revalide")
+            METRICS.incr(namespace, "cache_revalidated")
+            return touch_entry(namespace, entry)["body"]
+        raise
+    raw = result.response.read()
+    METRICS.incr(namespace, "bytes_downloaded", len(raw))
+    if mode != "off":
+        METRICS.incr(namespace, "cache_misses")
+    body = json.loads(raw)
+    if mode != "off":
+        info = result.info()
+        store_entry(namespace, key, body,
+                    etag=info.get("etag"),
+                    last_modified=info.get("last-modified"))
+    return body
@@ -0,0 +1,131 @@
+"""
+Instrumentation de l'ETL : durées par étape, compteurs et fallbacks
+
+Chaque étape (fetch, parse, rank, normalize...) est mesurée par le context
+manager METRICS.stage ; les compteurs (octets téléchargés, lignes lues et
+rejetées, hits du cache) et les fallbacks déclenchés sont enregistrés par
+source. Le tout est écrit en JSON à côté du snapshot (metrics-YYYY-MM.json).
+
+Avec ETL_PROFILE=true, les étapes coûteuses (PROFILED_STAGES) sont aussi
+capturées avec cProfile et écrites dans profile-YYYY-MM.prof (à lire avec
+python -m pstats ou snakeviz).
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+PROFILE = os.getenv('ETL_PROFILE', 'false').lower() == 'true'
+PROFILED_STAGES = {"parse", "rank", "normalize", "write"}
+
+
+class Metrics:
+    """Collecteur de métriques partagé par les threads de l'ETL"""
+
+    def __init__(self, profile=PROFILE):
+        self.profile = profile
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Remet les métriques à zéro (début d'un build)"""
+        with self._lock:
+            self.started_at = time.time()
+            self._start = time.perf_counter()
+            self.stages = []
+            self.counters = defaultdict(lambda: defaultdict(int))
+            self.fallbacks = []
+            self._profiles = []
+
+    @contextmanager
+    def stage(self, name, source=None):
+        """Mesure la durée d'une étape (et la profile si demandé)
+
+        Args:
+            name: Nom de l'étape (fetch, parse, rank, normalize...)
+            source: Source concernée (indicateur, fichier, catégorie)
+        """
+        profiler = None
+        if self.profile and name in PROFILED_STAGES:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Un autre profileur est déjà actif dans ce thread
+                profiler = None
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+            with self._lock:
+                self.stages.append({
+                    "stage": name,
+                    "source": source,
+                    "seconds": round(elapsed, 6),
+                    "offset": round(start - self._start, 6),
+                    "thread": threading.current_thread().name,
+                    "status": status,
+                })
+                if profiler is not None:
+                    self._profiles.append(profiler)
+
+    def incr(self, source, counter, value=1):
+        """Incrémente un compteur d'une source (octets, lignes lues, lignes rejetées...)"""
+        with self._lock:
+            self.counters[source][counter] += value
+
+    def fallback(self, source, reason, fallback_file=None):
+        """Enregistre le déclenchement d'un fallback
+
+        Args:
+            source: Catégorie du snapshot concernée (une seule clé par catégorie,
+                quel que soit le chemin : source, délai, erreur)
+            reason: Chemin de fallback (local_only, few_rows, error, timeout)
+            fallback_file: Fichier de secours utilisé
+        """
+        with self._lock:
+            self.fallbacks.append({"source": source, "reason": reason, "file": fallback_file})
+
+    def summary(self):
+        """Métriques agrégées, prêtes à être sérialisées en JSON"""
+        with self._lock:
+            totals = defaultdict(lambda: {"count": 0, "seconds": 0.0})
+            for entry in self.stages:
+                totals[entry["stage"]]["count"] += 1
+                totals[entry["stage"]]["seconds"] += entry["seconds"]
+            return {
+                "started_at": self.started_at,
+                "wall_seconds": round(time.perf_counter() - self._start, 6),
+                "stage_totals": {name: {"count": total["count"], "seconds": round(total["seconds"], 6)}
+                                 for name, total in totals.items()},
+                "stages": list(self.stages),
+                "counters": {source: dict(counters) for source, counters in self.counters.items()},
+                "fallbacks": list(self.fallbacks),
+            }
+
+    def write(self, path, profile_path=None):
+        """Écrit les métriques en JSON (et le profil cProfile si capturé)"""
+        summary = self.summary()
+        Path(path).write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding='utf-8')
+        if profile_path and self._profiles:
+            stats = pstats.Stats(self._profiles[0])
+            for profiler in self._profiles[1:]:
+                stats.add(profiler)
+            stats.dump_stats(str(profile_path))
+        return summary
+
+
+METRICS = Metrics()
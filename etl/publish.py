@@ -0,0 +1,158 @@
+"""
+Publication du snapshot pour le frontend
+
+Écrit le snapshot minifié sous un nom dérivé de son contenu
+(snapshot-YYYY-MM.<empreinte>.json), ses variantes précompressées (.gz et
+.br ; sans le module brotli, la variante .br est signalée dans
+"skipped_encodings"), les puzzles quotidiens de la saison
+s'ils sont fournis (puzzles-YYYY-MM.<empreinte>.json, mêmes variantes) et un
+petit manifeste latest.json :
+
+    {
+      "format": "geo-challenge-publish", "version": 1,
+      "season": "2025-11", "generated_at": ..., "published_at": ...,
+      "file": "snapshot-2025-11.3f2a9c0d4e5b6a71.json",
+      "sha256": ..., "size": ..., "countries": ...,
+      "encodings": {"gzip": {"file": ..., "size": ...}, "br": {...}},
+      "puzzles": {"file": ..., "sha256": ..., "size": ..., "encodings": {...}}
+    }
+
+Un fichier publié ne change jamais (son nom change avec son contenu) : le
+client peut le mettre en cache sans limite et ne recharge que latest.json
+pour découvrir une nouvelle saison. Le manifeste est écrit en dernier, de
+façon atomique, une fois tous les fichiers en place.
+
+Usage :
+    python publish.py ../snapshot/snapshot-2025-11.json [--puzzles ../snapshot/puzzles-2025-11.json]
+                      [--output ../frontend/public/snapshots]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # Dans requirements.txt ; sans lui seule la variante gzip est publiée (signalé dans latest.json)
+    brotli = None
+
+BASE_DIR = Path(__file__).parent.parent
+PUBLISH_DIR = Path(os.getenv('ETL_PUBLISH_DIR', BASE_DIR / "frontend" / "public" / "snapshots"))
+# Nombre de snapshots publiés conservés (les clients en cours peuvent encore les lire)
+PUBLISH_KEEP = int(os.getenv('ETL_PUBLISH_KEEP', '3'))
+MANIFEST_NAME = "latest.json"
+PUBLISH_FORMAT = "geo-challenge-publish"
+PUBLISH_VERSION = 1
+HASH_LENGTH = 16
+
+
+def minify_snapshot(snapshot):
+    """Sérialisation compacte du snapshot (sans indentation ni espaces)"""
+    return json.dumps(snapshot, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _write_atomic(path, data):
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def _prune(output_dir, keep, prefix="snapshot"):
+    """Supprime les fichiers publiés au-delà des `keep` plus récents (et leurs variantes)"""
+    published = sorted(output_dir.glob(f"{prefix}-*.*.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in published[keep:]:
+        for variant in (path, path.with_name(path.name + ".gz"), path.with_name(path.name + ".br")):
+            variant.unlink(missing_ok=True)
+
+
+def _publish_file(output_dir, prefix, season, data):
+    """Écrit un fichier à empreinte et ses variantes compressées
+
+    Returns:
+        tuple: (chemin, empreinte SHA-256, dict des variantes)
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    path = output_dir / f"{prefix}-{season}.{digest[:HASH_LENGTH]}.json"
+    # Contenu identique = même nom : rien à réécrire
+    if not path.exists():
+        _write_atomic(path, data)
+    os.utime(path)
+
+    encodings = {}
+    # mtime=0 : archive reproductible pour un même contenu
+    variants = [("gzip", ".gz", lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(("br", ".br", lambda raw: brotli.compress(raw, quality=11)))
+    for encoding, suffix, compress in variants:
+        variant = path.with_name(path.name + suffix)
+        if not variant.exists():
+            _write_atomic(variant, compress(data))
+        encodings[encoding] = {"file": variant.name, "size": variant.stat().st_size}
+    return path, digest, encodings
+
+
+def publish_snapshot(snapshot, output_dir=None, keep=None, puzzles=None):
+    """Publie un snapshot : fichier à empreinte, variantes compressées et latest.json
+
+    Args:
+        snapshot: Snapshot (dict)
+        output_dir: Dossier de publication (défaut PUBLISH_DIR)
+        keep: Nombre de snapshots publiés conservés (défaut PUBLISH_KEEP)
+        puzzles: Puzzles quotidiens de la saison (dict, voir puzzles.generate_puzzles)
+
+    Returns:
+        dict: Contenu du manifeste latest.json
+    """
+    output_dir = Path(output_dir or PUBLISH_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    keep = PUBLISH_KEEP if keep is None else keep
+    season = snapshot.get("meta", {}).get("season", "unknown")
+
+    data = minify_snapshot(snapshot)
+    path, digest, encodings = _publish_file(output_dir, "snapshot", season, data)
+
+    manifest = {
+        "format": PUBLISH_FORMAT,
+        "version": PUBLISH_VERSION,
+        "season": season,
+        "generated_at": snapshot.get("meta", {}).get("generated_at"),
+        "published_at": datetime.now().isoformat(timespec="seconds"),
+        "file": path.name,
+        "sha256": digest,
+        "size": len(data),
+        "countries": len(snapshot.get("countries", {})),
+        "encodings": encodings,
+    }
+    if brotli is None:
+        # Variante demandée mais non produite : visible aussi pour le déploiement
+        manifest["skipped_encodings"] = {"br": "module brotli absent (pip install brotli)"}
+    if puzzles is not None:
+        puzzles_data = minify_snapshot(puzzles)
+        puzzles_path, puzzles_digest, puzzles_encodings = _publish_file(output_dir, "puzzles", season, puzzles_data)
+        manifest["puzzles"] = {"file": puzzles_path.name, "sha256": puzzles_digest,
+                               "size": len(puzzles_data), "encodings": puzzles_encodings}
+        print(f"[OK] Puzzles publies: {puzzles_path} ({len(puzzles_data)} octets)")
+    _write_atomic(output_dir / MANIFEST_NAME, json.dumps(manifest, indent=2).encode('utf-8'))
+    _prune(output_dir, keep)
+    _prune(output_dir, keep, "puzzles")
+
+    sizes = ", ".join(f"{encoding} {info['size']}" for encoding, info in encodings.items())
+    print(f"[OK] Snapshot publie: {path} ({len(data)} octets ; {sizes})")
+    if brotli is None:
+        print("  [ATTENTION] Module brotli absent : variante .br non publiee (pip install brotli)")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publie un snapshot pour le frontend")
+    parser.add_argument("snapshot", help="Snapshot JSON (snapshot/snapshot-YYYY-MM.json)")
+    parser.add_argument("--output", help="Dossier de publication (défaut : frontend/public/snapshots)")
+    parser.add_argument("--keep", type=int, help=f"Snapshots publiés conservés (défaut {PUBLISH_KEEP})")
+    parser.add_argument("--puzzles", help="Puzzles de la saison (snapshot/puzzles-YYYY-MM.json)")
+    args = parser.parse_args()
+    puzzles = json.loads(Path(args.puzzles).read_text(encoding='utf-8')) if args.puzzles else None
+    publish_snapshot(json.loads(Path(args.snapshot).read_text(encoding='utf-8')), args.output, args.keep, puzzles)
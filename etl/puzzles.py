@@ -0,0 +1,275 @@
+"""
+Puzzles quotidiens : tirages reproductibles et difficulté calibrée
+
+Pour chaque jour de la saison et chaque mode de jeu, plusieurs tirages
+candidats sont générés à partir d'une graine dérivée de (saison, mode, jour,
+candidat). Chaque candidat est joué par des stratégies simulées (Monte Carlo)
+et comparé au score optimal (solver) ; on retient pour chaque jour le
+candidat dont la difficulté est la plus proche de la médiane du mode, pour
+une difficulté stable tout au long de la saison.
+
+Stratégies (les pays sont présentés dans l'ordre du tirage, comme en jeu) :
+    greedy  - place chaque pays dans sa meilleure catégorie libre
+    noisy   - comme greedy, mais sur des rangs perçus avec une erreur
+              (joueur qui connaît approximativement les classements)
+    random  - catégorie libre au hasard
+
+Les simulations sont réparties sur un pool de processus. Le fichier de
+puzzles enregistre l'empreinte de ses entrées (rangs du snapshot, saison,
+jours, paramètres de simulation, code) : s'il existe déjà avec la même
+empreinte, il est repris sans relancer les simulations.
+
+Usage :
+    python puzzles.py ../snapshot/snapshot-2025-11.json [--force]
+"""
+
+import argparse
+import calendar
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+
+from build_manifest import code_digest
+from solver import RankMatrix, batch_optimal_scores
+
+# Modes de jeu (identiques à startGame dans frontend/src/App.jsx)
+ALL_CATEGORIES = ["small_area", "gdp", "capital_pop", "military",
+                  "football", "eez", "rice", "francophones"]
+GAME_MODES = {
+    "easy": {"countries": 6, "categories": ALL_CATEGORIES[:6]},
+    "normal": {"countries": 8, "categories": ALL_CATEGORIES},
+    "hard": {"countries": 10, "categories": ALL_CATEGORIES},
+    "expert": {"countries": 12, "categories": ALL_CATEGORIES},
+}
+
+PUZZLE_SEED = os.getenv('ETL_PUZZLE_SEED', 'geochallenge')
+SIMULATIONS = int(os.getenv('ETL_PUZZLE_SIMULATIONS', '20000'))
+CANDIDATES = int(os.getenv('ETL_PUZZLE_CANDIDATES', '8'))
+# Écart-type (log) de l'erreur de perception des rangs de la stratégie noisy
+NOISE_SIGMA = 0.6
+# Au-delà de ce rang, greedy et noisy préfèrent ne pas placer un pays s'ils le peuvent encore
+SKIP_THRESHOLD = 60
+# Poids des stratégies dans le score de difficulté
+STRATEGY_WEIGHTS = {"greedy": 0.4, "noisy": 0.4, "random": 0.2}
+
+# Fichiers dont dépendent les tirages : toute modification invalide les puzzles existants
+PUZZLE_CODE_FILES = [Path(__file__), Path(__file__).parent / "solver.py"]
+
+_worker_matrix = None
+
+
+def derive_seed(*parts):
+    """Graine 64 bits déterministe dérivée de PUZZLE_SEED et de parts"""
+    text = "/".join(str(part) for part in (PUZZLE_SEED, *parts))
+    return int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], "little")
+
+
+def season_days(season):
+    """Dates (ISO) de tous les jours d'une saison YYYY-MM"""
+    year, month = (int(part) for part in season.split("-"))
+    return [date(year, month, day).isoformat() for day in range(1, calendar.monthrange(year, month)[1] + 1)]
+
+
+def simulate_strategy(ranks, strategy, simulations, rng):
+    """Simule une stratégie sur un tirage (vectorisé sur les simulations)
+
+    Args:
+        ranks: Rangs du tirage, pays (dans l'ordre de présentation) x catégories
+        strategy: "greedy", "noisy" ou "random"
+        simulations: Nombre de parties simulées
+        rng: np.random.Generator
+
+    Returns:
+        np.ndarray: Score de chaque partie simulée
+    """
+    n_countries, n_categories = ranks.shape
+    if strategy == "greedy":
+        simulations = 1  # Stratégie déterministe
+    free = np.ones((simulations, n_categories), dtype=bool)
+    scores = np.zeros(simulations, dtype=np.int64)
+    rows = np.arange(simulations)
+    for country in range(n_countries):
+        remaining_countries = n_countries - country
+        remaining_slots = free.sum(axis=1)
+        if strategy == "random":
+            perceived = rng.random((simulations, n_categories))
+            # Pays non placé au hasard, tant que les pays restants suffisent à remplir les catégories
+            skip = rng.random(simulations) < 1 - remaining_slots / remaining_countries
+        else:
+            perceived = np.broadcast_to(ranks[country].astype(np.float64), (simulations, n_categories))
+            if strategy == "noisy":
+                perceived = perceived * rng.lognormal(0.0, NOISE_SIGMA, (simulations, n_categories))
+            best_perceived = np.where(free, perceived, np.inf).min(axis=1)
+            skip = (best_perceived > SKIP_THRESHOLD) & (remaining_countries > remaining_slots)
+        choice = np.where(free, perceived, np.inf).argmin(axis=1)
+        place = ~skip & (remaining_slots > 0)
+        scores += np.where(place, ranks[country, choice], 0)
+        free[rows[place], choice[place]] = False
+    return scores
+
+
+def _init_worker(snapshot_path):
+    global _worker_matrix
+    _worker_matrix = RankMatrix.load(snapshot_path)
+
+
+def evaluate_candidate(task):
+    """Évalue un tirage candidat (exécuté dans un processus du pool)
+
+    Args:
+        task: (mode, jour, numéro du candidat, saison, nombre de simulations)
+
+    Returns:
+        dict: Tirage, score optimal, scores moyens des stratégies et difficulté
+    """
+    mode, day, candidate, season, simulations = task
+    settings = GAME_MODES[mode]
+    matrix = _worker_matrix.select(settings["categories"])
+    rng = np.random.default_rng(derive_seed(season, mode, day, candidate))
+    draw = rng.choice(len(matrix.codes), settings["countries"], replace=False)
+    ranks = matrix.ranks[draw]
+    optimal = int(batch_optimal_scores(matrix, draw[None, :])[0])
+
+    strategies = {name: float(simulate_strategy(ranks, name, simulations, rng).mean())
+                  for name in STRATEGY_WEIGHTS}
+    difficulty = sum(weight * strategies[name] / max(optimal, 1)
+                     for name, weight in STRATEGY_WEIGHTS.items())
+    return {
+        "mode": mode,
+        "date": day,
+        "countries": [matrix.codes[index] for index in draw],
+        "optimal": optimal,
+        "strategies": {name: round(score, 1) for name, score in strategies.items()},
+        "difficulty": round(difficulty, 4),
+    }
+
+
+def inputs_digest(matrix, season, dates, simulations, candidates):
+    """Empreinte des entrées d'un fichier de puzzles (rangs, saison, jours, paramètres, code)"""
+    digest = hashlib.sha256(json.dumps({
+        "season": season,
+        "dates": dates,
+        "codes": matrix.codes,
+        "categories": matrix.categories,
+        "seed": PUZZLE_SEED,
+        "simulations": simulations,
+        "candidates": candidates,
+        "modes": GAME_MODES,
+        "strategy_weights": STRATEGY_WEIGHTS,
+        "code": code_digest(PUZZLE_CODE_FILES),
+    }, sort_keys=True).encode('utf-8'))
+    digest.update(matrix.ranks.tobytes())
+    return digest.hexdigest()
+
+
+def _existing_puzzles(output_file, digest):
+    """Fichier de puzzles existant s'il a été généré avec les mêmes entrées, sinon None"""
+    try:
+        document = json.loads(Path(output_file).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    return document if document.get("meta", {}).get("inputs_sha256") == digest else None
+
+
+def generate_puzzles(snapshot_path, season=None, days=None, simulations=None,
+                     candidates=None, workers=None, output_file=None, force=False):
+    """Génère le fichier de puzzles quotidiens d'une saison
+
+    Args:
+        snapshot_path: Snapshot .json ou .geosnap
+        season: Saison YYYY-MM (défaut : celle du snapshot)
+        days: Nombre de jours (défaut : tous les jours de la saison)
+        simulations: Parties simulées par stratégie et par candidat
+        candidates: Tirages candidats par jour et par mode
+        workers: Nombre de processus (défaut : nombre de CPU)
+        output_file: Fichier de sortie (défaut : puzzles-YYYY-MM.json à côté du snapshot)
+        force: Relancer les simulations même si output_file a les mêmes entrées
+
+    Returns:
+        dict: Contenu du fichier de puzzles
+    """
+    snapshot_path = Path(snapshot_path)
+    simulations = simulations or SIMULATIONS
+    candidates = candidates or CANDIDATES
+    matrix = RankMatrix.load(snapshot_path)
+    season = season or matrix.season
+    dates = season_days(season)[:days] if days else season_days(season)
+    output_file = Path(output_file or snapshot_path.parent / f"puzzles-{season}.json")
+    digest = inputs_digest(matrix, season, dates, simulations, candidates)
+    existing = None if force else _existing_puzzles(output_file, digest)
+    if existing is not None:
+        print(f"  [OK] Puzzles {season} inchanges (memes rangs et parametres), repris: {output_file}")
+        return existing
+    tasks = [(mode, day, candidate, season, simulations)
+             for mode in GAME_MODES for day in dates for candidate in range(candidates)]
+
+    print(f"Génération des puzzles {season} : {len(tasks)} tirages candidats, "
+          f"{simulations} simulations par strategie...")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(str(snapshot_path),)) as executor:
+        results = list(executor.map(evaluate_candidate, tasks, chunksize=max(1, len(tasks) // 64)))
+    print(f"  [OK] Simulations terminees en {time.perf_counter() - start:.1f}s")
+
+    modes = {}
+    for mode, settings in GAME_MODES.items():
+        pool = [result for result in results if result["mode"] == mode]
+        pool_difficulties = np.sort([result["difficulty"] for result in pool])
+        median = float(np.median(pool_difficulties))
+        puzzles = []
+        for day in dates:
+            day_candidates = [result for result in pool if result["date"] == day]
+            chosen = min(day_candidates, key=lambda result: abs(result["difficulty"] - median))
+            percentile = 100.0 * np.searchsorted(pool_difficulties, chosen["difficulty"]) / len(pool_difficulties)
+            puzzles.append({
+                "date": day,
+                "countries": chosen["countries"],
+                "optimal": chosen["optimal"],
+                "difficulty": chosen["difficulty"],
+                "percentile": round(percentile, 1),
+                "strategies": chosen["strategies"],
+            })
+        modes[mode] = {
+            "countries": settings["countries"],
+            "categories": settings["categories"],
+            "median_difficulty": round(median, 4),
+            "puzzles": puzzles,
+        }
+
+    document = {
+        "meta": {
+            "season": season,
+            "generated_at": datetime.now().isoformat(),
+            "snapshot": snapshot_path.name,
+            "seed": PUZZLE_SEED,
+            "simulations": simulations,
+            "candidates": candidates,
+            "strategy_weights": STRATEGY_WEIGHTS,
+            "inputs_sha256": digest,
+        },
+        "modes": modes,
+    }
+    output_file.write_text(json.dumps(document, ensure_ascii=False, separators=(',', ':')), encoding='utf-8')
+    print(f"  [OK] Puzzles ecrits: {output_file} ({output_file.stat().st_size} octets)")
+    return document
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génère les puzzles quotidiens d'une saison")
+    parser.add_argument("snapshot", help="Snapshot .json ou .geosnap")
+    parser.add_argument("--season", help="Saison YYYY-MM (défaut : celle du snapshot)")
+    parser.add_argument("--days", type=int, help="Nombre de jours à générer")
+    parser.add_argument("--simulations", type=int, help=f"Simulations par stratégie (défaut {SIMULATIONS})")
+    parser.add_argument("--candidates", type=int, help=f"Candidats par jour et par mode (défaut {CANDIDATES})")
+    parser.add_argument("--workers", type=int, help="Nombre de processus")
+    parser.add_argument("--output", help="Fichier de sortie")
+    parser.add_argument("--force", action="store_true", help="Relancer les simulations même si rien n'a changé")
+    args = parser.parse_args()
+    generate_puzzles(args.snapshot, args.season, args.days, args.simulations,
+                     args.candidates, args.workers, args.output, args.force)
@@ -0,0 +1,269 @@
+"""
+Contrôle qualité des données du snapshot (après normalize_countries)
+
+validation.py vérifie la structure d'un fichier ; ce module vérifie les
+données elles-mêmes avant toute écriture, pour arrêter le build au lieu de
+publier un snapshot faux :
+
+    codes       chaque pays a un code ISO3 connu, un nom et un drapeau résolus
+                (pas d'entrée "GUI" nommée "GUI" avec le drapeau xx.png)
+    rangs       par catégorie, rangs cohérents avec la politique d'ex aequo
+                (pas de doublon en ordinal, pas d'ex aequo sans trou en
+                competition) et peu de trous (MAX_RANK_GAPS)
+    couverture  part des pays classés au moins MIN_COVERAGE, et pas de chute
+                de plus de MAX_COVERAGE_DROP par rapport à la saison précédente
+    sauts       par rapport à la saison précédente, au plus MAX_JUMP_SHARE des
+                pays gagnent ou perdent plus de MAX_RANK_JUMP places
+
+Les colonnes de rangs sont vérifiées avec NumPy (SnapshotModel), une
+catégorie par tâche en parallèle. Le rapport est un dict (voir
+check_countries) ; DataQualityError le porte quand il contient des erreurs.
+
+Usage :
+    python quality.py ../snapshot/snapshot-2025-11.json [--previous ../snapshot/snapshot-2025-10.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from country_index import is_iso3
+from ranking import TIE_POLICY
+from snapshot_index import valid_masks
+from snapshot_model import DEFAULT_RANK, MISSING_RANK, SnapshotModel
+
+QUALITY_CHECKS = os.getenv('ETL_QUALITY_CHECKS', 'true').lower() == 'true'
+# Part minimale des pays classés dans chaque catégorie
+MIN_COVERAGE = float(os.getenv('ETL_QUALITY_MIN_COVERAGE', '0.3'))
+# Baisse relative maximale du nombre de pays classés d'une saison à l'autre
+MAX_COVERAGE_DROP = float(os.getenv('ETL_QUALITY_MAX_COVERAGE_DROP', '0.2'))
+# Trous maximaux dans les rangs (part du nombre de pays classés) : les sources
+# classent parfois des entités écartées ensuite (agrégats, codes FIFA)
+MAX_RANK_GAPS = float(os.getenv('ETL_QUALITY_MAX_RANK_GAPS', '0.05'))
+MAX_RANK_JUMP = int(os.getenv('ETL_QUALITY_MAX_RANK_JUMP', '50'))
+MAX_JUMP_SHARE = float(os.getenv('ETL_QUALITY_MAX_JUMP_SHARE', '0.2'))
+UNKNOWN_FLAG_SUFFIX = "/xx.png"
+# Codes cités par message
+MAX_CODES = 5
+
+
+class DataQualityError(ValueError):
+    """Le contrôle qualité a trouvé des erreurs (rapport dans .report)"""
+
+    def __init__(self, report):
+        self.report = report
+        super().__init__(f"Controle qualite {report.get('season')}: {len(report['errors'])} erreur(s) "
+                         f"({'; '.join(issue['message'] for issue in report['errors'][:3])})")
+
+
+def _issue(check, message, category=None, codes=()):
+    issue = {"check": check, "category": category, "message": message}
+    if len(codes):
+        issue["codes"] = [str(code) for code in codes[:MAX_CODES]]
+    return issue
+
+
+def _codes_text(codes):
+    codes = list(codes)
+    return ", ".join(codes[:MAX_CODES]) + (f" ... (+{len(codes) - MAX_CODES})" if len(codes) > MAX_CODES else "")
+
+
+def check_codes(countries):
+    """Codes ISO3 inconnus et pays non résolus (nom = code ou drapeau inconnu)"""
+    invalid = [iso3 for iso3 in countries if not is_iso3(iso3)]
+    unresolved = [iso3 for iso3, entry in countries.items()
+                  if entry["name"] == iso3 or entry["flag"].endswith(UNKNOWN_FLAG_SUFFIX)]
+    errors = []
+    if invalid:
+        errors.append(_issue("codes", f"{len(invalid)} code(s) ISO3 inconnu(s): {_codes_text(invalid)}",
+                             codes=invalid))
+    if unresolved:
+        errors.append(_issue("codes", f"{len(unresolved)} pays sans nom ni drapeau: {_codes_text(unresolved)}",
+                             codes=unresolved))
+    return errors
+
+
+def check_category(category, column, previous=None, ties=TIE_POLICY, codes=None):
+    """Vérifie une colonne de rangs (vectorisé)
+
+    Args:
+        category: Nom de la catégorie
+        column: Rangs uint16 de tous les pays (MISSING_RANK = absent)
+        previous: Rangs de la saison précédente alignés sur les mêmes pays, ou None
+        ties: Politique d'ex aequo du build
+        codes: Codes ISO3 des colonnes (cités dans les messages)
+
+    Returns:
+        tuple: (statistiques, erreurs, avertissements)
+    """
+    errors = []
+    warnings = []
+    valid = column != MISSING_RANK
+    ranks = np.sort(column[valid]).astype(np.int64)
+    count = len(ranks)
+    stats = {"count": count, "coverage": round(count / max(len(column), 1), 3)}
+    if not count:
+        errors.append(_issue("coverage", f"{category}: aucun pays classé", category))
+        return stats, errors, warnings
+
+    distinct = len(np.unique(ranks))
+    # Trous inexpliqués : en dense les ex aequo ne laissent pas de trou
+    gaps = max(int(ranks[-1]) - (distinct if ties == "dense" else count), 0)
+    stats.update(max_rank=int(ranks[-1]), duplicates=count - distinct, gaps=gaps)
+
+    if ties == "ordinal" and distinct < count:
+        errors.append(_issue("ranks", f"{category}: {count - distinct} rang(s) en double", category))
+    elif ties == "competition":
+        # Rangs triés : le k-ième vaut au moins k (un groupe d'ex aequo laisse un trou derrière lui)
+        misplaced = int(np.count_nonzero(ranks < np.arange(1, count + 1)))
+        if misplaced:
+            errors.append(_issue("ranks", f"{category}: {misplaced} rang(s) incompatibles avec "
+                                          f"la politique competition (ex aequo sans trou)", category))
+    if ranks[0] < 1:
+        errors.append(_issue("ranks", f"{category}: rang minimal {int(ranks[0])}", category))
+    if gaps > MAX_RANK_GAPS * count:
+        errors.append(_issue("ranks", f"{category}: rangs non contigus ({gaps} trous pour {count} pays, "
+                                      f"rang maximal {int(ranks[-1])})", category))
+
+    if stats["coverage"] < MIN_COVERAGE:
+        errors.append(_issue("coverage", f"{category}: couverture {stats['coverage']:.0%} "
+                                         f"(minimum {MIN_COVERAGE:.0%})", category))
+
+    if previous is not None:
+        previous_count = int(np.count_nonzero(previous != MISSING_RANK))
+        stats["previous_count"] = previous_count
+        if count < (1 - MAX_COVERAGE_DROP) * previous_count:
+            errors.append(_issue("coverage", f"{category}: {count} pays classés contre "
+                                             f"{previous_count} la saison précédente", category))
+        both = valid & (previous != MISSING_RANK)
+        moves = np.abs(column.astype(np.int64) - previous.astype(np.int64))
+        jumped = both & (moves > MAX_RANK_JUMP)
+        jumps = int(np.count_nonzero(jumped))
+        compared = int(np.count_nonzero(both))
+        stats["jumps"] = jumps
+        if jumps:
+            share = jumps / compared
+            moved = [codes[i] for i in np.flatnonzero(jumped)] if codes else []
+            issue = _issue("jumps", f"{category}: {jumps}/{compared} pays bougent de plus de "
+                                    f"{MAX_RANK_JUMP} places {_codes_text(moved)}".rstrip(), category, moved)
+            (errors if share > MAX_JUMP_SHARE else warnings).append(issue)
+    return stats, errors, warnings
+
+
+def check_model(model, previous=None, countries=None, ties=TIE_POLICY):
+    """Contrôle qualité d'une saison (voir check_countries)"""
+    aligned = None
+    if previous is not None:
+        # Position de chaque pays courant dans la saison précédente (-1 si absent)
+        positions = previous.table.positions(model.table.codes)
+        known = positions >= 0
+        aligned = {}
+        for category in model.categories:
+            if category in previous.categories:
+                column = np.full(len(model), MISSING_RANK, dtype=model.ranks.dtype)
+                column[known] = previous.column(category)[positions[known]]
+                aligned[category] = column
+
+    errors = check_codes(countries) if countries is not None else []
+    warnings = []
+    statistics = {}
+    workers = max(1, min(len(model.categories), os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="etl-quality") as executor:
+        futures = {category: executor.submit(check_category, category, model.column(category),
+                                             aligned.get(category) if aligned else None, ties,
+                                             model.table.codes)
+                   for category in model.categories}
+        # Ordre des catégories conservé dans le rapport
+        for category, future in futures.items():
+            stats, category_errors, category_warnings = future.result()
+            statistics[category] = stats
+            errors.extend(category_errors)
+            warnings.extend(category_warnings)
+
+    return {
+        "season": model.season,
+        "ok": not errors,
+        "countries": len(model),
+        "tie_policy": ties,
+        "previous_season": previous.season if previous is not None else None,
+        "errors": errors,
+        "warnings": warnings,
+        "categories": statistics,
+    }
+
+
+def check_countries(countries, categories, masks, season=None, previous=None, ties=TIE_POLICY):
+    """Contrôle qualité des pays normalisés d'un build
+
+    Args:
+        countries: Pays normalisés (voir etl.normalize_countries)
+        categories: Ordre des catégories
+        masks: Masques de validité (voir snapshot_index.valid_masks)
+        season: Saison YYYY-MM
+        previous: SnapshotModel de la saison précédente, ou None
+        ties: Politique d'ex aequo du build
+
+    Returns:
+        dict: Rapport (ok, errors, warnings, statistiques par catégorie)
+    """
+    model = SnapshotModel.from_countries(countries, categories, masks, season)
+    return check_model(model, previous, countries, ties)
+
+
+def season_model(snapshot, all_ranks=None):
+    """Modèle d'une saison publiée, pour le contrôle ou la comparaison
+
+    Les rangs absents sont lus, dans l'ordre, dans les tables de rangs brutes
+    du build (all_ranks, voir build_manifest.recorded_ranks), puis dans la
+    section "indexes". Sans l'une ni l'autre, le snapshot ne les distingue
+    pas : le rang par défaut DEFAULT_RANK est alors considéré comme absent
+    (un vrai 196e aussi).
+
+    Args:
+        snapshot: Snapshot (dict)
+        all_ranks: Catégorie -> ISO3 -> rang des sources de ce snapshot, ou None
+    """
+    if all_ranks is not None:
+        countries = snapshot["countries"]
+        categories = list(next(iter(countries.values()))["ranks"]) if countries else []
+        meta = snapshot.get("meta", {})
+        return SnapshotModel.from_countries(countries, categories, valid_masks(countries, all_ranks, categories),
+                                            meta.get("season"), meta.get("generated_at"))
+    model = SnapshotModel.from_snapshot(snapshot)
+    if not snapshot.get("indexes"):
+        model.ranks[model.ranks == DEFAULT_RANK] = MISSING_RANK
+    return model
+
+
+def load_model(path, all_ranks=None):
+    """Charge une saison depuis un snapshot JSON (voir season_model)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return season_model(json.load(f), all_ranks)
+
+
+def format_report(report):
+    """Lignes de log du rapport"""
+    status = "OK" if report["ok"] else "ERREUR"
+    lines = [f"  [{status}] Controle qualite {report['season']}: {len(report['errors'])} erreur(s), "
+             f"{len(report['warnings'])} avertissement(s)"]
+    lines += [f"    [ERREUR] {issue['message']}" for issue in report["errors"]]
+    lines += [f"    [ATTENTION] {issue['message']}" for issue in report["warnings"]]
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Contrôle qualité des données d'un snapshot")
+    parser.add_argument("snapshot", help="Snapshot JSON")
+    parser.add_argument("--previous", help="Snapshot de la saison précédente (sauts de rang)")
+    parser.add_argument("--json", action="store_true", help="Afficher le rapport JSON")
+    args = parser.parse_args()
+    with open(args.snapshot, 'r', encoding='utf-8') as f:
+        snapshot = json.load(f)
+    previous = load_model(args.previous) if args.previous else None
+    report = check_model(season_model(snapshot), previous, snapshot["countries"])
+    print(json.dumps(report, ensure_ascii=False, indent=2) if args.json else "\n".join(format_report(report)))
+    sys.exit(0 if report["ok"] else 1)
@@ -0,0 +1,215 @@
+"""
+Moteur de classement vectorisé (NumPy)
+
+Classe des valeurs le long de l'axe des pays, pour plusieurs indicateurs et
+plusieurs années en une seule passe : un tableau années x pays x catégories
+de valeurs (NaN = donnée absente) devient un cube de rangs de même forme.
+Le sens du classement est choisi par catégorie et les ex aequo suivent une
+politique explicite :
+
+    competition - 1, 2, 2, 4 (rang du premier ex aequo, ex: classements sportifs)
+    dense       - 1, 2, 2, 3 (pas de trou après les ex aequo)
+    average     - 1, 2.5, 2.5, 4 (rang moyen, conserve la somme des rangs)
+    ordinal     - 1, 2, 3, 4 (rangs distincts, ex aequo départagés par code ISO3)
+
+Une donnée absente reçoit le rang 0 (ou NaN pour la politique average).
+"""
+
+import os
+
+import numpy as np
+
+TIE_POLICIES = ("competition", "dense", "average", "ordinal")
+# Politique du snapshot (les rangs du snapshot sont des entiers : average exclu)
+TIE_POLICY = os.getenv('ETL_TIE_POLICY', 'competition').lower()
+if TIE_POLICY not in TIE_POLICIES or TIE_POLICY == "average":
+    print(f"  [ATTENTION] ETL_TIE_POLICY '{TIE_POLICY}' invalide pour le snapshot, utilisation de 'competition'")
+    TIE_POLICY = "competition"
+
+
+def _check_policy(ties):
+    if ties not in TIE_POLICIES:
+        raise ValueError(f"Politique d'ex aequo inconnue: {ties} (attendu: {', '.join(TIE_POLICIES)})")
+
+
+def rank_array(values, descending=False, ties=TIE_POLICY, axis=-1):
+    """Classe les valeurs le long d'un axe (vectorisé sur tous les autres axes)
+
+    Args:
+        values: Tableau de valeurs (NaN = absente)
+        descending: True si la plus grande valeur est classée 1 ; booléen ou
+            tableau de booléens diffusable sur `values` (un sens par catégorie)
+        ties: Politique d'ex aequo (voir TIE_POLICIES)
+        axis: Axe le long duquel classer (celui des pays)
+
+    Returns:
+        np.ndarray: Rangs (int32, 0 = absente ; float64 et NaN pour average)
+    """
+    _check_policy(ties)
+    values = np.asarray(values, dtype=np.float64)
+    # Tri croissant unique : le sens décroissant revient à classer les valeurs opposées
+    keys = np.where(np.broadcast_to(descending, values.shape), -values, values)
+    keys = np.moveaxis(keys, axis, -1)
+    n = keys.shape[-1]
+
+    # argsort stable : à valeur égale, l'ordre d'origine (codes triés) départage
+    order = np.argsort(keys, axis=-1, kind="stable")
+    ordered = np.take_along_axis(keys, order, axis=-1)
+    valid = ~np.isnan(ordered)  # les NaN sont rangés à la fin
+    positions = np.broadcast_to(np.arange(n), ordered.shape)
+
+    if ties == "ordinal":
+        sorted_ranks = (positions + 1).astype(np.float64)
+    else:
+        starts = np.ones(ordered.shape, dtype=bool)
+        starts[..., 1:] = ordered[..., 1:] != ordered[..., :-1]
+        if ties == "dense":
+            sorted_ranks = np.cumsum(starts, axis=-1).astype(np.float64)
+        else:
+            # Position du premier élément de chaque groupe d'ex aequo
+            first = np.maximum.accumulate(np.where(starts, positions, 0), axis=-1)
+            sorted_ranks = (first + 1).astype(np.float64)
+            if ties == "average":
+                ends = np.ones(ordered.shape, dtype=bool)
+                ends[..., :-1] = starts[..., 1:]
+                last = np.flip(np.minimum.accumulate(
+                    np.flip(np.where(ends, positions, n), axis=-1), axis=-1), axis=-1)
+                sorted_ranks = (first + last) / 2 + 1
+    sorted_ranks[~valid] = np.nan
+
+    ranks = np.empty_like(sorted_ranks)
+    np.put_along_axis(ranks, order, sorted_ranks, axis=-1)
+    ranks = np.moveaxis(ranks, -1, axis)
+    if ties == "average":
+        return ranks
+    return np.nan_to_num(ranks, nan=0.0).astype(np.int32)
+
+
+def rank_dict(values, descending=False, ties=TIE_POLICY):
+    """Classe un dict ISO3 -> valeur ; retourne ISO3 -> rang (1 = meilleur)
+
+    Les codes sont d'abord triés, ce qui rend le départage déterministe.
+    """
+    if not values:
+        return {}
+    codes = sorted(values)
+    ranks = rank_array(np.fromiter((values[code] for code in codes), dtype=np.float64, count=len(codes)),
+                       descending=descending, ties=ties)
+    return {code: rank.item() for code, rank in zip(codes, ranks) if rank == rank and rank > 0}
+
+
+def forward_fill(values, axis=0):
+    """Propage la dernière valeur connue le long d'un axe (celui des années)
+
+    La valeur d'une année est alors « la dernière disponible à cette date »,
+    comme pour un indicateur récupéré sans année précise.
+    """
+    values = np.moveaxis(np.asarray(values, dtype=np.float64), axis, 0)
+    steps = np.arange(values.shape[0]).reshape((-1,) + (1,) * (values.ndim - 1))
+    last = np.maximum.accumulate(np.where(np.isnan(values), -1, steps), axis=0)
+    filled = np.take_along_axis(values, np.maximum(last, 0), axis=0)
+    filled[last < 0] = np.nan
+    return np.moveaxis(filled, 0, axis)
+
+
+class RankCube:
+    """Cube de rangs années x pays x catégories
+
+    Attributes:
+        years: Années (axe 0, croissantes)
+        codes: Codes ISO3 triés (axe 1)
+        categories: Catégories (axe 2)
+        values: Valeurs float64 (NaN = absente)
+        ranks: Rangs de même forme (0 = absent, NaN pour average)
+    """
+
+    def __init__(self, years, codes, categories, values, ranks, ties):
+        self.years = list(years)
+        self.codes = list(codes)
+        self.categories = list(categories)
+        self.values = values
+        self.ranks = ranks
+        self.ties = ties
+        self._year_index = {year: index for index, year in enumerate(self.years)}
+        self._code_index = {code: index for index, code in enumerate(self.codes)}
+        self._category_index = {category: index for index, category in enumerate(self.categories)}
+
+    @classmethod
+    def from_series(cls, series, descending=None, ties=TIE_POLICY, years=None, fill=True):
+        """Construit et classe le cube à partir de séries annuelles
+
+        Args:
+            series: Catégorie -> ISO3 -> année -> valeur
+            descending: Catégorie -> True si la plus grande valeur est classée 1
+            ties: Politique d'ex aequo
+            years: Années du cube (défaut : toutes celles présentes)
+            fill: Propager la dernière valeur connue aux années suivantes
+
+        Returns:
+            RankCube
+        """
+        descending = descending or {}
+        categories = list(series)
+        codes = sorted({code for by_code in series.values() for code in by_code})
+        if years is None:
+            years = sorted({int(year) for by_code in series.values()
+                            for by_year in by_code.values() for year in by_year})
+        years = sorted(int(year) for year in years)
+        year_index = {year: index for index, year in enumerate(years)}
+        code_index = {code: index for index, code in enumerate(codes)}
+
+        values = np.full((len(years), len(codes), len(categories)), np.nan)
+        for k, category in enumerate(categories):
+            for code, by_year in series[category].items():
+                i = code_index[code]
+                for year, value in by_year.items():
+                    y = year_index.get(int(year))
+                    if y is not None and value is not None:
+                        values[y, i, k] = value
+        if fill:
+            values = forward_fill(values, axis=0)
+        return cls.from_values(values, years, codes, categories, descending, ties)
+
+    @classmethod
+    def from_values(cls, values, years, codes, categories, descending=None, ties=TIE_POLICY):
+        """Classe un tableau de valeurs années x pays x catégories en une passe"""
+        descending = descending or {}
+        direction = np.array([bool(descending.get(category, False)) for category in categories])
+        ranks = rank_array(values, descending=direction[None, None, :], ties=ties, axis=1)
+        return cls(years, codes, categories, values, ranks, ties)
+
+    def year_index(self, year):
+        return self._year_index[int(year)]
+
+    def season_ranks(self, year=None):
+        """Tables de rangs d'une année (défaut : la dernière), au format des sources
+
+        Returns:
+            dict: Catégorie -> ISO3 -> rang
+        """
+        y = len(self.years) - 1 if year is None else self.year_index(year)
+        tables = {}
+        for k, category in enumerate(self.categories):
+            column = self.ranks[y, :, k]
+            present = np.flatnonzero(~np.isnan(column) if self.ties == "average" else column > 0)
+            tables[category] = {self.codes[i]: column[i].item() for i in present}
+        return tables
+
+    def history(self, iso3, category):
+        """Rangs d'un pays dans une catégorie, année par année (absents omis)"""
+        column = self.ranks[:, self._code_index[iso3], self._category_index[category]]
+        return {year: rank.item() for year, rank in zip(self.years, column)
+                if rank == rank and rank > 0}
+
+    def rank_change(self, from_year, to_year):
+        """Progression des rangs entre deux années (positif = meilleur classement)
+
+        Returns:
+            np.ndarray: pays x catégories, NaN si le pays est absent à l'une des dates
+        """
+        before = self.ranks[self.year_index(from_year)].astype(np.float64)
+        after = self.ranks[self.year_index(to_year)].astype(np.float64)
+        if self.ties != "average":
+            before[before == 0] = np.nan
+            after[after == 0] = np.nan
+        return before - after
@@ -0,0 +1,253 @@
+"""
+Format binaire compact du snapshot (.geosnap) et chargeur mmap
+
+Le snapshot JSON répète le nom, le drapeau et les noms de catégories pour
+chaque pays. Le format binaire stocke une table des pays et une matrice
+dense de rangs uint16 en ordre catégorie-majeur : une colonne de catégorie
+est un bloc contigu, lisible sans parser de JSON et sans copie.
+
+Structure (entiers little-endian) :
+    en-tête (32 octets) : magic "GEOSNAP\\0", version u16, nb_pays u16,
+        nb_categories u16, réservé u16, offset/longueur de la table de
+        chaînes (u32, u32), offset/longueur de la matrice (u32, u32)
+    table de chaînes : nb u32, puis nb offsets u32 (fin de chaque chaîne),
+        puis les chaînes UTF-8 concaténées. Ordre : saison, date de
+        génération, catégories, puis (nom, drapeau) de chaque pays
+    codes ISO3 : nb_pays * 3 octets ASCII, triés (juste après l'en-tête)
+    matrice : nb_categories * nb_pays rangs u16, alignée sur 8 octets
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+MAGIC = b"GEOSNAP\0"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sHHHHIIII")
+MAX_RANK = 0xFFFF
+
+
+def _align(offset, alignment=8):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def encode_snapshot(snapshot, categories=None):
+    """Encode un snapshot (dict JSON) au format binaire
+
+    Args:
+        snapshot: Snapshot au format JSON ({"meta": ..., "countries": ...})
+        categories: Ordre des catégories (défaut : ordre du premier pays)
+
+    Returns:
+        bytes: Contenu du fichier .geosnap
+    """
+    countries = snapshot["countries"]
+    codes = sorted(countries)
+    if categories is None:
+        categories = list(countries[codes[0]]["ranks"]) if codes else []
+    for iso3 in codes:
+        if len(iso3.encode('ascii')) != 3:
+            raise ValueError(f"Code pays invalide pour le format binaire: {iso3!r}")
+
+    meta = snapshot.get("meta", {})
+    strings = [meta.get("season", ""), meta.get("generated_at", ""), *categories]
+    for iso3 in codes:
+        strings.extend((countries[iso3]["name"], countries[iso3]["flag"]))
+    encoded = [string.encode('utf-8') for string in strings]
+    ends = array('I')
+    position = 0
+    for value in encoded:
+        position += len(value)
+        ends.append(position)
+    if sys.byteorder != "little":
+        ends.byteswap()
+    string_table = struct.pack("<I", len(encoded)) + ends.tobytes() + b"".join(encoded)
+
+    matrix = array('H')
+    for category in categories:
+        for iso3 in codes:
+            rank = countries[iso3]["ranks"].get(category)
+            if rank is None or not 0 <= rank <= MAX_RANK:
+                raise ValueError(f"Rang invalide pour {iso3}/{category}: {rank!r}")
+            matrix.append(rank)
+    if sys.byteorder != "little":
+        matrix.byteswap()
+
+    codes_offset = HEADER.size
+    strings_offset = codes_offset + 3 * len(codes)
+    matrix_offset = _align(strings_offset + len(string_table))
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(codes), len(categories), 0,
+                         strings_offset, len(string_table), matrix_offset, len(matrix) * 2)
+    padding = b"\0" * (matrix_offset - strings_offset - len(string_table))
+    return b"".join((header, "".join(codes).encode('ascii'), string_table, padding, matrix.tobytes()))
+
+
+def write_binary_snapshot(snapshot, path, categories=None):
+    """Écrit le snapshot au format binaire et retourne sa taille en octets"""
+    data = encode_snapshot(snapshot, categories)
+    Path(path).write_bytes(data)
+    return len(data)
+
+
+class BinarySnapshot:
+    """Snapshot binaire mappé en mémoire
+
+    Les rangs sont lus directement dans le fichier (mmap) : column() retourne
+    une vue sans copie. Les vues retournées doivent être libérées avant
+    close().
+
+    Exemple :
+        with BinarySnapshot("snapshot/snapshot-2025-11.geosnap") as snap:
+            snap.rank("FRA", "gdp")
+            gdp = snap.column("gdp")
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        try:
+            self._load()
+        except Exception:
+            self.close()
+            raise
+
+    def _load(self):
+        (magic, version, n_countries, n_categories, _, strings_offset, strings_len,
+         matrix_offset, matrix_len) = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} n'est pas un snapshot binaire")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Version de format non supportee: {version}")
+        if matrix_len != 2 * n_countries * n_categories:
+            raise ValueError(f"Matrice de rangs corrompue dans {self.path}")
+
+        self.n_countries = n_countries
+        self.n_categories = n_categories
+        self._codes = self._view[HEADER.size:HEADER.size + 3 * n_countries]
+        self._strings_offset = strings_offset
+        (self._n_strings,) = struct.unpack_from("<I", self._mmap, strings_offset)
+        self._ends = self._view[strings_offset + 4:strings_offset + 4 + 4 * self._n_strings]
+        self._strings_data = strings_offset + 4 + 4 * self._n_strings
+
+        matrix = self._view[matrix_offset:matrix_offset + matrix_len]
+        if sys.byteorder == "little":
+            self._matrix = matrix.cast('H')
+        else:
+            # Machine big-endian : une copie convertie est nécessaire
+            swapped = array('H', matrix.tobytes())
+            swapped.byteswap()
+            self._matrix = memoryview(swapped)
+            matrix.release()
+
+        self.season = self._string(0)
+        self.generated_at = self._string(1)
+        self.categories = tuple(self._string(2 + index) for index in range(n_categories))
+        self._category_index = {category: index for index, category in enumerate(self.categories)}
+
+    def _string(self, index):
+        start = struct.unpack_from("<I", self._ends, 4 * (index - 1))[0] if index else 0
+        end = struct.unpack_from("<I", self._ends, 4 * index)[0]
+        return bytes(self._mmap[self._strings_data + start:self._strings_data + end]).decode('utf-8')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.n_countries
+
+    def __contains__(self, iso3):
+        return self.index_of(iso3) is not None
+
+    def close(self):
+        """Libère les vues et ferme le fichier"""
+        for name in ("_matrix", "_ends", "_codes", "_view"):
+            view = getattr(self, name, None)
+            if isinstance(view, memoryview):
+                view.release()
+        if getattr(self, "_mmap", None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        if getattr(self, "_file", None) is not None:
+            self._file.close()
+            self._file = None
+
+    def code(self, index):
+        """Code ISO3 du pays d'indice index"""
+        return bytes(self._codes[3 * index:3 * index + 3]).decode('ascii')
+
+    @property
+    def codes(self):
+        """Codes ISO3 de tous les pays (triés)"""
+        raw = bytes(self._codes).decode('ascii')
+        return tuple(raw[i:i + 3] for i in range(0, len(raw), 3))
+
+    def index_of(self, iso3):
+        """Indice d'un pays (recherche dichotomique dans les codes triés), ou None"""
+        target = iso3.encode('ascii')
+        low, high = 0, self.n_countries
+        codes = self._codes
+        while low < high:
+            middle = (low + high) // 2
+            if codes[3 * middle:3 * middle + 3].tobytes() < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.n_countries and codes[3 * low:3 * low + 3].tobytes() == target:
+            return low
+        return None
+
+    def category_index(self, category):
+        """Indice d'une catégorie (KeyError si inconnue)"""
+        return self._category_index[category]
+
+    def column(self, category):
+        """Rangs de tous les pays pour une catégorie (vue uint16 sans copie)"""
+        start = self.category_index(category) * self.n_countries
+        return self._matrix[start:start + self.n_countries]
+
+    def matrix(self):
+        """Matrice complète en ordre catégorie-majeur (vue uint16 sans copie, à libérer)"""
+        return self._matrix[:]
+
+    def rank(self, iso3, category):
+        """Rang d'un pays dans une catégorie (KeyError si le pays est inconnu)"""
+        return self._matrix[self.category_index(category) * self.n_countries + self._checked_index(iso3)]
+
+    def _checked_index(self, iso3):
+        index = self.index_of(iso3)
+        if index is None:
+            raise KeyError(iso3)
+        return index
+
+    def _ranks_at(self, index):
+        return {category: self._matrix[position * self.n_countries + index]
+                for position, category in enumerate(self.categories)}
+
+    def ranks(self, iso3):
+        """Rangs d'un pays pour toutes les catégories"""
+        return self._ranks_at(self._checked_index(iso3))
+
+    def country(self, iso3):
+        """Entrée d'un pays au format du snapshot JSON"""
+        index = self._checked_index(iso3)
+        base = 2 + self.n_categories + 2 * index
+        return {"name": self._string(base), "flag": self._string(base + 1), "ranks": self._ranks_at(index)}
+
+    def to_snapshot(self):
+        """Reconstruit le snapshot au format JSON"""
+        return {
+            "meta": {"season": self.season, "generated_at": self.generated_at},
+            "countries": {iso3: self.country(iso3) for iso3 in self.codes},
+        }
+
+
+def load_binary_snapshot(path):
+    """Ouvre un snapshot binaire (à fermer avec close() ou via with)"""
+    return BinarySnapshot(path)
@@ -0,0 +1,183 @@
+"""
+Deltas entre deux saisons de snapshot
+
+D'une saison à l'autre, la plupart des rangs ne bougent pas. Un delta ne
+contient que les rangs modifiés, les pays ajoutés et les pays retirés ;
+apply_delta reconstruit le snapshot cible octet pour octet à partir du
+snapshot précédent, et vérifie les deux empreintes SHA-256.
+
+Format (JSON compact) :
+    {
+      "format": "geo-challenge-delta", "version": 1,
+      "from": {"season": ..., "sha256": ..., "size": ...},
+      "to": {"season": ..., "sha256": ..., "size": ...},
+      "keys": [...],          # ordre des clés de premier niveau du snapshot cible
+      "document": {...},      # clés de premier niveau sauf "countries" et "indexes" (meta, ...)
+      "indexes": {...},       # catégories et masques de validité, si le snapshot a des index
+      "removed": [...],       # ISO3 retirés
+      "added": {...},         # ISO3 -> entrée complète
+      "replaced": {...},      # ISO3 -> entrée complète (nom, drapeau ou catégories modifiés)
+      "changed": {...},       # ISO3 -> {catégorie: nouveau rang}
+      "order": [...]          # ordre des pays, seulement s'il ne se déduit pas
+    }
+
+La section "indexes" se déduit des pays et des masques de validité : elle
+est reconstruite par snapshot_index.build_indexes au lieu d'être transportée.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+from snapshot_index import build_indexes, masks_from_indexes
+
+DELTA_FORMAT = "geo-challenge-delta"
+DELTA_VERSION = 1
+
+
+def serialize_snapshot(snapshot):
+    """Sérialisation canonique du snapshot (celle écrite par generate_snapshot)"""
+    return json.dumps(snapshot, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def _fingerprint(snapshot, data):
+    return {
+        "season": snapshot.get("meta", {}).get("season"),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "size": len(data),
+    }
+
+
+def _default_order(previous_countries, removed, added):
+    removed = set(removed)
+    return [iso3 for iso3 in previous_countries if iso3 not in removed] + list(added)
+
+
+def diff_snapshots(previous_data, current_data):
+    """Calcule le delta entre deux snapshots sérialisés
+
+    Args:
+        previous_data: Contenu (bytes) du snapshot de la saison précédente
+        current_data: Contenu (bytes) du nouveau snapshot
+
+    Returns:
+        dict: Delta au format DELTA_FORMAT
+    """
+    previous = json.loads(previous_data)
+    current = json.loads(current_data)
+    previous_countries = previous.get("countries", {})
+    current_countries = current.get("countries", {})
+
+    removed = [iso3 for iso3 in previous_countries if iso3 not in current_countries]
+    added = {}
+    replaced = {}
+    changed = {}
+    for iso3, entry in current_countries.items():
+        before = previous_countries.get(iso3)
+        if before is None:
+            added[iso3] = entry
+            continue
+        if (entry.get("name") != before.get("name") or entry.get("flag") != before.get("flag")
+                or list(entry.get("ranks", {})) != list(before.get("ranks", {}))
+                or list(entry) != list(before)):
+            replaced[iso3] = entry
+            continue
+        ranks = {category: rank for category, rank in entry["ranks"].items()
+                 if before["ranks"].get(category) != rank}
+        if ranks:
+            changed[iso3] = ranks
+
+    delta = {
+        "format": DELTA_FORMAT,
+        "version": DELTA_VERSION,
+        "from": _fingerprint(previous, previous_data),
+        "to": _fingerprint(current, current_data),
+        "keys": list(current),
+        "document": {key: value for key, value in current.items() if key not in ("countries", "indexes")},
+        "removed": removed,
+        "added": added,
+        "replaced": replaced,
+        "changed": changed,
+    }
+    if "indexes" in current:
+        delta["indexes"] = {
+            "categories": current["indexes"]["categories"],
+            "valid": masks_from_indexes(current["indexes"]),
+        }
+    order = list(current_countries)
+    if order != _default_order(previous_countries, removed, added):
+        delta["order"] = order
+    return delta
+
+
+def apply_delta(previous_data, delta):
+    """Reconstruit le snapshot cible (bytes) à partir du précédent et d'un delta
+
+    Raises:
+        ValueError: Format inconnu, snapshot de base différent de celui du
+            delta, ou résultat dont l'empreinte ne correspond pas
+    """
+    if delta.get("format") != DELTA_FORMAT or delta.get("version") != DELTA_VERSION:
+        raise ValueError("Format de delta non supporte")
+    if hashlib.sha256(previous_data).hexdigest() != delta["from"]["sha256"]:
+        raise ValueError(f"Le snapshot de base ne correspond pas au delta (saison {delta['from']['season']})")
+
+    previous_countries = json.loads(previous_data).get("countries", {})
+    added = delta["added"]
+    replaced = delta["replaced"]
+    changed = delta["changed"]
+    order = delta.get("order") or _default_order(previous_countries, delta["removed"], added)
+
+    countries = {}
+    for iso3 in order:
+        if iso3 in added:
+            countries[iso3] = added[iso3]
+        elif iso3 in replaced:
+            countries[iso3] = replaced[iso3]
+        else:
+            entry = dict(previous_countries[iso3])
+            if iso3 in changed:
+                entry["ranks"] = {**entry["ranks"], **changed[iso3]}
+            countries[iso3] = entry
+
+    document = dict(delta["document"])
+    document["countries"] = countries
+    if "indexes" in delta:
+        document["indexes"] = build_indexes(countries, delta["indexes"]["categories"], delta["indexes"]["valid"])
+    snapshot = {key: document[key] for key in delta["keys"]}
+    data = serialize_snapshot(snapshot)
+    if hashlib.sha256(data).hexdigest() != delta["to"]["sha256"]:
+        raise ValueError(f"Empreinte du snapshot reconstruit invalide (saison {delta['to']['season']})")
+    return data
+
+
+def delta_filename(delta):
+    """Nom de fichier conventionnel d'un delta"""
+    return f"delta-{delta['from']['season']}_{delta['to']['season']}.json"
+
+
+def write_delta(previous_file, current_file, output_dir=None):
+    """Calcule, vérifie et écrit le delta entre deux fichiers de snapshot
+
+    Returns:
+        tuple: (chemin du delta, taille du delta en octets, taille du snapshot cible)
+    """
+    previous_data = Path(previous_file).read_bytes()
+    current_data = Path(current_file).read_bytes()
+    delta = diff_snapshots(previous_data, current_data)
+    # Vérifier la reconstruction avant de publier le delta
+    apply_delta(previous_data, delta)
+    encoded = json.dumps(delta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    path = Path(output_dir or Path(current_file).parent) / delta_filename(delta)
+    path.write_bytes(encoded)
+    return path, len(encoded), len(current_data)
+
+
+def previous_snapshot_file(snapshot_dir, season):
+    """Dernier snapshot JSON d'une saison antérieure à season, ou None"""
+    candidates = []
+    for path in Path(snapshot_dir).glob("snapshot-*.json"):
+        file_season = path.stem[len("snapshot-"):]
+        if file_season < season:
+            candidates.append((file_season, path))
+    return max(candidates)[1] if candidates else None
@@ -0,0 +1,112 @@
+"""
+Index précalculés du snapshot (section optionnelle "indexes")
+
+Le client consulte à chaque tour les mêmes informations (meilleure catégorie
+d'un pays, classement d'une catégorie...) : elles sont calculées une fois au
+build et écrites dans le snapshot, pour des lectures en O(1).
+
+Format :
+    "indexes": {
+      "version": 1,
+      "categories": [...],                 # ordre des bits de "valid"
+      "coverage": {catégorie: nombre de pays classés},
+      "by_category": {catégorie: [ISO3 du 1er au dernier]},
+      "by_country": {ISO3: {
+          "best": catégorie du meilleur rang (null si aucune),
+          "best_rank": rang correspondant,
+          "valid": masque des catégories où le pays est réellement classé
+                   (bit i = categories[i]),
+          "percentiles": {catégorie: part des pays classés moins bien (100 = 1er, 0 = dernier)}
+      }}
+    }
+
+Les pays absents d'une source ont le rang par défaut 196 dans le snapshot :
+seul le masque "valid" permet de les distinguer d'un vrai 196e. Tout le reste
+de la section se déduit des pays et de ces masques (voir build_indexes), ce
+qui permet aux deltas de ne transporter que les masques.
+"""
+
+from bisect import bisect_right
+
+INDEX_VERSION = 1
+
+
+def valid_masks(countries, all_ranks, categories):
+    """Masque des catégories où chaque pays a un rang issu de sa source
+
+    Args:
+        countries: Pays normalisés (ISO3 -> entrée)
+        all_ranks: Catégorie -> dict ISO3 -> rang (tables des sources)
+        categories: Ordre des catégories (bit i = categories[i])
+
+    Returns:
+        dict: ISO3 -> masque entier
+    """
+    masks = {}
+    for iso3 in countries:
+        mask = 0
+        for bit, category in enumerate(categories):
+            if all_ranks.get(category, {}).get(iso3):
+                mask |= 1 << bit
+        masks[iso3] = mask
+    return masks
+
+
+def build_indexes(countries, categories, masks):
+    """Construit la section "indexes" à partir des pays et des masques de validité
+
+    Déterministe : mêmes entrées, même section (les deltas la reconstruisent).
+
+    Args:
+        countries: Pays normalisés (ISO3 -> entrée avec "ranks")
+        categories: Ordre des catégories
+        masks: ISO3 -> masque de validité (voir valid_masks)
+
+    Returns:
+        dict: Section "indexes" du snapshot
+    """
+    by_category = {}
+    coverage = {}
+    sorted_ranks = {}
+    for bit, category in enumerate(categories):
+        ranked = sorted((entry["ranks"][category], iso3) for iso3, entry in countries.items()
+                        if masks.get(iso3, 0) >> bit & 1)
+        by_category[category] = [iso3 for _, iso3 in ranked]
+        coverage[category] = len(ranked)
+        sorted_ranks[category] = [rank for rank, _ in ranked]
+
+    by_country = {}
+    for iso3, entry in countries.items():
+        mask = masks.get(iso3, 0)
+        best = None
+        best_rank = None
+        percentiles = {}
+        for bit, category in enumerate(categories):
+            if not mask >> bit & 1:
+                continue
+            rank = entry["ranks"][category]
+            if best_rank is None or rank < best_rank:
+                best, best_rank = category, rank
+            # Les rangs des fichiers locaux peuvent avoir des trous : on compte les pays moins bien classés
+            total = coverage[category]
+            worse = total - bisect_right(sorted_ranks[category], rank)
+            percentiles[category] = round(100 * worse / (total - 1)) if total > 1 else 100
+        by_country[iso3] = {
+            "best": best,
+            "best_rank": best_rank,
+            "valid": mask,
+            "percentiles": percentiles,
+        }
+
+    return {
+        "version": INDEX_VERSION,
+        "categories": list(categories),
+        "coverage": coverage,
+        "by_category": by_category,
+        "by_country": by_country,
+    }
+
+
+def masks_from_indexes(indexes):
+    """Masques de validité d'une section "indexes" existante"""
+    return {iso3: entry["valid"] for iso3, entry in indexes.get("by_country", {}).items()}
@@ -0,0 +1,267 @@
+"""
+Modèle compact du snapshot pour les outils Python
+
+Le snapshot JSON chargé tel quel est un dict de dicts : pour chaque pays un
+dict d'entrée et un dict de rangs, dont les clés répètent les noms de
+catégories, et le rang par défaut 196 est stocké pour chaque valeur absente.
+Un outil qui garde plusieurs saisons en mémoire paie ces objets pour chaque
+saison.
+
+SnapshotModel (avec __slots__) stocke à la place :
+    - les catégories une seule fois (chaînes internées, indice par catégorie)
+    - une table des pays (codes ISO3, noms, drapeaux) partagée entre
+      les saisons qui ont la même (CountryTable)
+    - une matrice de rangs uint16 catégories x pays (une colonne contiguë par
+      catégorie, comme .geosnap), avec une valeur sentinelle unique
+      MISSING_RANK (0) pour les rangs absents
+
+Les rangs absents sont connus grâce aux masques de la section "indexes" ; un
+snapshot sans index est considéré entièrement renseigné. to_snapshot()
+restitue exactement le JSON d'origine (rang 196 pour les absents, section
+"indexes" reconstruite, pays dans l'ordre d'origine).
+
+Usage :
+    python snapshot_model.py ../snapshot/snapshot-2025-11.json [--seasons 12]
+"""
+
+import argparse
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from snapshot_binary import BinarySnapshot
+from snapshot_delta import serialize_snapshot
+from snapshot_index import build_indexes, masks_from_indexes
+
+# Valeur stockée pour un rang absent (jamais un rang réel)
+MISSING_RANK = 0
+# Rang écrit dans le snapshot JSON pour un rang absent (voir etl.build_country_ranks)
+DEFAULT_RANK = 196
+RANK_DTYPE = np.uint16
+
+
+class CountryTable:
+    """Codes ISO3, noms et drapeaux des pays (partageable entre saisons)"""
+
+    __slots__ = ("codes", "names", "flags", "_index")
+
+    def __init__(self, codes, names, flags):
+        self.codes = tuple(sys.intern(code) for code in codes)
+        self.names = tuple(names)
+        self.flags = tuple(flags)
+        self._index = {code: position for position, code in enumerate(self.codes)}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __eq__(self, other):
+        return (isinstance(other, CountryTable) and self.codes == other.codes
+                and self.names == other.names and self.flags == other.flags)
+
+    __hash__ = None
+
+    def index_of(self, iso3):
+        """Indice d'un pays (KeyError si inconnu)"""
+        return self._index[iso3]
+
+    def positions(self, codes):
+        """Indices de plusieurs pays (np.ndarray, -1 pour un pays absent de la table)"""
+        return np.array([self._index.get(code, -1) for code in codes], dtype=np.int64)
+
+
+class SnapshotModel:
+    """Une saison : table des pays partagée et matrice de rangs uint16
+
+    Attributes:
+        season: Saison YYYY-MM
+        generated_at: Date de génération (ISO)
+        categories: Catégories (tuple de chaînes internées)
+        table: CountryTable
+        ranks: np.ndarray uint16 catégories x pays (MISSING_RANK = absent)
+        has_indexes: Le snapshot d'origine avait une section "indexes"
+    """
+
+    __slots__ = ("season", "generated_at", "categories", "table", "ranks", "has_indexes", "_category_index")
+
+    def __init__(self, season, generated_at, categories, table, ranks, has_indexes=False):
+        self.season = season
+        self.generated_at = generated_at
+        self.categories = tuple(sys.intern(category) for category in categories)
+        self.table = table
+        self.ranks = np.ascontiguousarray(ranks, dtype=RANK_DTYPE)
+        if self.ranks.shape != (len(self.categories), len(table)):
+            raise ValueError(f"Matrice de rangs {self.ranks.shape} incompatible avec "
+                             f"{len(self.categories)} catégories et {len(table)} pays")
+        self.has_indexes = has_indexes
+        self._category_index = {category: position for position, category in enumerate(self.categories)}
+
+    @classmethod
+    def from_countries(cls, countries, categories, masks=None, season=None, generated_at=None, table=None):
+        """Construit le modèle depuis des pays normalisés (voir etl.normalize_countries)
+
+        Args:
+            countries: ISO3 -> entrée (name, flag, ranks)
+            categories: Ordre des catégories (bit i des masques = categories[i])
+            masks: ISO3 -> masque de validité (défaut : tous les rangs renseignés)
+            season: Saison YYYY-MM
+            generated_at: Date de génération (ISO)
+            table: CountryTable à réutiliser si elle est identique (saisons multiples)
+        """
+        codes = list(countries)
+        candidate = CountryTable(codes, (countries[code]["name"] for code in codes),
+                                 (countries[code]["flag"] for code in codes))
+        if table is None or table != candidate:
+            table = candidate
+
+        ranks = np.array([[countries[code]["ranks"][category] for code in codes] for category in categories],
+                         dtype=RANK_DTYPE).reshape(len(categories), len(codes))
+        if masks is not None:
+            bits = np.array([masks.get(code, 0) for code in codes], dtype=np.int64)
+            for position in range(len(categories)):
+                ranks[position, (bits >> position) & 1 == 0] = MISSING_RANK
+        return cls(season, generated_at, categories, table, ranks, masks is not None)
+
+    @classmethod
+    def from_snapshot(cls, snapshot, table=None):
+        """Construit le modèle depuis un snapshot JSON déjà chargé
+
+        Args:
+            snapshot: Snapshot (dict)
+            table: CountryTable à réutiliser si elle est identique (saisons multiples)
+        """
+        countries = snapshot["countries"]
+        indexes = snapshot.get("indexes")
+        if indexes:
+            categories = indexes["categories"]
+        else:
+            categories = list(next(iter(countries.values()))["ranks"]) if countries else []
+        meta = snapshot.get("meta", {})
+        return cls.from_countries(countries, categories, masks_from_indexes(indexes) if indexes else None,
+                                  meta.get("season"), meta.get("generated_at"), table)
+
+    @classmethod
+    def load(cls, path, table=None):
+        """Charge un snapshot .json ou .geosnap (ce dernier n'a pas d'index : tout est renseigné)"""
+        path = Path(path)
+        if path.suffix == ".geosnap":
+            with BinarySnapshot(path) as snap:
+                return cls.from_snapshot(snap.to_snapshot(), table)
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_snapshot(json.load(f), table)
+
+    def __len__(self):
+        return len(self.table)
+
+    def __contains__(self, iso3):
+        return iso3 in self.table._index
+
+    def __iter__(self):
+        return iter(self.table.codes)
+
+    def category_index(self, category):
+        """Indice d'une catégorie (KeyError si inconnue)"""
+        return self._category_index[category]
+
+    def column(self, category):
+        """Rangs de tous les pays pour une catégorie (vue uint16, MISSING_RANK = absent)"""
+        return self.ranks[self.category_index(category)]
+
+    def valid(self, category=None):
+        """Masque des rangs renseignés (une catégorie, ou toute la matrice)"""
+        values = self.ranks if category is None else self.column(category)
+        return values != MISSING_RANK
+
+    def rank(self, iso3, category):
+        """Rang d'un pays dans une catégorie (None si absent)"""
+        rank = int(self.ranks[self.category_index(category), self.table.index_of(iso3)])
+        return None if rank == MISSING_RANK else rank
+
+    def country(self, iso3):
+        """Entrée d'un pays au format du snapshot JSON"""
+        position = self.table.index_of(iso3)
+        column = self.ranks[:, position]
+        return {
+            "name": self.table.names[position],
+            "flag": self.table.flags[position],
+            "ranks": {category: int(rank) if rank != MISSING_RANK else DEFAULT_RANK
+                      for category, rank in zip(self.categories, column.tolist())},
+        }
+
+    def masks(self):
+        """Masques de validité par pays (format de snapshot_index)"""
+        weights = (1 << np.arange(len(self.categories), dtype=np.int64))[:, None]
+        bits = (self.valid().astype(np.int64) * weights).sum(axis=0)
+        return dict(zip(self.table.codes, bits.tolist()))
+
+    def to_snapshot(self):
+        """Reconstruit le snapshot JSON (identique à celui d'origine)"""
+        countries = {iso3: self.country(iso3) for iso3 in self.table.codes}
+        snapshot = {
+            "meta": {"season": self.season, "generated_at": self.generated_at},
+            "countries": countries,
+        }
+        if self.has_indexes:
+            snapshot["indexes"] = build_indexes(countries, self.categories, self.masks())
+        return snapshot
+
+    def to_json(self):
+        """Sérialisation canonique (celle de generate_snapshot)"""
+        return serialize_snapshot(self.to_snapshot())
+
+
+def load_seasons(paths):
+    """Charge plusieurs saisons ; les saisons aux pays identiques partagent leur CountryTable"""
+    models = []
+    table = None
+    for path in paths:
+        model = SnapshotModel.load(path, table)
+        table = model.table
+        models.append(model)
+    return models
+
+
+def measure_memory(path, seasons=1):
+    """Compare la mémoire de `seasons` copies du snapshot : dicts JSON contre SnapshotModel
+
+    Returns:
+        tuple: (octets pour les dicts, octets pour les modèles)
+    """
+    data = Path(path).read_bytes()
+
+    def allocated(build):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        size = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        del kept
+        return size
+
+    # Les dicts : ce que garde un outil qui charge chaque saison (sans la section indexes)
+    def as_dicts():
+        return [json.loads(data)["countries"] for _ in range(seasons)]
+
+    def as_models():
+        snapshots = [json.loads(data) for _ in range(seasons)]
+        models = []
+        table = None
+        for snapshot in snapshots:
+            models.append(SnapshotModel.from_snapshot(snapshot, table))
+            table = models[-1].table
+        del snapshots
+        return models
+
+    return allocated(as_dicts), allocated(as_models)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mémoire du modèle compact comparée aux dicts JSON")
+    parser.add_argument("snapshot", help="Snapshot JSON")
+    parser.add_argument("--seasons", type=int, default=1, help="Nombre de saisons gardées en mémoire")
+    args = parser.parse_args()
+    dicts, models = measure_memory(args.snapshot, args.seasons)
+    print(f"[OK] {args.seasons} saison(s) : dicts {dicts / 1024:.1f} Ko, modele {models / 1024:.1f} Ko "
+          f"({dicts / max(models, 1):.1f}x moins)")
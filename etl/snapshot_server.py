@@ -0,0 +1,408 @@
+"""
+Service local de consultation des snapshots
+
+Charge une ou plusieurs saisons en mémoire (rangs, index précalculés, matrice
+du solver) et répond à des requêtes ciblées au lieu de faire télécharger et
+parser le snapshot entier à chaque client (statistiques, validation du
+classement, outils).
+
+Routes (réponses JSON) :
+    GET  /seasons                                      saisons chargées
+    GET  /countries/<ISO3>?season=                     fiche d'un pays (rangs, index)
+    GET  /categories/<catégorie>?offset=&limit=&season= tranche d'un classement
+    GET  /draw?mode=normal&seed=&season=               tirage d'une partie
+    POST /score                                        score d'une partie et score optimal
+
+`season` vaut par défaut la saison la plus récente. Un tirage avec `seed` est
+reproductible (même graine, même saison, même mode = mêmes pays) ; sans
+graine il est aléatoire et jamais mis en cache.
+
+Les réponses GET déterministes sont mises en cache (corps, ETag et variante
+gzip) : une requête conditionnelle (If-None-Match) reçoit un 304 sans
+re-sérialisation. Les requêtes sont servies en parallèle (un thread par
+connexion, keep-alive HTTP/1.1). Aucune dépendance hors bibliothèque
+standard et NumPy : seuls les fichiers de snapshot sont nécessaires.
+
+Usage :
+    python snapshot_server.py                           # toutes les saisons de snapshot/
+    python snapshot_server.py ../snapshot/snapshot-2025-11.json --port 8765
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+
+from publish import HASH_LENGTH, minify_snapshot
+from puzzles import GAME_MODES, derive_seed
+from snapshot_index import build_indexes
+from solver import RankMatrix, optimal_assignment
+
+SNAPSHOT_DIR = Path(__file__).parent.parent / "snapshot"
+SERVER_HOST = os.getenv('ETL_SERVER_HOST', '127.0.0.1')
+SERVER_PORT = int(os.getenv('ETL_SERVER_PORT', '8765'))
+# Nombre de réponses GET gardées en mémoire (corps, ETag, variante gzip)
+RESPONSE_CACHE_SIZE = int(os.getenv('ETL_SERVER_CACHE_SIZE', '4096'))
+# En dessous de cette taille, la compression ne vaut pas son coût
+COMPRESS_MIN_SIZE = 1024
+PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+MAX_BODY_SIZE = 64 * 1024
+
+
+class ServiceError(Exception):
+    """Erreur renvoyée au client (statut HTTP + message)"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Season:
+    """Une saison chargée : snapshot, index et matrice des rangs"""
+
+    def __init__(self, snapshot, source=None):
+        self.snapshot = snapshot
+        self.source = source
+        self.countries = snapshot["countries"]
+        self.name = snapshot.get("meta", {}).get("season", "unknown")
+        indexes = snapshot.get("indexes")
+        if indexes:
+            self.categories = list(indexes["categories"])
+        else:
+            # Snapshot sans index (antérieur à snapshot_index) : tous les rangs sont considérés valides
+            first = next(iter(self.countries.values()), {"ranks": {}})
+            self.categories = list(first["ranks"])
+            full_mask = (1 << len(self.categories)) - 1
+            indexes = build_indexes(self.countries, self.categories,
+                                    {iso3: full_mask for iso3 in self.countries})
+        self.indexes = indexes
+        self.matrix = RankMatrix.from_snapshot(snapshot, self.categories)
+        # Même empreinte que le fichier publié (publish.py)
+        self.digest = hashlib.sha256(minify_snapshot(snapshot)).hexdigest()[:HASH_LENGTH]
+
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), path)
+
+    def summary(self):
+        return {
+            "season": self.name,
+            "generated_at": self.snapshot.get("meta", {}).get("generated_at"),
+            "digest": self.digest,
+            "countries": len(self.countries),
+            "categories": self.categories,
+            "coverage": self.indexes.get("coverage", {}),
+        }
+
+    def country(self, iso3):
+        iso3 = iso3.upper()
+        entry = self.countries.get(iso3)
+        if entry is None:
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"Pays inconnu: {iso3}")
+        return {"season": self.name, "iso3": iso3, **entry,
+                "index": self.indexes["by_country"].get(iso3)}
+
+    def category(self, category, offset=0, limit=PAGE_LIMIT):
+        ranked = self.indexes["by_category"].get(category)
+        if ranked is None:
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"Catégorie inconnue: {category}")
+        page = ranked[offset:offset + limit]
+        return {
+            "season": self.name,
+            "category": category,
+            "total": len(ranked),
+            "offset": offset,
+            "limit": limit,
+            "countries": [{"iso3": iso3, "name": self.countries[iso3]["name"],
+                           "rank": self.countries[iso3]["ranks"][category]} for iso3 in page],
+        }
+
+    def draw(self, mode, seed=None):
+        settings = GAME_MODES.get(mode)
+        if settings is None:
+            raise ServiceError(HTTPStatus.BAD_REQUEST,
+                               f"Mode inconnu: {mode} (attendu: {', '.join(GAME_MODES)})")
+        rng = np.random.default_rng(None if seed is None else derive_seed("draw", self.name, mode, seed))
+        draw = rng.choice(len(self.matrix.codes), settings["countries"], replace=False)
+        countries = [self.matrix.codes[index] for index in draw]
+        return {
+            "season": self.name,
+            "mode": mode,
+            "seed": seed,
+            "categories": settings["categories"],
+            "countries": [{"iso3": iso3, "name": self.countries[iso3]["name"],
+                           "flag": self.countries[iso3].get("flag")} for iso3 in countries],
+        }
+
+    def score(self, assignments, countries=None, categories=None, mode=None):
+        """Score d'une partie (somme des rangs) et score optimal du même tirage
+
+        Args:
+            assignments: Catégorie -> ISO3 placé
+            countries: Pays du tirage (défaut : les pays placés)
+            categories: Catégories en jeu (défaut : celles du mode, ou toutes)
+            mode: Mode de jeu (fixe les catégories si elles ne sont pas données)
+        """
+        if (not isinstance(assignments, dict) or not assignments
+                or not all(isinstance(iso3, str) for iso3 in assignments.values())):
+            raise ServiceError(HTTPStatus.BAD_REQUEST, "assignments: dict catégorie -> ISO3 attendu")
+        for name, value in (("countries", countries), ("categories", categories)):
+            if value is not None and (not isinstance(value, list)
+                                      or not all(isinstance(item, str) for item in value)):
+                raise ServiceError(HTTPStatus.BAD_REQUEST, f"{name}: liste de chaînes attendue")
+        if categories is None:
+            categories = GAME_MODES[mode]["categories"] if mode in GAME_MODES else self.categories
+        unknown = [category for category in categories if category not in self.categories]
+        if unknown:
+            raise ServiceError(HTTPStatus.BAD_REQUEST, f"Catégories inconnues: {', '.join(unknown)}")
+        placed = [str(iso3).upper() for iso3 in assignments.values()]
+        countries = [str(iso3).upper() for iso3 in (countries or placed)]
+        missing = sorted({iso3 for iso3 in countries + placed if iso3 not in self.countries})
+        if missing:
+            raise ServiceError(HTTPStatus.BAD_REQUEST, f"Pays inconnus: {', '.join(missing)}")
+        if len(set(countries)) != len(countries) or len(set(placed)) != len(placed):
+            raise ServiceError(HTTPStatus.BAD_REQUEST, "Un pays ne peut apparaître qu'une fois")
+        for category, iso3 in zip(assignments, placed):
+            if category not in categories:
+                raise ServiceError(HTTPStatus.BAD_REQUEST, f"Catégorie hors jeu: {category}")
+            if iso3 not in countries:
+                raise ServiceError(HTTPStatus.BAD_REQUEST, f"Pays hors tirage: {iso3}")
+
+        score = sum(self.countries[iso3]["ranks"][category] for category, iso3 in zip(assignments, placed))
+        optimal, best = optimal_assignment(self.matrix, countries, categories)
+        return {
+            "season": self.name,
+            "score": score,
+            "optimal": optimal,
+            "efficiency": round(100 * optimal / score) if score else None,
+            "optimal_assignments": best,
+        }
+
+
+class SnapshotStore:
+    """Saisons chargées, indexées par nom (YYYY-MM)"""
+
+    def __init__(self, seasons):
+        self.seasons = {season.name: season for season in seasons}
+        if not self.seasons:
+            raise ValueError("Aucun snapshot chargé")
+        self.latest = max(self.seasons)
+
+    @classmethod
+    def load(cls, paths=None):
+        """Charge des snapshots JSON ; un dossier charge tous ses snapshot-YYYY-MM.json"""
+        files = []
+        for path in map(Path, paths or [SNAPSHOT_DIR]):
+            files.extend(sorted(path.glob("snapshot-????-??.json")) if path.is_dir() else [path])
+        return cls([Season.load(path) for path in files])
+
+    def get(self, season=None):
+        name = season or self.latest
+        if name not in self.seasons:
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"Saison inconnue: {name}")
+        return self.seasons[name]
+
+    def index(self):
+        return {"latest": self.latest,
+                "seasons": [self.seasons[name].summary() for name in sorted(self.seasons)]}
+
+
+class ResponseCache:
+    """Cache LRU partagé entre les threads : clé de requête -> (corps, ETag, corps gzip)"""
+
+    def __init__(self, size=RESPONSE_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+def _encode(payload):
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    etag = '"' + hashlib.sha256(body).hexdigest()[:HASH_LENGTH] + '"'
+    compressed = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= COMPRESS_MIN_SIZE else None
+    return body, etag, compressed
+
+
+def _int_param(query, name, default, maximum=None):
+    try:
+        value = int(query.get(name, [default])[0])
+    except ValueError:
+        raise ServiceError(HTTPStatus.BAD_REQUEST, f"{name}: entier attendu")
+    if value < 0:
+        raise ServiceError(HTTPStatus.BAD_REQUEST, f"{name}: valeur positive attendue")
+    return min(value, maximum) if maximum is not None else value
+
+
+class SnapshotRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "GeoChallengeSnapshot/1"
+    # En-têtes et corps partent en deux écritures : sans TCP_NODELAY, chaque
+    # réponse keep-alive attendrait l'ACK retardé du client (~40 ms)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        try:
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            seed = query.get("seed", [None])[0]
+            # Un tirage sans graine est aléatoire : ni cache ni ETag
+            cacheable = not (url.path == "/draw" and seed is None)
+            key = (url.path, tuple(sorted((name, tuple(values)) for name, values in query.items())))
+            entry = self.server.cache.get(key) if cacheable else None
+            if entry is None:
+                entry = _encode(self.route_get(url.path, query, seed))
+                if cacheable:
+                    self.server.cache.put(key, entry)
+            self.send_entry(entry, cacheable)
+        except ServiceError as e:
+            self.send_error_json(e.status, e.message)
+
+    def do_POST(self):
+        try:
+            if urlsplit(self.path).path != "/score":
+                raise ServiceError(HTTPStatus.NOT_FOUND, f"Route inconnue: {self.path}")
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                # Longueur inconnue : le corps ne peut pas être lu ni la connexion réutilisée
+                self.close_connection = True
+                raise ServiceError(HTTPStatus.BAD_REQUEST, "Content-Length invalide")
+            if length > MAX_BODY_SIZE:
+                # Corps non lu : la connexion ne peut pas être réutilisée
+                self.close_connection = True
+                raise ServiceError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Corps de requête trop volumineux")
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                raise ServiceError(HTTPStatus.BAD_REQUEST, "Corps JSON invalide")
+            if not isinstance(request, dict):
+                raise ServiceError(HTTPStatus.BAD_REQUEST, "Corps JSON: objet attendu")
+            for name in ("season", "mode"):
+                if not isinstance(request.get(name), (str, type(None))):
+                    raise ServiceError(HTTPStatus.BAD_REQUEST, f"{name}: chaîne attendue")
+            season = self.server.store.get(request.get("season"))
+            result = season.score(request.get("assignments"), request.get("countries"),
+                                  request.get("categories"), request.get("mode"))
+            self.send_entry(_encode(result), cacheable=False)
+        except ServiceError as e:
+            self.send_error_json(e.status, e.message)
+
+    def route_get(self, path, query, seed):
+        store = self.server.store
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        season_name = query.get("season", [None])[0]
+        if parts == ["seasons"]:
+            return store.index()
+        if len(parts) == 2 and parts[0] == "countries":
+            return store.get(season_name).country(parts[1])
+        if len(parts) == 2 and parts[0] == "categories":
+            offset = _int_param(query, "offset", 0)
+            limit = _int_param(query, "limit", PAGE_LIMIT, MAX_PAGE_LIMIT)
+            return store.get(season_name).category(parts[1], offset, limit)
+        if parts == ["draw"]:
+            return store.get(season_name).draw(query.get("mode", ["normal"])[0], seed)
+        raise ServiceError(HTTPStatus.NOT_FOUND, f"Route inconnue: {path}")
+
+    def send_entry(self, entry, cacheable):
+        body, etag, compressed = entry
+        if compressed is not None and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = compressed
+            # Une représentation gzip n'est pas identique octet pour octet : ETag distinct
+            etag = etag[:-1] + '-gz"'
+        if cacheable:
+            if etag in {tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")}:
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")
+                if compressed is not None:
+                    self.send_header("Vary", "Accept-Encoding")
+                self.end_headers()
+                return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if body is compressed:
+            self.send_header("Content-Encoding", "gzip")
+        if compressed is not None:
+            self.send_header("Vary", "Accept-Encoding")
+        if cacheable:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        else:
+            self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        body = json.dumps({"error": message}, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SnapshotServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, store, host=SERVER_HOST, port=SERVER_PORT, cache_size=RESPONSE_CACHE_SIZE, verbose=False):
+        super().__init__((host, port), SnapshotRequestHandler)
+        self.store = store
+        self.cache = ResponseCache(cache_size)
+        self.verbose = verbose
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sert les snapshots chargés en mémoire")
+    parser.add_argument("snapshots", nargs="*", help="Snapshots JSON ou dossiers (défaut : snapshot/)")
+    parser.add_argument("--host", default=SERVER_HOST, help=f"Adresse d'écoute (défaut {SERVER_HOST})")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help=f"Port (défaut {SERVER_PORT})")
+    parser.add_argument("--verbose", action="store_true", help="Journaliser chaque requête")
+    args = parser.parse_args()
+    store = SnapshotStore.load(args.snapshots)
+    server = SnapshotServer(store, args.host, args.port, verbose=args.verbose)
+    print(f"[OK] {len(store.seasons)} saison(s) chargee(s) (derniere: {store.latest}), ecoute sur {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
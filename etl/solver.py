@@ -0,0 +1,264 @@
+"""
+Score optimal d'un tirage : affectation optimale pays -> catégories
+
+Une partie affecte chaque catégorie à un pays distinct du tirage, et le score
+est la somme des rangs (plus petit = meilleur). Ce module calcule le
+meilleur score possible pour un tirage :
+
+- optimal_assignment : algorithme hongrois (Kuhn-Munkres) sur la matrice
+  des rangs, y compris le cas rectangulaire (plus de pays que de catégories,
+  les pays en trop ne sont pas placés)
+- batch_optimal_scores : programmation dynamique sur les sous-ensembles de
+  catégories, vectorisée NumPy sur des centaines de milliers de tirages
+"""
+
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from snapshot_binary import BinarySnapshot
+
+# Taille des paquets de tirages traités ensemble par batch_optimal_scores
+BATCH_CHUNK = 16384
+
+
+class RankMatrix:
+    """Matrice des rangs d'un snapshot : une ligne par pays, une colonne par catégorie"""
+
+    def __init__(self, codes, categories, ranks, season=None):
+        self.codes = tuple(codes)
+        self.categories = tuple(categories)
+        self.ranks = np.ascontiguousarray(ranks, dtype=np.int32)
+        self.season = season
+        self.index = {iso3: position for position, iso3 in enumerate(self.codes)}
+
+    @classmethod
+    def from_snapshot(cls, snapshot, categories=None):
+        """Construit la matrice depuis un snapshot JSON déjà chargé"""
+        countries = snapshot["countries"]
+        codes = sorted(countries)
+        if categories is None:
+            categories = list(countries[codes[0]]["ranks"]) if codes else []
+        ranks = np.array([[countries[iso3]["ranks"][category] for category in categories]
+                          for iso3 in codes], dtype=np.int32).reshape(len(codes), len(categories))
+        return cls(codes, categories, ranks, snapshot.get("meta", {}).get("season"))
+
+    @classmethod
+    def load(cls, path, categories=None):
+        """Charge un snapshot .json ou .geosnap"""
+        path = Path(path)
+        if path.suffix == ".geosnap":
+            with BinarySnapshot(path) as snap:
+                view = snap.matrix()
+                columns = np.frombuffer(view, dtype=np.uint16).reshape(snap.n_categories, snap.n_countries)
+                matrix = cls(snap.codes, snap.categories, columns.T, snap.season)
+                del columns
+                view.release()
+            return matrix if categories is None else matrix.select(categories)
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_snapshot(json.load(f), categories)
+
+    def select(self, categories):
+        """Sous-matrice restreinte à certaines catégories (ex: mode facile)"""
+        columns = [self.categories.index(category) for category in categories]
+        return RankMatrix(self.codes, categories, self.ranks[:, columns], self.season)
+
+    def indices(self, countries):
+        """Indices de lignes d'une liste d'ISO3 (KeyError si un pays est inconnu)"""
+        return np.array([self.index[iso3] for iso3 in countries], dtype=np.intp)
+
+
+def hungarian(cost):
+    """Affectation de coût minimal (algorithme hongrois, O(n² m))
+
+    Args:
+        cost: Matrice n x m avec n <= m (chaque ligne reçoit une colonne distincte)
+
+    Returns:
+        list: Colonne affectée à chaque ligne
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    n, m = cost.shape
+    if n > m:
+        raise ValueError("hungarian: il faut au moins autant de colonnes que de lignes")
+    INF = float("inf")
+    # Potentiels (u sur les lignes, v sur les colonnes) ; indices décalés de 1, 0 = sentinelle
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    owner = [0] * (m + 1)
+    way = [0] * (m + 1)
+    rows = cost.tolist()
+    for row in range(1, n + 1):
+        owner[0] = row
+        column = 0
+        min_slack = [INF] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[column] = True
+            current = owner[column]
+            delta = INF
+            next_column = 0
+            current_costs = rows[current - 1]
+            u_current = u[current]
+            for candidate in range(1, m + 1):
+                if used[candidate]:
+                    continue
+                slack = current_costs[candidate - 1] - u_current - v[candidate]
+                if slack < min_slack[candidate]:
+                    min_slack[candidate] = slack
+                    way[candidate] = column
+                if min_slack[candidate] < delta:
+                    delta = min_slack[candidate]
+                    next_column = candidate
+            for candidate in range(m + 1):
+                if used[candidate]:
+                    u[owner[candidate]] += delta
+                    v[candidate] -= delta
+                else:
+                    min_slack[candidate] -= delta
+            column = next_column
+            if owner[column] == 0:
+                break
+        # Remonter le chemin augmentant
+        while column:
+            previous = way[column]
+            owner[column] = owner[previous]
+            column = previous
+    assignment = [0] * n
+    for column in range(1, m + 1):
+        if owner[column]:
+            assignment[owner[column] - 1] = column - 1
+    return assignment
+
+
+def optimal_assignment(matrix, countries, categories=None):
+    """Meilleure affectation des catégories aux pays d'un tirage
+
+    Args:
+        matrix: RankMatrix du snapshot
+        countries: Liste d'ISO3 du tirage
+        categories: Catégories en jeu (défaut : toutes celles de la matrice)
+
+    Returns:
+        tuple: (score optimal, dict catégorie -> ISO3). S'il y a plus de pays
+        que de catégories, chaque catégorie reçoit un pays et les autres
+        pays ne sont pas placés ; s'il y en a moins, seuls len(countries)
+        catégories sont remplies.
+    """
+    if categories is not None:
+        matrix = matrix.select(categories)
+    rows = matrix.indices(countries)
+    cost = matrix.ranks[rows]  # pays x catégories
+    if len(countries) >= len(matrix.categories):
+        # Une ligne par catégorie, une colonne par pays
+        chosen = hungarian(cost.T)
+        assignment = {matrix.categories[c]: countries[chosen[c]] for c in range(len(matrix.categories))}
+    else:
+        chosen = hungarian(cost)
+        assignment = {matrix.categories[chosen[r]]: countries[r] for r in range(len(countries))}
+    score = sum(int(matrix.ranks[matrix.index[iso3], matrix.categories.index(category)])
+                for category, iso3 in assignment.items())
+    return score, assignment
+
+
+def random_draws(n_countries, size, draw_size, rng=None):
+    """Tirages aléatoires sans remise : tableau size x draw_size d'indices de pays"""
+    rng = np.random.default_rng(rng)
+    keys = rng.random((size, n_countries), dtype=np.float32)
+    return np.argpartition(keys, draw_size - 1, axis=1)[:, :draw_size].astype(np.intp)
+
+
+def _optimal_chunk(costs):
+    """Scores optimaux d'un paquet ; costs : tirages x pays x catégories
+
+    dp[masque] = meilleur coût avec les catégories du masque remplies par les
+    pays déjà vus. Chaque pays met à jour dp en place, des masques les plus
+    remplis vers les moins remplis (comme un sac à dos 0/1) : dp[masque ^ bit]
+    vaut encore la valeur d'avant ce pays, et ne pas modifier dp[masque]
+    revient à ne pas placer le pays.
+    """
+    size, n_countries, n_categories = costs.shape
+    target = min(n_countries, n_categories)
+    skips = n_countries - target
+    by_popcount = [[] for _ in range(n_categories + 1)]
+    for mask in range(1 << n_categories):
+        by_popcount[bin(mask).count("1")].append(mask)
+    bits = [[(category, 1 << category) for category in range(n_categories) if mask >> category & 1]
+            for mask in range(1 << n_categories)]
+
+    sentinel = np.iinfo(np.int32).max // 2
+    dp = np.full((1 << n_categories, size), sentinel, dtype=np.int32)
+    dp[0] = 0
+    costs = np.ascontiguousarray(costs.transpose(1, 2, 0))  # pays x catégories x tirages
+    candidate = np.empty(size, dtype=np.int32)
+    for country in range(n_countries):
+        # Après ce pays : au moins country + 1 - skips catégories remplies (on ne peut pas tout sauter)
+        for popcount in range(min(country + 1, n_categories), max(1, country + 1 - skips) - 1, -1):
+            for mask in by_popcount[popcount]:
+                row = dp[mask]
+                for category, bit in bits[mask]:
+                    np.add(dp[mask ^ bit], costs[country, category], out=candidate)
+                    np.minimum(row, candidate, out=row)
+    return dp[by_popcount[target]].min(axis=0)
+
+
+def batch_optimal_scores(matrix, draws, chunk=BATCH_CHUNK):
+    """Scores optimaux d'un grand nombre de tirages (vectorisé)
+
+    Programmation dynamique sur les sous-ensembles de catégories : pour 8
+    catégories, 256 états par tirage, calculés pour tout un paquet à la fois.
+
+    Args:
+        matrix: RankMatrix (catégories en jeu uniquement)
+        draws: Tableau tirages x pays d'indices de lignes de la matrice
+        chunk: Nombre de tirages traités par paquet (borne la mémoire)
+
+    Returns:
+        np.ndarray: Score optimal de chaque tirage (int32)
+    """
+    draws = np.asarray(draws, dtype=np.intp)
+    if len(matrix.categories) > 16:
+        raise ValueError("batch_optimal_scores: au plus 16 categories")
+    scores = np.empty(len(draws), dtype=np.int32)
+    for start in range(0, len(draws), chunk):
+        block = draws[start:start + chunk]
+        scores[start:start + len(block)] = _optimal_chunk(matrix.ranks[block])
+    return scores
+
+
+def score_assignments(matrix, draws, assignments):
+    """Scores de parties jouées (vectorisé)
+
+    Args:
+        matrix: RankMatrix
+        draws: Tableau tirages x pays d'indices de lignes
+        assignments: Tableau tirages x pays d'indices de catégories, -1 = pays non placé
+
+    Returns:
+        np.ndarray: Somme des rangs des pays placés, pour chaque tirage
+    """
+    draws = np.asarray(draws, dtype=np.intp)
+    assignments = np.asarray(assignments, dtype=np.intp)
+    placed = assignments >= 0
+    ranks = matrix.ranks[draws, np.where(placed, assignments, 0)]
+    return np.where(placed, ranks, 0).sum(axis=1)
+
+
+def benchmark(path, size=200000, draw_size=None, seed=0):
+    """Mesure le débit de batch_optimal_scores sur des tirages aléatoires"""
+    matrix = RankMatrix.load(path)
+    draw_size = draw_size or len(matrix.categories)
+    draws = random_draws(len(matrix.codes), size, draw_size, seed)
+    start = time.perf_counter()
+    scores = batch_optimal_scores(matrix, draws)
+    elapsed = time.perf_counter() - start
+    print(f"[OK] {size} tirages de {draw_size} pays en {elapsed:.2f}s "
+          f"({size / elapsed:,.0f} tirages/s, score optimal moyen {scores.mean():.1f})")
+    return scores
+
+
+if __name__ == "__main__":
+    import sys
+    benchmark(sys.argv[1] if len(sys.argv) > 1 else Path(__file__).parent.parent / "snapshot" / "snapshot-2025-11.json")
@@ -0,0 +1,94 @@
+"""
+Backfill : une saison passée ne voit pas les valeurs publiées après elle
+
+Usage :
+    python -m unittest discover -s tests      (depuis etl/)
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backfill  # noqa: E402
+import etl  # noqa: E402
+
+CODES = [f"C{index:02d}" for index in range(20)]
+# 2022 : C00 le plus grand ; 2024 (publié mi-2025) : classement inversé
+SERIES = {code: {2022: 100.0 - index, 2024: 1.0 + index} for index, code in enumerate(CODES)}
+
+
+def _sources(**kwargs):
+    return [("gdp", "PIB", etl.get_world_bank_data, dict({"indicator": "X", "reverse": True}, **kwargs), None)]
+
+
+class SeasonRanksTest(unittest.TestCase):
+    def season_ranks(self, seasons, **kwargs):
+        series = {"X": SimpleNamespace(values=SERIES)}
+        with mock.patch.object(backfill, "bulk_latest_values", return_value=series), \
+                mock.patch.object(etl, "USE_LOCAL_ONLY", False):
+            return backfill.season_ranks(seasons, _sources(**kwargs))
+
+    def test_published_year(self):
+        self.assertEqual(backfill.published_year("2025-03", 6), 2023)
+        self.assertEqual(backfill.published_year("2025-06", 6), 2023)
+        self.assertEqual(backfill.published_year("2025-07", 6), 2024)
+        self.assertEqual(backfill.published_year("2025-11", 0), 2024)
+
+    def test_past_season_does_not_see_later_values(self):
+        with mock.patch.object(backfill, "PUBLICATION_LAG_MONTHS", 6):
+            ranks = self.season_ranks(["2025-03", "2025-07"])
+        # 2025-03 : 2024 pas encore publiée, classement 2022
+        self.assertEqual(ranks["2025-03"]["gdp"]["C00"], 1)
+        self.assertEqual(ranks["2025-03"]["gdp"]["C19"], 20)
+        # 2025-07 : 2024 publiée
+        self.assertEqual(ranks["2025-07"]["gdp"]["C00"], 20)
+        self.assertEqual(ranks["2025-07"]["gdp"]["C19"], 1)
+
+    def test_pinned_year_not_yet_published(self):
+        with mock.patch.object(backfill, "PUBLICATION_LAG_MONTHS", 6):
+            ranks = self.season_ranks(["2025-03", "2025-07"], year=2024)
+        self.assertEqual(ranks["2025-03"]["gdp"]["C00"], 1)
+        self.assertEqual(ranks["2025-07"]["gdp"]["C00"], 20)
+
+
+class BackfillOutputTest(unittest.TestCase):
+    def test_default_output_is_separate_from_build(self):
+        self.assertNotEqual(backfill.HISTORY_DIR, etl.SNAPSHOT_DIR)
+
+    def test_existing_season_needs_force(self):
+        with tempfile.TemporaryDirectory() as directory:
+            (Path(directory) / "snapshot-2024-02.json").write_text("{}", encoding="utf-8")
+            with mock.patch.object(backfill, "season_ranks") as season_ranks:
+                with self.assertRaises(FileExistsError):
+                    backfill.backfill("2024-01", "2024-03", directory)
+            season_ranks.assert_not_called()
+
+    def test_indexes_follow_build_option(self):
+        all_ranks = {category: {"FRA": 1, "DEU": 2} for category in etl.CATEGORIES}
+        with tempfile.TemporaryDirectory() as directory:
+            for enabled in (False, True):
+                _, snapshot_file, _, _ = backfill._write_season(("2024-01", all_ranks, directory, enabled))
+                snapshot = json.loads(Path(snapshot_file).read_text(encoding="utf-8"))
+                self.assertEqual("indexes" in snapshot, enabled)
+
+
+class BuildSeasonTest(unittest.TestCase):
+    def test_build_refuses_past_season(self):
+        # Le build lit les valeurs actuelles : une saison passée passe par backfill.py
+        with mock.patch.object(etl, "load_manifest") as load_manifest:
+            with self.assertRaises(ValueError):
+                etl.generate_snapshot(season="2001-01")
+            with self.assertRaises(ValueError):
+                etl.generate_snapshot(season="2001-1")
+        load_manifest.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
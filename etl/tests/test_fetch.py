@@ -0,0 +1,59 @@
+"""
+Récupération concurrente : délais et fallbacks par tâche World Bank
+
+Usage :
+    python -m unittest discover -s tests      (depuis etl/)
+"""
+
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import etl  # noqa: E402
+from metrics import METRICS  # noqa: E402
+
+SOURCES = [
+    ("small_area", "Petite superficie", etl.get_world_bank_data, {"indicator": "A"}, None),
+    ("gdp", "PIB", etl.get_world_bank_data, {"indicator": "B", "reverse": True}, None),
+    ("military", "Armée", etl.get_world_bank_data, {"indicator": "C", "year": 2020}, None),
+]
+
+
+class FetchAllRanksTest(unittest.TestCase):
+    def setUp(self):
+        METRICS.reset()
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        self.calls = []
+
+    def bulk(self, specs):
+        self.calls.append([category for category, _ in specs])
+        if any(kwargs.get("year") for _, kwargs in specs):
+            # Requête bloquée (abandonnée par fetch_all_ranks)
+            self.release.wait(5)
+        return {category: {"FRA": 1} for category, _ in specs}
+
+    def fetch(self):
+        with mock.patch.object(etl, "get_world_bank_bulk", self.bulk):
+            return etl.fetch_all_ranks(SOURCES, source_timeout=5, global_timeout=5, world_bank_timeout=0.3)
+
+    def test_one_task_per_year(self):
+        self.fetch()
+        self.assertCountEqual(self.calls, [["small_area", "gdp"], ["military"]])
+
+    def test_timeout_only_falls_back_for_its_task(self):
+        ranks = self.fetch()
+        self.assertEqual(list(ranks), ["small_area", "gdp", "military"])
+        self.assertEqual(ranks["small_area"], {"FRA": 1})
+        self.assertEqual(ranks["gdp"], {"FRA": 1})
+        self.assertEqual(ranks["military"], {})
+        self.assertEqual([(item["source"], item["reason"]) for item in METRICS.summary()["fallbacks"]],
+                         [("military", "timeout")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Cache HTTP : TTL, revalidation ETag (304), modes et éviction
+
+Un petit serveur local sert un document JSON avec ETag et répond 304 aux
+requêtes conditionnelles qui correspondent.
+
+Usage :
+    python -m unittest discover -s tests      (depuis etl/)
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http_cache  # noqa: E402
+
+NAMESPACE = "testcache"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        etag = f'"v{server.version}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        body = json.dumps({"version": server.version}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FetchJsonTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.server.version = 1
+        cls.server.requests = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/data"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.version = 1
+        self.server.requests.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        for name, value in (("CACHE_DIR", Path(directory)), ("CACHE_MODE", "default"), ("CACHE_TTL", 3600.0)):
+            patcher = mock.patch.object(http_cache, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        os.environ.pop(f"ETL_CACHE_MODE_{NAMESPACE.upper()}", None)
+
+    def fetch(self):
+        return http_cache.fetch_json(self.url, namespace=NAMESPACE, timeout=5)
+
+    def age_entry(self, seconds):
+        path = http_cache._entry_path(NAMESPACE, self.url)
+        entry = json.loads(path.read_text(encoding="utf-8"))
+        entry["fetched_at"] -= seconds
+        path.write_text(json.dumps(entry), encoding="utf-8")
+
+    def test_fresh_entry_is_replayed(self):
+        self.assertEqual(self.fetch(), {"version": 1})
+        self.server.version = 2
+        self.assertEqual(self.fetch(), {"version": 1})
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_stale_entry_is_revalidated_with_etag(self):
+        self.fetch()
+        self.age_entry(7200)
+        self.assertEqual(self.fetch(), {"version": 1})
+        self.assertEqual(self.server.requests[-1].get("If-None-Match"), '"v1"')
+        # Le 304 renouvelle l'entrée : pas de nouvelle requête tant qu'elle est fraîche
+        self.fetch()
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_stale_entry_is_replaced_when_content_changed(self):
+        self.fetch()
+        self.age_entry(7200)
+        self.server.version = 2
+        self.assertEqual(self.fetch(), {"version": 2})
+        entry = http_cache.load_entry(NAMESPACE, self.url)
+        self.assertEqual(entry["etag"], '"v2"')
+
+    def test_refresh_mode_revalidates_fresh_entry(self):
+        self.fetch()
+        with mock.patch.object(http_cache, "CACHE_MODE", "refresh"):
+            self.assertEqual(self.fetch(), {"version": 1})
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.server.requests[-1].get("If-None-Match"), '"v1"')
+
+    def test_offline_mode(self):
+        with mock.patch.object(http_cache, "CACHE_MODE", "offline"):
+            with self.assertRaises(http_cache.CacheMiss):
+                self.fetch()
+        self.fetch()
+        self.age_entry(7200)
+        with mock.patch.object(http_cache, "CACHE_MODE", "offline"):
+            self.assertEqual(self.fetch(), {"version": 1})
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_off_mode_bypasses_cache(self):
+        with mock.patch.object(http_cache, "CACHE_MODE", "off"):
+            self.fetch()
+            self.fetch()
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertIsNone(http_cache.load_entry(NAMESPACE, self.url))
+
+    def test_eviction_removes_least_recently_used(self):
+        old = http_cache.store_entry(NAMESPACE, "old", {"data": "x" * 100})
+        new = http_cache.store_entry(NAMESPACE, "new", {"data": "y" * 100})
+        old_path = http_cache._entry_path(NAMESPACE, old["key"])
+        os.utime(old_path, (time.time() - 60, time.time() - 60))
+        size = http_cache._entry_path(NAMESPACE, new["key"]).stat().st_size
+        self.assertEqual(http_cache.evict_cache(max_bytes=size), 1)
+        self.assertIsNone(http_cache.load_entry(NAMESPACE, "old"))
+        self.assertIsNotNone(http_cache.load_entry(NAMESPACE, "new"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+Puzzles : le fichier existant est repris tant que ses entrées n'ont pas changé
+
+Usage :
+    python -m unittest discover -s tests      (depuis etl/)
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import puzzles  # noqa: E402
+
+SNAPSHOT = Path(__file__).resolve().parents[2] / "snapshot" / "snapshot-2025-11.json"
+
+
+class PuzzleReuseTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.snapshot = Path(directory) / SNAPSHOT.name
+        shutil.copy(SNAPSHOT, self.snapshot)
+
+    def generate(self, **kwargs):
+        return puzzles.generate_puzzles(self.snapshot, days=1, simulations=50, candidates=2, workers=1, **kwargs)
+
+    def test_unchanged_inputs_reuse_file(self):
+        first = self.generate()
+        with mock.patch.object(puzzles, "ProcessPoolExecutor") as executor:
+            self.assertEqual(self.generate(), first)
+        executor.assert_not_called()
+
+    def test_changed_ranks_regenerate(self):
+        first = self.generate()
+        snapshot = json.loads(self.snapshot.read_text(encoding="utf-8"))
+        entry = next(iter(snapshot["countries"].values()))
+        entry["ranks"]["gdp"] += 1
+        self.snapshot.write_text(json.dumps(snapshot), encoding="utf-8")
+        second = self.generate()
+        self.assertNotEqual(second["meta"]["inputs_sha256"], first["meta"]["inputs_sha256"])
+
+    def test_force_regenerates(self):
+        self.generate()
+        with mock.patch.object(puzzles, "ProcessPoolExecutor", side_effect=RuntimeError("simulations")):
+            with self.assertRaises(RuntimeError):
+                self.generate(force=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+Contrôle qualité : rangs absents lus dans les tables brutes, pas dans le rang 196
+
+Usage :
+    python -m unittest discover -s tests      (depuis etl/)
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from build_manifest import recorded_ranks  # noqa: E402
+from quality import season_model  # noqa: E402
+from snapshot_model import DEFAULT_RANK  # noqa: E402
+
+# Snapshot sans section "indexes" : FRA est vraiment 196e, DEU est absent (196 par défaut)
+SNAPSHOT = {
+    "meta": {"season": "2026-10", "generated_at": "2026-10-01T00:00:00"},
+    "countries": {
+        "FRA": {"name": "France", "flag": "fr.png", "ranks": {"gdp": DEFAULT_RANK}},
+        "DEU": {"name": "Germany", "flag": "de.png", "ranks": {"gdp": DEFAULT_RANK}},
+        "ITA": {"name": "Italy", "flag": "it.png", "ranks": {"gdp": 1}},
+    },
+}
+ALL_RANKS = {"gdp": {"FRA": DEFAULT_RANK, "ITA": 1}}
+
+
+class SeasonModelTest(unittest.TestCase):
+    def test_raw_ranks_keep_real_default_rank(self):
+        model = season_model(SNAPSHOT, ALL_RANKS)
+        self.assertEqual(model.rank("FRA", "gdp"), DEFAULT_RANK)
+        self.assertIsNone(model.rank("DEU", "gdp"))
+        self.assertEqual(int(model.valid("gdp").sum()), 2)
+
+    def test_without_raw_ranks_default_rank_is_missing(self):
+        model = season_model(SNAPSHOT)
+        self.assertIsNone(model.rank("FRA", "gdp"))
+        self.assertEqual(int(model.valid("gdp").sum()), 1)
+
+    def test_recorded_ranks_only_for_manifest_snapshot(self):
+        manifest = {"snapshot": "snapshot-2026-10.json", "categories": {"gdp": {"ranks": ALL_RANKS["gdp"]}}}
+        self.assertEqual(recorded_ranks(manifest, "snapshot-2026-10.json"), ALL_RANKS)
+        self.assertIsNone(recorded_ranks(manifest, "snapshot-2026-09.json"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Classement : politiques d'ex aequo, valeurs absentes et cube de rangs
+
+Usage :
+    python -m unittest discover -s tests      (depuis etl/)
+"""
+
+import math
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ranking import TIE_POLICIES, RankCube, rank_array, rank_dict  # noqa: E402
+
+# B et C à égalité ; E absent
+VALUES = {"A": 10.0, "B": 20.0, "C": 20.0, "D": 30.0, "E": math.nan}
+
+
+def reference_ranks(values, descending, ties):
+    """Classement de référence en Python pur (départage ordinal par position d'origine)"""
+    present = [(value, index) for index, value in enumerate(values) if not math.isnan(value)]
+    present.sort(key=lambda item: (-item[0] if descending else item[0], item[1]))
+    ranks = [0] * len(values)
+    distinct = 0
+    for position, (value, index) in enumerate(present):
+        equal = [other for other, _ in present if other == value]
+        first = next(p for p, (other, _) in enumerate(present) if other == value)
+        if position == first:
+            distinct += 1
+        ranks[index] = {"competition": first + 1, "dense": distinct, "ordinal": position + 1,
+                        "average": first + (len(equal) + 1) / 2}[ties]
+    return ranks
+
+
+class TiePolicyTest(unittest.TestCase):
+    def test_descending_policies(self):
+        expected = {
+            "competition": {"D": 1, "B": 2, "C": 2, "A": 4},
+            "dense": {"D": 1, "B": 2, "C": 2, "A": 3},
+            "average": {"D": 1.0, "B": 2.5, "C": 2.5, "A": 4.0},
+            "ordinal": {"D": 1, "B": 2, "C": 3, "A": 4},
+        }
+        for ties, ranks in expected.items():
+            self.assertEqual(rank_dict(VALUES, descending=True, ties=ties), ranks, ties)
+
+    def test_ascending_policies(self):
+        expected = {
+            "competition": {"A": 1, "B": 2, "C": 2, "D": 4},
+            "dense": {"A": 1, "B": 2, "C": 2, "D": 3},
+            "average": {"A": 1.0, "B": 2.5, "C": 2.5, "D": 4.0},
+            "ordinal": {"A": 1, "B": 2, "C": 3, "D": 4},
+        }
+        for ties, ranks in expected.items():
+            self.assertEqual(rank_dict(VALUES, ties=ties), ranks, ties)
+
+    def test_missing_values(self):
+        for ties in ("competition", "dense", "ordinal"):
+            self.assertEqual(rank_array([3.0, math.nan, 1.0], ties=ties).tolist(), [2, 0, 1])
+        self.assertTrue(math.isnan(rank_array([3.0, math.nan, 1.0], ties="average")[1]))
+        self.assertEqual(rank_dict({}), {})
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            rank_array([1.0, 2.0], ties="olympic")
+
+    def test_matches_reference_on_random_ties(self):
+        rng = np.random.default_rng(13)
+        values = rng.integers(0, 6, size=(3, 40)).astype(np.float64)
+        values[rng.random(values.shape) < 0.2] = np.nan
+        descending = np.array([True, False, True])[:, None]
+        for ties in TIE_POLICIES:
+            ranks = rank_array(values, descending=descending, ties=ties, axis=1)
+            for row in range(len(values)):
+                expected = reference_ranks(values[row].tolist(), bool(descending[row, 0]), ties)
+                actual = [0 if rank != rank else rank for rank in ranks[row].tolist()]
+                self.assertEqual(actual, expected, ties)
+
+
+class RankCubeTest(unittest.TestCase):
+    def test_forward_fill_and_directions(self):
+        series = {
+            "gdp": {"FRA": {2020: 3.0, 2022: 1.0}, "DEU": {2020: 2.0, 2021: 4.0}},
+            "area": {"FRA": {2021: 5.0}, "DEU": {2020: 9.0}},
+        }
+        cube = RankCube.from_series(series, descending={"gdp": True}, ties="competition")
+        self.assertEqual(cube.years, [2020, 2021, 2022])
+        self.assertEqual(cube.season_ranks(2020), {"gdp": {"FRA": 1, "DEU": 2}, "area": {"DEU": 1}})
+        # 2022 : DEU garde sa valeur 2021 (4.0) ; FRA baisse à 1.0
+        self.assertEqual(cube.season_ranks()["gdp"], {"DEU": 1, "FRA": 2})
+        self.assertEqual(cube.season_ranks()["area"], {"FRA": 1, "DEU": 2})
+        self.assertEqual(cube.history("FRA", "area"), {2021: 1, 2022: 1})
+
+    def test_without_fill(self):
+        series = {"gdp": {"FRA": {2020: 3.0}, "DEU": {2021: 4.0}}}
+        cube = RankCube.from_series(series, fill=False)
+        self.assertEqual(cube.season_ranks(2021), {"gdp": {"DEU": 1}})
+
+
+if __name__ == "__main__":
+    unittest.main()
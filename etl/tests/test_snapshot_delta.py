@@ -0,0 +1,81 @@
+"""
+Deltas : reconstruction octet pour octet et refus vérifiés par SHA-256
+
+Usage :
+    python -m unittest discover -s tests      (depuis etl/)
+"""
+
+import copy
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snapshot_delta import apply_delta, diff_snapshots, serialize_snapshot  # noqa: E402
+from snapshot_index import build_indexes  # noqa: E402
+
+CATEGORIES = ["gdp", "eez"]
+
+
+def _snapshot(season, countries, indexes=False):
+    snapshot = {"meta": {"season": season, "generated_at": f"{season}-01T00:00:00"}, "countries": countries}
+    if indexes:
+        masks = {iso3: 0b11 for iso3 in countries}
+        snapshot["indexes"] = build_indexes(countries, CATEGORIES, masks)
+    return snapshot
+
+
+def _entry(name, gdp, eez):
+    return {"name": name, "flag": f"https://flagcdn.com/w80/{name[:2].lower()}.png",
+            "ranks": {"gdp": gdp, "eez": eez}}
+
+
+PREVIOUS = {"FRA": _entry("France", 7, 2), "DEU": _entry("Germany", 3, 60), "ITA": _entry("Italy", 8, 20)}
+# DEU change de rang, ITA est retiré, ESP est ajouté, FRA change de nom
+CURRENT = {"FRA": _entry("French Republic", 7, 2), "DEU": _entry("Germany", 4, 60), "ESP": _entry("Spain", 15, 30)}
+
+
+class SnapshotDeltaTest(unittest.TestCase):
+    def pair(self, indexes=False):
+        previous = serialize_snapshot(_snapshot("2025-10", PREVIOUS, indexes))
+        current = serialize_snapshot(_snapshot("2025-11", CURRENT, indexes))
+        return previous, current, diff_snapshots(previous, current)
+
+    def test_round_trip(self):
+        for indexes in (False, True):
+            previous, current, delta = self.pair(indexes)
+            self.assertEqual(apply_delta(previous, delta), current)
+            self.assertEqual(delta["removed"], ["ITA"])
+            self.assertEqual(list(delta["added"]), ["ESP"])
+            self.assertEqual(list(delta["replaced"]), ["FRA"])
+            self.assertEqual(delta["changed"], {"DEU": {"gdp": 4}})
+
+    def test_reordered_countries(self):
+        previous = serialize_snapshot(_snapshot("2025-10", PREVIOUS))
+        current = serialize_snapshot(_snapshot("2025-11", dict(reversed(list(PREVIOUS.items())))))
+        delta = diff_snapshots(previous, current)
+        self.assertIn("order", delta)
+        self.assertEqual(apply_delta(previous, delta), current)
+
+    def test_refuses_other_base(self):
+        previous, _, delta = self.pair()
+        with self.assertRaisesRegex(ValueError, "base"):
+            apply_delta(previous.replace(b'"gdp": 7', b'"gdp": 9'), delta)
+
+    def test_refuses_tampered_result(self):
+        previous, _, delta = self.pair()
+        tampered = copy.deepcopy(delta)
+        tampered["changed"]["DEU"]["gdp"] = 5
+        with self.assertRaisesRegex(ValueError, "Empreinte"):
+            apply_delta(previous, tampered)
+
+    def test_refuses_unknown_format(self):
+        previous, _, delta = self.pair()
+        for key, value in (("format", "other"), ("version", 2)):
+            with self.assertRaisesRegex(ValueError, "Format"):
+                apply_delta(previous, dict(delta, **{key: value}))
+
+
+if __name__ == "__main__":
+    unittest.main()
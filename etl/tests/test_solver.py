@@ -0,0 +1,80 @@
+"""
+Solveur : algorithme hongrois et programmation dynamique contre la force brute
+
+Usage :
+    python -m unittest discover -s tests      (depuis etl/)
+"""
+
+import itertools
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from solver import RankMatrix, batch_optimal_scores, hungarian, optimal_assignment  # noqa: E402
+
+
+def brute_force(cost):
+    """Coût minimal d'une affectation lignes -> colonnes distinctes (n <= m)"""
+    n, m = cost.shape
+    return min(sum(cost[row, column] for row, column in enumerate(columns))
+               for columns in itertools.permutations(range(m), n))
+
+
+def brute_force_draw(ranks):
+    """Score optimal d'un tirage (pays x catégories), rectangulaire dans les deux sens"""
+    return brute_force(ranks.T) if ranks.shape[0] >= ranks.shape[1] else brute_force(ranks)
+
+
+class HungarianTest(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(7)
+        for n, m in [(1, 1), (3, 3), (4, 6), (5, 5), (5, 7)]:
+            for _ in range(10):
+                cost = rng.integers(1, 197, size=(n, m))
+                assignment = hungarian(cost)
+                self.assertEqual(len(set(assignment)), n)
+                self.assertEqual(sum(cost[row, column] for row, column in enumerate(assignment)),
+                                 brute_force(cost))
+
+    def test_ties(self):
+        cost = np.full((4, 4), 5)
+        self.assertEqual(sorted(hungarian(cost)), [0, 1, 2, 3])
+
+    def test_more_rows_than_columns(self):
+        with self.assertRaises(ValueError):
+            hungarian(np.ones((3, 2)))
+
+
+class OptimalScoresTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.codes = [f"C{index:02d}" for index in range(30)]
+        self.categories = [f"cat{index}" for index in range(6)]
+        self.matrix = RankMatrix(self.codes, self.categories, rng.integers(1, 197, size=(30, 6)))
+
+    def test_optimal_assignment(self):
+        rng = np.random.default_rng(3)
+        for draw_size in (4, 6, 7):
+            for _ in range(5):
+                countries = list(rng.choice(self.codes, size=draw_size, replace=False))
+                score, assignment = optimal_assignment(self.matrix, countries)
+                ranks = self.matrix.ranks[self.matrix.indices(countries)]
+                self.assertEqual(score, brute_force_draw(ranks))
+                self.assertEqual(len(set(assignment.values())), len(assignment))
+                self.assertEqual(len(assignment), min(draw_size, len(self.categories)))
+
+    def test_batch_matches_brute_force(self):
+        rng = np.random.default_rng(5)
+        for draw_size in (4, 6, 7):
+            draws = np.array([rng.choice(len(self.codes), size=draw_size, replace=False) for _ in range(10)])
+            scores = batch_optimal_scores(self.matrix, draws, chunk=7)
+            expected = [brute_force_draw(self.matrix.ranks[draw]) for draw in draws]
+            self.assertEqual(scores.tolist(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
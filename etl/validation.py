@@ -0,0 +1,73 @@
+"""
+Validation structurelle d'un snapshot
+
+Vérifie qu'un snapshot est utilisable par le frontend sans rien importer
+de lourd (bibliothèque standard et snapshot_index uniquement) : saison,
+codes ISO3, nom, drapeau et rangs de chaque pays, mêmes catégories partout
+et, si la section "indexes" est présente, sa cohérence avec les rangs (elle
+est reconstruite à partir de ses masques et comparée).
+"""
+
+import re
+
+from snapshot_index import build_indexes, masks_from_indexes
+
+SEASON_PATTERN = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+ISO3_PATTERN = re.compile(r"^[A-Z]{3}$")
+# Au-delà, les problèmes suivants sont seulement comptés
+MAX_REPORTED = 20
+
+
+def validate_snapshot(snapshot):
+    """Liste les problèmes d'un snapshot chargé (liste vide si valide)
+
+    Args:
+        snapshot: Snapshot (dict)
+
+    Returns:
+        list: Messages décrivant chaque problème
+    """
+    problems = []
+    season = snapshot.get("meta", {}).get("season")
+    if not isinstance(season, str) or not SEASON_PATTERN.match(season):
+        problems.append(f"meta.season invalide: {season!r}")
+
+    countries = snapshot.get("countries")
+    if not isinstance(countries, dict) or not countries:
+        problems.append("countries absent ou vide")
+        return problems
+
+    categories = None
+    for iso3, entry in countries.items():
+        if not ISO3_PATTERN.match(iso3):
+            problems.append(f"{iso3}: code ISO3 invalide")
+        if not isinstance(entry, dict):
+            problems.append(f"{iso3}: entrée invalide")
+            continue
+        for field in ("name", "flag"):
+            if not isinstance(entry.get(field), str) or not entry.get(field):
+                problems.append(f"{iso3}: champ {field} manquant")
+        ranks = entry.get("ranks")
+        if not isinstance(ranks, dict):
+            problems.append(f"{iso3}: rangs manquants")
+            continue
+        if categories is None:
+            categories = list(ranks)
+        elif list(ranks) != categories:
+            problems.append(f"{iso3}: catégories {list(ranks)} au lieu de {categories}")
+        for category, rank in ranks.items():
+            if type(rank) is not int or rank < 1:
+                problems.append(f"{iso3}: rang {category} invalide: {rank!r}")
+
+    indexes = snapshot.get("indexes")
+    if indexes is not None and not problems:
+        if indexes.get("categories") != categories:
+            problems.append(f"indexes.categories {indexes.get('categories')} au lieu de {categories}")
+        elif set(indexes.get("by_country", {})) != set(countries):
+            problems.append("indexes.by_country ne couvre pas exactement les pays du snapshot")
+        elif build_indexes(countries, categories, masks_from_indexes(indexes)) != indexes:
+            problems.append("indexes incohérents avec les rangs (section à régénérer)")
+
+    if len(problems) > MAX_REPORTED:
+        problems = problems[:MAX_REPORTED] + [f"... et {len(problems) - MAX_REPORTED} autres problèmes"]
+    return problems
@@ -0,0 +1,100 @@
+"""
+Client Wikidata : population des capitales, agrégée par le serveur SPARQL
+
+Sur Wikidata, une capitale peut porter plusieurs déclarations de population
+(P1082) et un pays plusieurs capitales (P36). La requête brute renvoie donc
+plusieurs lignes par pays. Ici le serveur agrège : une ligne par pays, avec
+la population maximale de ses capitales (GROUP BY ... MAX), donc une réponse
+plus petite et indépendante de l'ordre des lignes.
+
+Les résultats sont lus par pages (LIMIT / OFFSET, PAGE_SIZE lignes) avec un
+tri stable sur l'entité pays, jusqu'à une page incomplète. Les pays sans code
+ISO3 (P298) sont résolus par leur libellé, en une passe sur les noms
+distincts (country_index.resolve_iso3_bulk).
+"""
+
+import os
+
+from country_index import resolve_iso3_bulk
+from http_cache import fetch_sparql
+from metrics import METRICS
+
+PAGE_SIZE = int(os.getenv('ETL_WIKIDATA_PAGE_SIZE', '500'))
+
+CAPITAL_POPULATION_QUERY = """
+SELECT ?country (SAMPLE(?label) AS ?countryLabel) (SAMPLE(?code) AS ?iso3)
+       (MAX(?pop) AS ?population) WHERE {{
+  ?country wdt:P31 wd:Q6256 ;
+           wdt:P36 ?capital .
+  ?capital wdt:P1082 ?pop .
+  OPTIONAL {{ ?country wdt:P298 ?code . }}
+  OPTIONAL {{ ?country rdfs:label ?label . FILTER(LANG(?label) = "en") }}
+}}
+GROUP BY ?country
+ORDER BY ?country
+LIMIT {limit}
+OFFSET {offset}
+"""
+
+
+def capital_population_query(limit=PAGE_SIZE, offset=0):
+    """Texte de la requête SPARQL agrégée pour une page"""
+    return CAPITAL_POPULATION_QUERY.format(limit=int(limit), offset=int(offset))
+
+
+def iter_capital_rows(endpoint, page_size=PAGE_SIZE, timeout=60):
+    """Lignes agrégées (une par entité pays), page par page"""
+    seen = set()
+    offset = 0
+    while True:
+        query = capital_population_query(page_size, offset)
+        with METRICS.stage("fetch", "wikidata"):
+            result = fetch_sparql(endpoint, query, namespace="wikidata", timeout=timeout)
+        bindings = result["results"]["bindings"]
+        METRICS.incr("wikidata", "pages")
+        countries = {row.get("country", {}).get("value") for row in bindings}
+        if bindings and countries <= seen:
+            # Garde-fou : un serveur qui ignorerait OFFSET renverrait toujours la même page
+            print("  [ATTENTION] Wikidata: page deja lue, pagination interrompue")
+            return
+        seen |= countries
+        yield from bindings
+        if len(bindings) < page_size:
+            return
+        offset += page_size
+
+
+def capital_populations(endpoint, page_size=PAGE_SIZE, timeout=60):
+    """Population de la capitale la plus peuplée de chaque pays
+
+    Args:
+        endpoint: URL du point d'accès SPARQL
+        page_size: Lignes par page
+        timeout: Délai par requête en secondes
+
+    Returns:
+        dict: ISO3 -> population
+    """
+    rows = list(iter_capital_rows(endpoint, page_size, timeout))
+    with METRICS.stage("parse", "wikidata"):
+        parsed = []
+        for row in rows:
+            population = float(row.get("population", {}).get("value", 0))
+            code = row.get("iso3", {}).get("value", "").strip().upper()
+            label = row.get("countryLabel", {}).get("value", "")
+            parsed.append((code if len(code) == 3 else None, label, population))
+
+        # Codes ISO3 manquants : libellés distincts résolus en une passe
+        resolved = resolve_iso3_bulk(label for code, label, _ in parsed if code is None)
+        populations = {}
+        rejected = 0
+        for code, label, population in parsed:
+            iso3 = code or resolved.get(label)
+            if not iso3 or len(iso3) != 3 or population <= 0:
+                rejected += 1
+                continue
+            # Deux entités pour un même ISO3 : le maximum, comme dans la requête
+            populations[iso3] = max(population, populations.get(iso3, 0))
+        METRICS.incr("wikidata", "rows_parsed", len(rows))
+        METRICS.incr("wikidata", "rows_rejected_unresolved", rejected)
+    return populations
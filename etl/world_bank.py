@@ -0,0 +1,252 @@
+"""
+Client World Bank v2 : lecture paginée en flux et réduction à la dernière valeur
+
+L'API renvoie [métadonnées, items] par page ; la première page donne le
+nombre de pages (`pages`) et d'items (`total`). Les pages suivantes sont
+récupérées en parallèle (au plus PAGE_WORKERS pages en vol, donc mémoire
+bornée) et traitées dès leur arrivée : LatestValues ne garde qu'une valeur
+par pays, la plus récente non nulle, au lieu des séries complètes.
+
+Mode « most recent value » : avec ETL_WORLD_BANK_MRV=N (N > 0), seules les N
+dernières années de chaque pays sont demandées à l'API (paramètre mrv), ce
+qui réduit fortement le volume pour les indicateurs à long historique.
+
+Requêtes groupées : bulk_latest_values réunit plusieurs indicateurs dans une
+même requête (codes séparés par « ; », jusqu'à BULK_MAX_INDICATORS), un
+groupe par année demandée. Ajouter un indicateur n'ajoute donc pas d'aller-
+retour réseau. Les items sont ensuite répartis par indicateur.
+"""
+
+import os
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import groupby
+
+from country_index import is_iso3
+from http_cache import fetch_json
+from metrics import METRICS
+from ranking import TIE_POLICY, rank_dict
+
+PER_PAGE = int(os.getenv('ETL_WORLD_BANK_PER_PAGE', '1000'))
+PAGE_WORKERS = int(os.getenv('ETL_WORLD_BANK_PAGE_WORKERS', '4'))
+MRV = int(os.getenv('ETL_WORLD_BANK_MRV', '0'))
+# Limite de l'API pour une requête multi-indicateurs
+BULK_MAX_INDICATORS = 60
+# Source WDI, obligatoire quand plusieurs indicateurs sont demandés ensemble
+BULK_SOURCE = 2
+
+# Codes de régions World Bank à exclure (pas des pays ISO3)
+REGION_CODES = frozenset({
+    'AFE', 'AFW', 'ARB', 'CEB', 'CSS', 'EAP', 'EAS', 'ECA', 'ECS', 'EMU',
+    'EUU', 'FCS', 'HIC', 'HPC', 'IBD', 'IBT', 'IDB', 'IDX', 'LAC', 'LCN',
+    'LDC', 'LIC', 'LMC', 'LMY', 'MEA', 'MIC', 'MNA', 'NAC', 'OED', 'OSS',
+    'PRE', 'PSS', 'PST', 'SAS', 'SSA', 'SSF', 'SST', 'TEA', 'TEC', 'TLA',
+    'TMN', 'TSA', 'TSS', 'UMC', 'WLD', 'EAR'
+})
+
+
+def indicator_url(base_url, indicator, page=1, per_page=PER_PAGE, date=None, mrv=None):
+    """URL d'une page d'un indicateur (ou de plusieurs, séparés par « ; ») pour tous les pays"""
+    url = f"{base_url}/country/all/indicator/{indicator}?format=json&per_page={per_page}&page={page}"
+    if ";" in indicator:
+        url += f"&source={BULK_SOURCE}"
+    if date:
+        url += f"&date={date}"
+    elif mrv:
+        url += f"&mrv={mrv}"
+    return url
+
+
+def fetch_page(base_url, indicator, page=1, per_page=PER_PAGE, date=None, mrv=None, timeout=60):
+    """Récupère une page ; retourne (métadonnées, items)
+
+    Une réponse sans items (ex: [{"message": [...]}] pour un indicateur
+    inconnu) lève ValueError, ce qui déclenche le fallback de la source.
+    """
+    url = indicator_url(base_url, indicator, page, per_page, date, mrv)
+    with METRICS.stage("fetch", indicator):
+        data = fetch_json(url, namespace="worldbank", timeout=timeout)
+    if not isinstance(data, list) or len(data) < 2 or not isinstance(data[0], dict):
+        raise ValueError(f"reponse World Bank inattendue pour {indicator} (page {page}): {str(data)[:200]}")
+    METRICS.incr(indicator, "pages")
+    return data[0], data[1] or []
+
+
+def iter_pages(base_url, indicator, date=None, mrv=None, per_page=PER_PAGE,
+               workers=PAGE_WORKERS, timeout=60):
+    """Parcourt toutes les pages d'un indicateur, dans l'ordre d'arrivée
+
+    La première page est lue seule pour connaître le nombre de pages ; les
+    suivantes sont récupérées en parallèle, avec au plus `workers` pages en
+    vol à la fois.
+
+    Yields:
+        tuple: (métadonnées, items) de chaque page
+    """
+    meta, items = fetch_page(base_url, indicator, 1, per_page, date, mrv, timeout)
+    yield meta, items
+    pages = int(meta.get("pages") or 1)
+    if pages <= 1:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, pages - 1)),
+                            thread_name_prefix=f"wb-{indicator}") as executor:
+        next_page = 2
+        pending = set()
+        while next_page <= pages or pending:
+            while next_page <= pages and len(pending) < workers:
+                pending.add(executor.submit(fetch_page, base_url, indicator, next_page,
+                                            per_page, date, mrv, timeout))
+                next_page += 1
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+class IndicatorValues:
+    """Base des réducteurs d'items World Bank : filtrage et compteurs de rejets"""
+
+    def __init__(self):
+        self.values = {}
+        self.rows = 0
+        self.rejected = {"null_value": 0, "invalid_code": 0, "region": 0, "not_iso3": 0}
+
+    def _accepted(self, items):
+        """Items valides d'une page : (iso3, année, valeur, item)"""
+        rejected = self.rejected
+        for item in items:
+            value = item.get('value')
+            if value is None:
+                rejected["null_value"] += 1
+                continue
+            iso3 = (item.get('countryiso3code') or '').strip().upper()
+            # Filtrer : seulement codes ISO3 valides de 3 lettres, exclure les régions
+            if not (len(iso3) == 3 and iso3.isalpha()):
+                rejected["invalid_code"] += 1
+                continue
+            if iso3 in REGION_CODES:
+                rejected["region"] += 1
+                continue
+            if not is_iso3(iso3):
+                rejected["not_iso3"] += 1
+                continue
+            yield iso3, item.get('date', ''), float(value), item
+        self.rows += len(items)
+
+
+class LatestValues(IndicatorValues):
+    """Réduit un flux d'items World Bank à la dernière valeur non nulle par pays"""
+
+    def add(self, items):
+        """Intègre une page d'items (les pages peuvent arriver dans le désordre)"""
+        values = self.values
+        for iso3, year, value, item in self._accepted(items):
+            current = values.get(iso3)
+            if current is None or year > current['year']:
+                values[iso3] = {
+                    'name': (item.get('country') or {}).get('value', ''),
+                    'value': value,
+                    'year': year,
+                }
+
+    def ranks(self, reverse=False, ties=TIE_POLICY):
+        """Rangs (1 = meilleur) selon la politique d'ex aequo `ties`"""
+        return rank_dict({iso3: entry['value'] for iso3, entry in self.values.items()},
+                         descending=reverse, ties=ties)
+
+
+class YearlyValues(IndicatorValues):
+    """Conserve toutes les années : ISO3 -> année -> valeur (séries pour ranking.RankCube)"""
+
+    def add(self, items):
+        values = self.values
+        for iso3, year, value, _ in self._accepted(items):
+            if year.isdigit():
+                values.setdefault(iso3, {})[int(year)] = value
+
+
+def _item_indicator(item):
+    return (item.get('indicator') or {}).get('id')
+
+
+def _fetch_group(base_url, indicators, date, mrv, per_page, workers, timeout, reducer):
+    """Lit toutes les pages d'une requête groupée et répartit les items par indicateur"""
+    latest = {indicator: reducer() for indicator in indicators}
+    source = ";".join(indicators)
+    total = None
+    received = 0
+    for meta, items in iter_pages(base_url, source, date, mrv, per_page, workers, timeout):
+        if total is None:
+            total = int(meta.get("total") or 0)
+        received += len(items)
+        with METRICS.stage("parse", source):
+            if len(indicators) == 1:
+                latest[indicators[0]].add(items)
+                continue
+            # Les items arrivent regroupés par indicateur
+            for indicator, group in groupby(items, key=_item_indicator):
+                if indicator in latest:
+                    latest[indicator].add(list(group))
+    if total is not None and received != total:
+        print(f"  [ATTENTION] {source}: {received} lignes recues sur {total} annoncees")
+    return latest
+
+
+def bulk_latest_values(base_url, indicators, mrv=None, per_page=PER_PAGE,
+                       workers=PAGE_WORKERS, timeout=60, reducer=LatestValues):
+    """Récupère plusieurs indicateurs en un minimum de requêtes
+
+    Les indicateurs sont groupés par année demandée (une requête par année,
+    plus une pour les indicateurs « dernière valeur disponible »), par paquets
+    de BULK_MAX_INDICATORS ; les groupes sont récupérés en parallèle.
+
+    Args:
+        base_url: Racine de l'API (ex: https://api.worldbank.org/v2)
+        indicators: Code de l'indicateur -> année (None : dernière valeur disponible)
+        mrv: Nombre d'années les plus récentes demandées pour les indicateurs sans année
+        per_page: Taille des pages
+        workers: Pages récupérées en parallèle par groupe
+        timeout: Timeout réseau par page, en secondes
+        reducer: LatestValues (dernière valeur) ou YearlyValues (séries complètes)
+
+    Returns:
+        dict: Code de l'indicateur -> réducteur rempli
+    """
+    by_year = defaultdict(list)
+    for indicator, year in indicators.items():
+        by_year[year].append(indicator)
+    groups = [(year, codes[start:start + BULK_MAX_INDICATORS])
+              for year, codes in by_year.items()
+              for start in range(0, len(codes), BULK_MAX_INDICATORS)]
+
+    with ThreadPoolExecutor(max_workers=max(1, len(groups)), thread_name_prefix="wb-bulk") as executor:
+        futures = [executor.submit(_fetch_group, base_url, codes, year, None if year else mrv,
+                                   per_page, workers, timeout, reducer)
+                   for year, codes in groups]
+        results = {}
+        for future in futures:
+            results.update(future.result())
+
+    for indicator, latest in results.items():
+        METRICS.incr(indicator, "rows_parsed", latest.rows)
+        for reason, count in latest.rejected.items():
+            METRICS.incr(indicator, f"rows_rejected_{reason}", count)
+    return results
+
+
+def latest_values(base_url, indicator, date=None, mrv=None, per_page=PER_PAGE,
+                  workers=PAGE_WORKERS, timeout=60):
+    """Lit toutes les pages d'un indicateur et garde la dernière valeur de chaque pays
+
+    Args:
+        base_url: Racine de l'API (ex: https://api.worldbank.org/v2)
+        indicator: Code de l'indicateur World Bank
+        date: Année précise (None : toutes les années, ou les `mrv` dernières)
+        mrv: Nombre d'années les plus récentes demandées (None ou 0 : toutes)
+        per_page: Taille des pages
+        workers: Pages récupérées en parallèle
+        timeout: Timeout réseau par page, en secondes
+
+    Returns:
+        LatestValues: Valeurs retenues et compteurs de lignes lues / rejetées
+    """
+    return bulk_latest_values(base_url, {indicator: date}, mrv, per_page, workers, timeout)[indicator]
@@ -32,13 +32,17 @@ function App() {
   const [currentBadgeIndex, setCurrentBadgeIndex] = useState(0)
 
   useEffect(() => {
-    // Charger le snapshot depuis le dossier public
-    // Le service worker cache ce fichier pour le mode hors-ligne
-    fetch('/snapshot-2025-11.json', { cache: 'force-cache' })
-      .then(res => {
-        if (!res.ok) throw new Error('Snapshot non trouvé')
-        return res.json()
-      })
+    // Charger le snapshot publié : latest.json (toujours revalidé) indique le
+    // fichier à empreinte courant, immuable et donc mis en cache sans limite.
+    // Le service worker cache ces fichiers pour le mode hors-ligne
+    const fetchJson = (url, options) => fetch(url, options).then(res => {
+      if (!res.ok) throw new Error('Snapshot non trouvé')
+      return res.json()
+    })
+    fetchJson('/snapshots/latest.json', { cache: 'no-cache' })
+      .then(manifest => fetchJson(`/snapshots/${manifest.file}`, { cache: 'force-cache' }))
+      // Ancien emplacement (snapshot copié à la main dans public/)
+      .catch(() => fetchJson('/snapshot-2025-11.json', { cache: 'force-cache' }))
       .then(data => setSnapshot(data))
       .catch(err => {
         console.error('Erreur chargement snapshot:', err)
@@ -276,9 +280,10 @@ function App() {
     if (isFirstGame) {
       setCurrentHint(null) // Fermer le hint actuel
       
-      // Vérifier si c'est un bon placement
-      const allRanks = Object.values(countryData?.ranks || {})
-      const bestRank = Math.min(...allRanks.filter(r => r > 0))
+      // Vérifier si c'est un bon placement (index précalculé si le snapshot en contient)
+      const countryIndex = snapshot.indexes?.by_country?.[currentCountry]
+      const bestRank = countryIndex?.best_rank ??
+        Math.min(...Object.values(countryData?.ranks || {}).filter(r => r > 0))
       const isGoodPlacement = rank <= bestRank + 10
       
       setTimeout(() => {
@@ -7,7 +7,7 @@ export default defineConfig({
     react(),
     VitePWA({
       registerType: 'autoUpdate',
-      includeAssets: ['favicon.ico', 'snapshot-*.json'],
+      includeAssets: ['favicon.ico'],
       manifest: {
         name: 'Géo Challenge',
         short_name: 'GéoChallenge',
@@ -44,7 +44,41 @@ export default defineConfig({
       },
       workbox: {
         globPatterns: ['**/*.{js,css,html,ico,png,svg,json}'],
+        // Snapshots et puzzles publiés : jamais précachés (un nouveau fichier à
+        // empreinte par publication), seul le fichier utilisé est mis en cache
+        globIgnores: ['**/snapshots/**', '**/snapshot-*.json', '**/puzzles-*.json'],
         runtimeCaching: [
+          {
+            urlPattern: ({ url }) => url.pathname === '/snapshots/latest.json',
+            handler: 'NetworkFirst',
+            options: {
+              cacheName: 'snapshot-manifest',
+              networkTimeoutSeconds: 5
+            }
+          },
+          {
+            // Fichiers à empreinte : contenu immuable
+            urlPattern: ({ url }) => url.pathname.startsWith('/snapshots/'),
+            handler: 'CacheFirst',
+            options: {
+              cacheName: 'snapshots',
+              expiration: {
+                maxEntries: 6
+              },
+              cacheableResponse: {
+                statuses: [200]
+              }
+            }
+          },
+          {
+            // Ancien emplacement (public/snapshot-YYYY-MM.json, nom fixe)
+            urlPattern: ({ url }) => /^\/snapshot-[^/]*\.json$/.test(url.pathname),
+            handler: 'NetworkFirst',
+            options: {
+              cacheName: 'snapshot-legacy',
+              networkTimeoutSeconds: 10
+            }
+          },
           {
             urlPattern: /^https:\/\/flagcdn\.com\/.*/i,
             handler: 'CacheFirst',